@@ -22,6 +22,12 @@ class Project(models.Model):
         "users.User",
         on_delete=models.CASCADE,
     )
+    total_hours = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -2,6 +2,7 @@
 from django.urls import path
 
 from apps.projects.views import (
+    MemberAutocompleteAPIView,
     ProjectJoinRequestAPIView,
     ProjectSelectionRedirectView,
     ProjectSelectionView,
@@ -37,4 +38,9 @@ urlpatterns = [
         ProjectJoinRequestAPIView.as_view(),
         name="join_request_detail",
     ),
+    path(
+        "api/projects/<int:project_id>/members/autocomplete/",
+        MemberAutocompleteAPIView.as_view(),
+        name="member_autocomplete",
+    ),
 ]
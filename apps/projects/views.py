@@ -6,7 +6,10 @@ from django.db import models, transaction
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.views.generic import TemplateView
 from rest_framework import permissions
 from rest_framework.response import Response
@@ -21,7 +24,12 @@ from apps.projects.models import (
     ProjectMember,
     ProjectStatus,
 )
-from apps.tasks.models import TaskTimeLog
+from apps.tasks.services.conditional_get import ConditionalGetService
+from apps.tasks.services.project_access import ProjectAccess
+from apps.tasks.services.project_membership import ProjectMembershipService
+from apps.tasks.services.task_board import TaskBoardService
+from apps.tasks.services.task_version import TaskVersionService
+from apps.users.models import User
 from config.typess import AuthenticatedHttpRequest, AuthenticatedRequest
 
 
@@ -32,8 +40,8 @@ class ProjectSelectionView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         ctx = super().get_context_data(**kwargs)
-        ctx["projects"] = Project.objects.filter(
-            members__user=cast(AuthenticatedHttpRequest, self.request).user
+        ctx["projects"] = ProjectMembershipService.projects(
+            cast(AuthenticatedHttpRequest, self.request).user,
         )
         return ctx
 
@@ -49,8 +57,8 @@ class ProjectSelectionRedirectView(LoginRequiredMixin, View):
     ) -> HttpResponse:
         project_id = kwargs["project_id"]
         project = get_object_or_404(
-            Project.objects.filter(
-                members__user=cast(AuthenticatedHttpRequest, self.request).user
+            ProjectMembershipService.projects(
+                cast(AuthenticatedHttpRequest, self.request).user,
             ),
             id=project_id,
         )
@@ -62,6 +70,16 @@ class ProjectSelectionRedirectView(LoginRequiredMixin, View):
         return redirect("projects:project", project_id=project.id)
 
 
+@method_decorator(
+    [
+        cache_control(private=True, no_cache=True),
+        condition(
+            etag_func=ConditionalGetService.project_page_etag,
+            last_modified_func=ConditionalGetService.project_last_modified,
+        ),
+    ],
+    name="get",
+)
 class ProjectView(LoginRequiredMixin, TemplateView):
     http_method_names = ["get"]
     template_name = "projects/project.html"
@@ -69,8 +87,8 @@ class ProjectView(LoginRequiredMixin, TemplateView):
 
     def get_object(self) -> Project:
         return get_object_or_404(
-            Project.objects.filter(
-                members__user=cast(AuthenticatedHttpRequest, self.request).user,
+            ProjectMembershipService.projects(
+                cast(AuthenticatedHttpRequest, self.request).user,
             ),
             id=self.kwargs["project_id"],
         )
@@ -79,13 +97,8 @@ class ProjectView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         project = self.get_object()
         context["project"] = project
-        total_hours = (
-            TaskTimeLog.objects.filter(task__project=project).aggregate(
-                models.Sum("hours"),
-            )["hours__sum"]
-            or 0
-        )
-        context["total_hours"] = f"{total_hours:.2f}"
+        context["project_access"] = ProjectAccess.for_request(self.request, project)
+        context["total_hours"] = f"{project.total_hours:.2f}"
         return context
 
 
@@ -146,11 +159,16 @@ class ProjectUView(LoginRequiredMixin, TemplateView):
                         position=position,
                     )
 
-            ProjectStatus.objects.filter(id__in=existing_statuses.keys()).delete()
+            if existing_statuses:
+                ProjectStatus.objects.filter(id__in=existing_statuses.keys()).delete()
+                # Задачи удалённых статусов переходят в колонку "No status"
+                TaskBoardService.invalidate(project.id)
 
             project.members.exclude(user_id=project.owner_id).exclude(
                 id__in=member_ids,
             ).delete()
+            # Название проекта и имена статусов есть на страницах задач
+            TaskVersionService.invalidate_project(project.id)
 
         form = ProjectForm(request.POST, instance=project)
         if form.is_valid():
@@ -211,3 +229,39 @@ class ProjectJoinRequestAPIView(APIView):
         pjr = self.get_object()
         pjr.delete()
         return Response(status=204)
+
+
+class MemberAutocompleteAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["get"]
+    limit = 20
+
+    def get(
+        self,
+        request: AuthenticatedRequest,
+        project_id: int,
+    ) -> Response:
+        project = get_object_or_404(
+            ProjectMembershipService.projects(request.user),
+            id=project_id,
+        )
+        users = User.objects.filter(projects__project=project)
+        if query := request.query_params.get("q", "").strip():
+            users = users.filter(
+                models.Q(email__istartswith=query)
+                | models.Q(first_name__istartswith=query)
+                | models.Q(last_name__istartswith=query),
+            )
+        return Response(
+            data={
+                "results": [
+                    {"id": user.id, "text": str(user)}
+                    for user in users.only(
+                        "id",
+                        "email",
+                        "first_name",
+                        "last_name",
+                    ).order_by("email")[: self.limit]
+                ],
+            },
+        )
@@ -1,7 +1,9 @@
-from typing import cast
+from typing import Any, cast
 
 from django.contrib import admin
+from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import Q, QuerySet
 
 # Register your models here.
 # users/admin.py
@@ -9,18 +11,50 @@ from django.forms import ModelForm
 from django.http import HttpRequest
 from django.utils.translation import gettext_lazy as _
 
-from apps.tasks.services.task_history import TaskHistoryService
+from apps.tasks.services.task_board import TaskBoardService
+from apps.tasks.services.task_hierarchy import TaskHierarchyService
+from apps.tasks.services.task_history import TaskHistoryService, TaskOldValues
+from apps.tasks.services.task_hours import TaskHoursService
+from apps.tasks.services.task_search import TaskSearchService
+from apps.tasks.services.task_version import TaskVersionService
+from apps.tasks.services.timelog_rollup import TimeLogRollupService
 from apps.users.models import User
 
 from .models import Task
 
 
+class TaskAdminForm(ModelForm[Task]):
+    class Meta:
+        model = Task
+        fields = "__all__"
+
+    def clean(self) -> dict[str, Any] | None:
+        cleaned_data = super().clean()
+        assert cleaned_data is not None
+
+        # move() запускается уже после сохранения: цикл и чужой проект
+        # должны стать ошибкой формы, а не исключением
+        project = cleaned_data.get("project")
+        if project is not None:
+            try:
+                TaskHierarchyService.check_parent(
+                    self.instance,
+                    cleaned_data.get("parent"),
+                    project.id,
+                )
+            except ValidationError as exc:
+                self.add_error("parent", exc)
+
+        return cleaned_data
+
+
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin[Task]):
+    form = TaskAdminForm
     ordering = ["created_at", "updated_at"]
     filter = ("executor", "creator", "status")
     list_display = ["id", "project", "title", "status", "executor"]
-    search_fields = ["title", "created_at", "updated_at"]
+    search_fields = ["title"]
     readonly_fields = ["created_at", "updated_at", "creator"]
     list_filter = ["created_at", "updated_at"]
 
@@ -44,8 +78,6 @@ class TaskAdmin(admin.ModelAdmin[Task]):
             {
                 "fields": (
                     "project",
-                    "next",
-                    "previous",
                     "parent",
                 ),
             },
@@ -63,8 +95,6 @@ class TaskAdmin(admin.ModelAdmin[Task]):
                     "description",
                     "executor",
                     "parent",
-                    "next",
-                    "previous",
                 ),
             },
         ),
@@ -80,13 +110,67 @@ class TaskAdmin(admin.ModelAdmin[Task]):
         with transaction.atomic():
             if not change:
                 obj.creator = cast(User, request.user)
-            super().save_model(request, obj, form, change)
+                super().save_model(request, obj, form, change)
+                TaskHierarchyService.insert(obj)
+                TaskBoardService.invalidate(obj.project_id)
+            else:
+                # Счётчики часов и номеров обновляются в БД атомарно,
+                # их не перезаписываем
+                obj.save(update_fields=[*form.changed_data, "updated_at"])
+                if {"status", "project"} & set(form.changed_data):
+                    TaskBoardService.invalidate(
+                        obj.project_id,
+                        form.initial["project"],
+                    )
+                if "parent" in form.changed_data:
+                    TaskHierarchyService.move(obj)
+                if "project" in form.changed_data:
+                    TaskHoursService.change_project(obj, form.initial["project"])
+                    TimeLogRollupService.change_project(obj)
 
             history_service = TaskHistoryService(
                 task=obj,
                 user=cast(User, request.user),
             )
             if change:
-                history_service.update()
+                history_service.update(
+                    TaskOldValues(
+                        title=form.initial["title"],
+                        description=form.initial["description"],
+                        status_id=form.initial["status"],
+                        executor_id=form.initial["executor"],
+                        project_id=form.initial["project"],
+                        parent_id=form.initial["parent"],
+                    ),
+                    form.changed_data,
+                )
             else:
                 history_service.create()
+
+    def delete_model(self, request: HttpRequest, obj: Task) -> None:
+        super().delete_model(request, obj)
+        TaskBoardService.invalidate(obj.project_id)
+        TaskVersionService.invalidate(obj.parent_id)
+
+    def delete_queryset(self, request: HttpRequest, queryset: QuerySet[Task]) -> None:
+        project_ids, parent_ids = set(), set()
+        for project_id, parent_id in queryset.values_list("project_id", "parent_id"):
+            project_ids.add(project_id)
+            parent_ids.add(parent_id)
+        super().delete_queryset(request, queryset)
+        TaskBoardService.invalidate(*project_ids)
+        TaskVersionService.invalidate(*parent_ids)
+
+    def get_search_results(
+        self,
+        request: HttpRequest,
+        queryset: QuerySet[Task],
+        search_term: str,
+    ) -> tuple[QuerySet[Task], bool]:
+        # Поиск по FTS-индексу вместо icontains по каждому полю
+        if not search_term.strip():
+            return queryset, False
+        condition = TaskSearchService.match_condition(search_term)
+        if search_term.strip().lstrip("#").isdigit():
+            condition |= Q(id=int(search_term.strip().lstrip("#")))
+        return queryset.filter(condition), False
@@ -1,9 +1,15 @@
 from functools import cached_property
-from typing import Any
+from typing import Any, cast
 
 from django import forms
+from django.urls import reverse
+
+from apps.projects.models import ProjectStatus
+from apps.tasks.services.project_access import ProjectAccess
+from apps.users.models import User
 
 from ..models import Task
+from .widgets import AutocompleteSelect
 
 
 class CTaskForm(forms.ModelForm[Task]):
@@ -26,7 +32,7 @@ class CTaskForm(forms.ModelForm[Task]):
                     "rows": 12,
                 },
             ),
-            "executor": forms.Select(
+            "executor": AutocompleteSelect(
                 attrs={
                     "id": "executor",
                     "class": "rounded border border-gray-300 p-1",
@@ -38,7 +44,7 @@ class CTaskForm(forms.ModelForm[Task]):
                     "class": "rounded border border-gray-300 p-1",
                 },
             ),
-            "parent": forms.Select(
+            "parent": AutocompleteSelect(
                 attrs={
                     "id": "parent",
                     "class": "rounded border border-gray-300 p-1",
@@ -109,7 +115,7 @@ class UTaskForm(forms.ModelForm[Task]):
                     "rows": 12,
                 },
             ),
-            "executor": forms.Select(
+            "executor": AutocompleteSelect(
                 attrs={
                     "id": "executor",
                     "class": "rounded border border-gray-300 p-1",
@@ -121,7 +127,7 @@ class UTaskForm(forms.ModelForm[Task]):
                     "class": "rounded border border-gray-300 p-1",
                 },
             ),
-            "parent": forms.Select(
+            "parent": AutocompleteSelect(
                 attrs={
                     "id": "parent",
                     "class": "rounded border border-gray-300 p-1",
@@ -152,3 +158,25 @@ class UTaskForm(forms.ModelForm[Task]):
             for name, bf in self._bound_items()  # type: ignore
             if bf._has_changed() and name in self.Meta.fields
         ]
+
+
+def bind_project(form: CTaskForm | UTaskForm, access: ProjectAccess) -> None:
+    # Варианты статуса берутся из уже загруженного контекста проекта
+    project_id = access.project.id
+    executor_field = cast(forms.ModelChoiceField[User], form.fields["executor"])
+    executor_field.queryset = User.objects.filter(projects__project_id=project_id)
+    executor_field.widget.attrs["data-url"] = reverse(
+        "projects:member_autocomplete",
+        kwargs={"project_id": project_id},
+    )
+    parent_field = cast(forms.ModelChoiceField[Task], form.fields["parent"])
+    parent_field.widget.attrs["data-url"] = reverse(
+        "tasks:task_autocomplete",
+        kwargs={"project_id": project_id},
+    )
+    status_field = cast(forms.ModelChoiceField[ProjectStatus], form.fields["status"])
+    status_field.queryset = ProjectStatus.objects.filter(project_id=project_id)
+    if access.statuses:
+        status_field.choices = [(status.id, status.name) for status in access.statuses]
+    else:
+        status_field.choices = [("", "No status")]
@@ -0,0 +1,132 @@
+from typing import Any, cast
+
+from django import forms
+from django.urls import reverse
+
+from apps.projects.models import Project, ProjectStatus
+from apps.tasks.forms.widgets import AutocompleteSelect
+from apps.tasks.models import Task
+from apps.tasks.services.project_membership import ProjectMembershipService
+from apps.users.models import User
+
+NO_STATUS = "none"
+
+TASK_LIST_SORTS = {
+    "-updated_at": ("updated_at", True),
+    "updated_at": ("updated_at", False),
+    "-created_at": ("created_at", True),
+    "created_at": ("created_at", False),
+}
+
+
+class StatusChoiceField(forms.ModelChoiceField[ProjectStatus]):
+    def label_from_instance(self, obj: ProjectStatus) -> str:
+        return f"{obj.project.title}: {obj.name}"
+
+
+class MyTasksFilterForm(forms.Form):
+    project = forms.ModelChoiceField(
+        queryset=Project.objects.none(),
+        required=False,
+        empty_label="All projects",
+        widget=forms.Select(attrs={"class": "rounded border border-gray-300 p-1"}),
+    )
+    status = StatusChoiceField(
+        queryset=ProjectStatus.objects.none(),
+        required=False,
+        empty_label="All statuses",
+        widget=forms.Select(attrs={"class": "rounded border border-gray-300 p-1"}),
+    )
+    q = forms.CharField(
+        required=False,
+        max_length=128,
+        widget=forms.TextInput(
+            attrs={
+                "class": "rounded border border-gray-300 p-1",
+                "placeholder": "Search by # or title",
+            },
+        ),
+    )
+
+    def __init__(self, *args: Any, user: User, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        projects = ProjectMembershipService.projects(user)
+        project_field = cast(
+            forms.ModelChoiceField[Project],
+            self.fields["project"],
+        )
+        project_field.queryset = projects.only("id", "title")
+        status_field = cast(StatusChoiceField, self.fields["status"])
+        status_field.queryset = (
+            ProjectStatus.objects.filter(project__in=projects)
+            .select_related("project")
+            .only("id", "name", "project__title")
+            .order_by("project__title", "position")
+        )
+
+
+class ProjectTasksFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        required=False,
+        widget=forms.Select(attrs={"class": "rounded border border-gray-300 p-1"}),
+    )
+    executor = forms.ModelChoiceField(
+        queryset=User.objects.none(),
+        required=False,
+        empty_label="Any executor",
+        widget=AutocompleteSelect(
+            attrs={"class": "rounded border border-gray-300 p-1"},
+        ),
+    )
+    creator = forms.ModelChoiceField(
+        queryset=User.objects.none(),
+        required=False,
+        empty_label="Any creator",
+        widget=AutocompleteSelect(
+            attrs={"class": "rounded border border-gray-300 p-1"},
+        ),
+    )
+    parent = forms.ModelChoiceField(
+        queryset=Task.objects.none(),
+        required=False,
+        empty_label="Any parent",
+        widget=AutocompleteSelect(
+            attrs={"class": "rounded border border-gray-300 p-1"},
+        ),
+    )
+    roots = forms.BooleanField(
+        required=False,
+        label="Root tasks only",
+    )
+    sort = forms.ChoiceField(
+        required=False,
+        choices=[(sort, sort) for sort in TASK_LIST_SORTS],
+        widget=forms.HiddenInput,
+    )
+
+    def __init__(self, *args: Any, project: Project, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        status_field = cast(forms.ChoiceField, self.fields["status"])
+        status_field.choices = [
+            ("", "All statuses"),
+            (NO_STATUS, "No status"),
+            *ProjectStatus.objects.filter(project=project).values_list("id", "name"),
+        ]
+        members = User.objects.filter(projects__project=project)
+        member_autocomplete_url = reverse(
+            "projects:member_autocomplete",
+            kwargs={"project_id": project.id},
+        )
+        for name in ("executor", "creator"):
+            field = cast(forms.ModelChoiceField[User], self.fields[name])
+            field.queryset = members
+            field.widget.attrs["data-url"] = member_autocomplete_url
+        parent_field = cast(forms.ModelChoiceField[Task], self.fields["parent"])
+        parent_field.queryset = Task.objects.filter(project=project)
+        parent_field.widget.attrs["data-url"] = reverse(
+            "tasks:task_autocomplete",
+            kwargs={"project_id": project.id},
+        )
+
+    def clean_sort(self) -> str:
+        return cast(str, self.cleaned_data["sort"]) or "-updated_at"
@@ -0,0 +1,25 @@
+from typing import Any
+
+from django import forms
+
+
+class TimeLogExportForm(forms.Form):
+    format = forms.ChoiceField(
+        choices=[("csv", "CSV"), ("ndjson", "NDJSON")],
+        required=False,
+    )
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    project = forms.IntegerField(required=False)
+    user = forms.IntegerField(required=False)
+
+    def clean(self) -> dict[str, Any] | None:
+        cleaned_data = super().clean()
+        assert cleaned_data is not None
+
+        start = cleaned_data.get("start")
+        end = cleaned_data.get("end")
+        if start and end and start > end:
+            self.add_error("end", "End date must not be before start date.")
+
+        return cleaned_data
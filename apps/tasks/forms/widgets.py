@@ -0,0 +1,35 @@
+from typing import Any
+
+from django import forms
+from django.forms.models import ModelChoiceIterator
+
+
+class AutocompleteSelect(forms.Select):
+    # Рендерит только выбранное значение, остальные варианты подгружаются
+    # с эндпоинта из атрибута data-url
+    template_name = "tasks/widgets/autocomplete_select.html"
+
+    class Media:
+        # Один раз на страницу через {{ form.media }}, а не в каждом виджете
+        js = ["tasks/autocomplete_select.js"]
+
+    def optgroups(
+        self,
+        name: str,
+        value: list[str],
+        attrs: dict[str, Any] | None = None,
+    ) -> list[tuple[str | None, list[dict[str, Any]], int | None]]:
+        iterator = self.choices
+        if not isinstance(iterator, ModelChoiceIterator):
+            return super().optgroups(name, value, attrs)
+        selected_ids = [v for v in value if v]
+        self.choices = [("", iterator.field.empty_label or "---------")]
+        if selected_ids:
+            self.choices += [
+                (obj.pk, iterator.field.label_from_instance(obj))
+                for obj in iterator.queryset.filter(pk__in=selected_ids)
+            ]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
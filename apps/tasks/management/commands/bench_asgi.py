@@ -0,0 +1,255 @@
+import asyncio
+import io
+import statistics
+import threading
+import time
+import uuid
+from collections.abc import Callable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connections
+from django.test import Client
+
+from apps.projects.models import Project, ProjectMember
+from apps.tasks.models import Task, TaskComment
+from apps.users.models import User
+from config.asgi import application
+
+HOST = "localhost"
+TASKS = 20
+
+
+class InFlight:
+    # Сколько запросов обрабатывается одновременно: для WSGI это потолок
+    # по числу потоков воркера, для ASGI — по числу клиентов
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self) -> None:
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info: object) -> None:
+        with self.lock:
+            self.current -= 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the home and task pages through the WSGI handler on a thread "
+        "pool and through the ASGI application on one event loop, and report "
+        "p50/p99 latency, throughput and peak concurrent requests. Uses a "
+        "throwaway user and project in the configured database."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--requests", type=int, default=400)
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=32,
+            help="Concurrent clients",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=4,
+            help="Threads of the WSGI worker",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        user = User.objects.create_user(
+            email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+            password=uuid.uuid4().hex,
+        )
+        try:
+            paths = self._seed(user)
+            client = Client()
+            client.force_login(user)
+            cookie = f"{settings.SESSION_COOKIE_NAME}=" + (
+                client.cookies[settings.SESSION_COOKIE_NAME].value
+            )
+            self._report("wsgi", self._run_wsgi(paths, cookie, options), options)
+            self._report("asgi", self._run_asgi(paths, cookie, options), options)
+        finally:
+            # Проект и задачи удаляются каскадом
+            user.delete()
+            connections.close_all()
+
+    @staticmethod
+    def _seed(user: User) -> list[str]:
+        project = Project.objects.create(title="ASGI benchmark", owner=user)
+        ProjectMember.objects.create(project=project, user=user)
+        tasks = Task.objects.bulk_create(
+            Task(
+                title=f"Task {number}",
+                description="",
+                creator=user,
+                executor=user,
+                project=project,
+            )
+            for number in range(TASKS)
+        )
+        TaskComment.objects.bulk_create(
+            TaskComment(task=task, number=1, creator=user, text="benchmark")
+            for task in tasks
+        )
+        return ["/"] + [f"/tasks/{task.id}" for task in tasks]
+
+    def _run_wsgi(
+        self,
+        paths: list[str],
+        cookie: str,
+        options: dict[str, Any],
+    ) -> dict[str, Any]:
+        # Воркер gthread: запросы встают в очередь к его потокам, и поток
+        # занят, пока ответ не отдан целиком. Ожидание входит в задержку
+        handler = WSGIHandler()
+        in_flight = InFlight()
+        queue = list(reversed(self._schedule(paths, options)))
+        latencies: list[float] = []
+
+        def request(path: str) -> None:
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                "QUERY_STRING": "",
+                "SERVER_NAME": HOST,
+                "SERVER_PORT": "80",
+                "SERVER_PROTOCOL": "HTTP/1.1",
+                "HTTP_HOST": HOST,
+                "HTTP_COOKIE": cookie,
+                "wsgi.url_scheme": "http",
+                "wsgi.input": io.BytesIO(),
+                "wsgi.errors": io.StringIO(),
+            }
+            with in_flight:
+                response = handler(environ, self._start_response)
+                b"".join(response)
+                response.close()
+
+        with ThreadPoolExecutor(options["threads"]) as worker:
+
+            def client() -> None:
+                while True:
+                    try:
+                        path = queue.pop()
+                    except IndexError:
+                        return
+                    started = time.perf_counter()
+                    worker.submit(request, path).result()
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options["clients"]) as clients:
+                for future in [
+                    clients.submit(client) for _ in range(options["clients"])
+                ]:
+                    future.result()
+            elapsed = time.perf_counter() - started
+        return {"latencies": latencies, "elapsed": elapsed, "peak": in_flight.peak}
+
+    @staticmethod
+    def _start_response(
+        status: str,
+        headers: list[tuple[str, str]],
+        exc_info: Any = None,
+    ) -> Callable[[bytes], None]:
+        if not status.startswith(("200", "304")):
+            raise RuntimeError(f"Unexpected response {status}")
+        return lambda data: None
+
+    def _run_asgi(
+        self,
+        paths: list[str],
+        cookie: str,
+        options: dict[str, Any],
+    ) -> dict[str, Any]:
+        in_flight = InFlight()
+
+        async def request(path: str) -> float:
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": b"",
+                "root_path": "",
+                "headers": [
+                    (b"host", HOST.encode()),
+                    (b"cookie", cookie.encode()),
+                ],
+                "server": (HOST, 80),
+            }
+
+            body_sent = asyncio.Event()
+
+            async def receive() -> dict[str, Any]:
+                # Тело отдаётся один раз, дальше клиент просто ждёт ответа
+                if body_sent.is_set():
+                    await asyncio.Future()
+                body_sent.set()
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message: Mapping[str, Any]) -> None:
+                if message["type"] == "http.response.start" and message[
+                    "status"
+                ] not in (200, 304):
+                    raise RuntimeError(f"Unexpected response {message['status']}")
+
+            started = time.perf_counter()
+            with in_flight:
+                await application(scope, receive, send)
+            return time.perf_counter() - started
+
+        async def run() -> dict[str, Any]:
+            # Клиенты разбирают общую очередь путей, как соединения к серверу
+            queue = list(reversed(self._schedule(paths, options)))
+            latencies: list[float] = []
+
+            async def client() -> None:
+                while queue:
+                    latencies.append(await request(queue.pop()))
+
+            started = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(options["clients"])))
+            return {
+                "latencies": latencies,
+                "elapsed": time.perf_counter() - started,
+                "peak": in_flight.peak,
+            }
+
+        return asyncio.run(run())
+
+    @staticmethod
+    def _schedule(paths: list[str], options: dict[str, Any]) -> list[str]:
+        return [paths[number % len(paths)] for number in range(options["requests"])]
+
+    def _report(
+        self,
+        mode: str,
+        result: dict[str, Any],
+        options: dict[str, Any],
+    ) -> None:
+        latencies = sorted(result["latencies"])
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{mode}: requests={len(latencies)} clients={options['clients']} "
+            f"threads={options['threads'] if mode == 'wsgi' else '-'} "
+            f"peak_in_flight={result['peak']} "
+            f"throughput={len(latencies) / result['elapsed']:.0f} req/s",
+        )
+        self.stdout.write(
+            f"  p50={quantiles[49] * 1000:.1f}ms p99={quantiles[98] * 1000:.1f}ms "
+            f"max={latencies[-1] * 1000:.1f}ms",
+        )
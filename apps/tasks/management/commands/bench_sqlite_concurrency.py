@@ -0,0 +1,225 @@
+import multiprocessing
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter
+from multiprocessing.queues import Queue
+from pathlib import Path
+from typing import Any, cast
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    OperationalError,
+    connections,
+    models,
+    transaction,
+)
+
+from apps.projects.models import Project, ProjectMember
+from apps.tasks.models import Task, TaskComment
+from apps.users.models import User
+
+BENCH_ALIAS = "sqlite_bench"
+TASKS = 50
+
+
+class Command(BaseCommand):
+    help = (
+        "Run writer and reader processes against a scratch SQLite database and "
+        "report write throughput and reader latency. 'default' is a plain "
+        "sqlite3 connection, 'tuned' uses the OPTIONS from settings."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument(
+            "--mode",
+            choices=["default", "tuned", "both"],
+            default="both",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if settings.DATABASES[DEFAULT_DB_ALIAS]["ENGINE"] != (
+            "django.db.backends.sqlite3"
+        ):
+            raise CommandError("The benchmark needs the sqlite3 backend")
+        modes = ["default", "tuned"] if options["mode"] == "both" else [options["mode"]]
+        tuned_options = cast(
+            dict[str, Any],
+            settings.DATABASES[DEFAULT_DB_ALIAS].get("OPTIONS", {}),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            # Схема создаётся один раз, каждый режим получает копию файла:
+            # journal_mode=WAL сохраняется в самом файле
+            template = Path(directory) / "template.sqlite3"
+            self._configure(template, {})
+            call_command("migrate", database=BENCH_ALIAS, verbosity=0)
+            self._seed()
+            for mode in modes:
+                path = Path(directory) / f"{mode}.sqlite3"
+                shutil.copyfile(template, path)
+                self._configure(path, tuned_options if mode == "tuned" else {})
+                self._report(mode, self._run(options), options)
+            connections[BENCH_ALIAS].close()
+
+    @staticmethod
+    def _configure(path: Path, db_options: dict[str, Any]) -> None:
+        if BENCH_ALIAS in connections.settings:
+            connections[BENCH_ALIAS].close()
+            del connections[BENCH_ALIAS]
+        connections.settings[BENCH_ALIAS] = connections.configure_settings(
+            {
+                DEFAULT_DB_ALIAS: settings.DATABASES[DEFAULT_DB_ALIAS],
+                BENCH_ALIAS: {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": path,
+                    "OPTIONS": db_options,
+                },
+            },
+        )[BENCH_ALIAS]
+
+    @staticmethod
+    def _seed() -> None:
+        user = User.objects.db_manager(BENCH_ALIAS).create_user(
+            email="bench@example.com",
+            password="bench",
+        )
+        project = Project.objects.using(BENCH_ALIAS).create(
+            title="SQLite benchmark",
+            owner=user,
+        )
+        ProjectMember.objects.using(BENCH_ALIAS).create(project=project, user=user)
+        Task.objects.using(BENCH_ALIAS).bulk_create(
+            Task(
+                title=f"Task {number}",
+                description="",
+                creator=user,
+                project=project,
+            )
+            for number in range(TASKS)
+        )
+
+    def _run(self, options: dict[str, Any]) -> dict[str, Any]:
+        # Отдельные процессы, как воркеры gunicorn: у каждого своё соединение
+        context = multiprocessing.get_context("fork")
+        results: Queue[dict[str, Any]] = context.Queue()
+        deadline = time.monotonic() + options["seconds"]
+        processes = [
+            context.Process(target=self._writer, args=(number, deadline, results))
+            for number in range(options["writers"])
+        ] + [
+            context.Process(target=self._reader, args=(number, deadline, results))
+            for number in range(options["readers"])
+        ]
+        connections.close_all()
+        for process in processes:
+            process.start()
+        outcomes: Counter[str] = Counter()
+        latencies: list[float] = []
+        for _ in processes:
+            result = results.get()
+            outcomes.update(result["outcomes"])
+            latencies += result["latencies"]
+        for process in processes:
+            process.join()
+        return {"outcomes": outcomes, "latencies": latencies}
+
+    @staticmethod
+    def _writer(number: int, deadline: float, results: Queue[dict[str, Any]]) -> None:
+        outcomes: Counter[str] = Counter()
+        task_ids = list(Task.objects.using(BENCH_ALIAS).values_list("id", flat=True))
+        creator_id = Task.objects.using(BENCH_ALIAS).values_list(
+            "creator_id",
+            flat=True,
+        )[0]
+        iteration = number
+        while time.monotonic() < deadline:
+            task_id = task_ids[iteration % len(task_ids)]
+            iteration += 1
+            try:
+                # Как при сохранении задачи: сначала чтение, потом запись
+                with transaction.atomic(using=BENCH_ALIAS):
+                    Task.objects.using(BENCH_ALIAS).only("id").get(id=task_id)
+                    Task.objects.using(BENCH_ALIAS).filter(id=task_id).update(
+                        last_comment_number=models.F("last_comment_number") + 1,
+                    )
+                    comment_number = (
+                        Task.objects.using(BENCH_ALIAS)
+                        .values_list("last_comment_number", flat=True)
+                        .get(id=task_id)
+                    )
+                    TaskComment.objects.using(BENCH_ALIAS).create(
+                        task_id=task_id,
+                        number=comment_number,
+                        creator_id=creator_id,
+                        text="benchmark",
+                    )
+                outcomes["committed"] += 1
+            except OperationalError:
+                outcomes["locked"] += 1
+        connections.close_all()
+        results.put({"outcomes": outcomes, "latencies": []})
+
+    @staticmethod
+    def _reader(number: int, deadline: float, results: Queue[dict[str, Any]]) -> None:
+        outcomes: Counter[str] = Counter()
+        latencies: list[float] = []
+        task_ids = list(Task.objects.using(BENCH_ALIAS).values_list("id", flat=True))
+        iteration = number
+        while time.monotonic() < deadline:
+            task_id = task_ids[iteration % len(task_ids)]
+            iteration += 1
+            started = time.perf_counter()
+            try:
+                # Примерно то, что читает страница задачи
+                Task.objects.using(BENCH_ALIAS).select_related("project").get(
+                    id=task_id,
+                )
+                list(
+                    TaskComment.objects.using(BENCH_ALIAS)
+                    .filter(task_id=task_id)
+                    .order_by("-created_at", "-id")[:20],
+                )
+            except OperationalError:
+                outcomes["read_errors"] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            outcomes["reads"] += 1
+        connections.close_all()
+        results.put({"outcomes": outcomes, "latencies": latencies})
+
+    def _report(
+        self,
+        mode: str,
+        result: dict[str, Any],
+        options: dict[str, Any],
+    ) -> None:
+        outcomes = result["outcomes"]
+        latencies = sorted(result["latencies"])
+        seconds = options["seconds"]
+        self.stdout.write(
+            f"mode={mode} writers={options['writers']} "
+            f"readers={options['readers']} seconds={seconds:g}",
+        )
+        self.stdout.write(
+            f"  writes: committed={outcomes['committed']} "
+            f"locked={outcomes['locked']} "
+            f"({outcomes['committed'] / seconds:.0f} tx/s)",
+        )
+        if latencies:
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"  reads: {outcomes['reads']} ok, {outcomes['read_errors']} errors, "
+                f"p50={quantiles[49] * 1000:.2f}ms p95={quantiles[94] * 1000:.2f}ms "
+                f"p99={quantiles[98] * 1000:.2f}ms max={latencies[-1] * 1000:.2f}ms",
+            )
+        else:
+            self.stdout.write(
+                f"  reads: 0 ok, {outcomes['read_errors']} errors",
+            )
@@ -0,0 +1,132 @@
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import IntegrityError, OperationalError, connection, transaction
+
+from apps.projects.models import Project, ProjectMember
+from apps.tasks.models import Task, TaskComment
+from apps.tasks.services.task_numbers import TaskNumberAllocator
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrently create comments on one task and count number conflicts. "
+        "Runs against the configured database on a throwaway user/project."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--per-thread", type=int, default=100)
+        parser.add_argument(
+            "--block",
+            type=int,
+            default=1,
+            help="Numbers reserved (and comments created) per transaction",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=["allocator", "naive"],
+            default="allocator",
+            help="naive reproduces the old read-increment-save pattern",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        user = User.objects.create_user(
+            email=f"bench-{uuid.uuid4().hex[:12]}@example.com",
+            password=uuid.uuid4().hex,
+        )
+        project = Project.objects.create(title="Number benchmark", owner=user)
+        ProjectMember.objects.create(project=project, user=user)
+        task = Task.objects.create(
+            title="Number benchmark",
+            description="",
+            creator=user,
+            project=project,
+        )
+        outcomes: Counter[str] = Counter()
+        lock = threading.Lock()
+
+        def create_comments() -> None:
+            local: Counter[str] = Counter()
+            try:
+                for _ in range(options["per_thread"]):
+                    try:
+                        with transaction.atomic():
+                            if options["mode"] == "naive":
+                                numbers = self._naive_reserve(task.id, options["block"])
+                            else:
+                                numbers = TaskNumberAllocator.reserve_comment_numbers(
+                                    task,
+                                    options["block"],
+                                )
+                            TaskComment.objects.bulk_create(
+                                TaskComment(
+                                    task_id=task.id,
+                                    number=number,
+                                    creator=user,
+                                    text="benchmark",
+                                )
+                                for number in numbers
+                            )
+                        local["ok"] += 1
+                    except IntegrityError:
+                        local["conflict"] += 1
+                    except OperationalError:
+                        local["locked"] += 1
+            finally:
+                connection.close()
+                with lock:
+                    outcomes.update(local)
+
+        threads = [
+            threading.Thread(target=create_comments) for _ in range(options["threads"])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        numbers = list(
+            TaskComment.objects.filter(task=task).values_list("number", flat=True),
+        )
+        task.refresh_from_db()
+        user.delete()
+
+        attempts = options["threads"] * options["per_thread"]
+        self.stdout.write(
+            f"mode={options['mode']} threads={options['threads']} "
+            f"block={options['block']} attempts={attempts}",
+        )
+        self.stdout.write(
+            f"committed={outcomes['ok']} conflicts={outcomes['conflict']} "
+            f"locked={outcomes['locked']} in {elapsed:.2f}s "
+            f"({outcomes['ok'] / elapsed:.0f} tx/s)",
+        )
+        gaps = task.last_comment_number - len(numbers)
+        self.stdout.write(
+            f"comments={len(numbers)} distinct={len(set(numbers))} "
+            f"last_comment_number={task.last_comment_number} unused_numbers={gaps}",
+        )
+        if outcomes["conflict"]:
+            self.stdout.write(self.style.ERROR("Number conflicts detected"))
+        elif outcomes["locked"]:
+            self.stdout.write(self.style.WARNING("Transactions failed on locks"))
+        else:
+            self.stdout.write(self.style.SUCCESS("No number conflicts"))
+
+    @staticmethod
+    def _naive_reserve(task_id: int, count: int) -> range:
+        task = Task.objects.get(id=task_id)
+        first = task.last_comment_number + 1
+        task.last_comment_number += count
+        # Задержка между чтением и записью, как при сохранении формы
+        time.sleep(0.001)
+        task.save(update_fields=["last_comment_number"])
+        return range(first, first + count)
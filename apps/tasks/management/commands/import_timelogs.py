@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from apps.tasks.services.timelog_import import TimeLogImportService
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Import time logs from a CSV or JSON file "
+        "(columns: task, hours, description, user, created_at)"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", type=Path)
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="Email of the importing user; also the default time log creator",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            user = User.objects.get(email=options["user"])
+        except User.DoesNotExist as exc:
+            raise CommandError(f"User {options['user']} not found") from exc
+        path: Path = options["path"]
+        service = TimeLogImportService(
+            user=user,
+            batch_size=options["batch_size"],
+            allow_user_override=True,
+        )
+
+        with path.open("rb") as stream:
+            if path.suffix.lower() == ".json":
+                rows = json.load(stream)
+                if isinstance(rows, dict):
+                    rows = rows.get("rows")
+                if not isinstance(rows, list):
+                    raise CommandError("Expected a JSON list of rows")
+                result = service.import_rows(rows)
+            else:
+                result = service.import_rows(service.read_csv(stream))
+
+        for error in result["errors"]:
+            self.stderr.write(f"row {error['row']}: {'; '.join(error['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result['created']} time logs, "
+                f"{len(result['errors'])} rows rejected",
+            ),
+        )
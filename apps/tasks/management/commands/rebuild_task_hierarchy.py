@@ -0,0 +1,15 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.tasks.services.task_hierarchy import TaskHierarchyService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the task hierarchy closure table from Task.parent"
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with transaction.atomic():
+            count = TaskHierarchyService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} closure rows"))
@@ -0,0 +1,15 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.tasks.services.task_search import TaskSearchService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over tasks and comments"
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with transaction.atomic():
+            count = TaskSearchService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} documents"))
@@ -0,0 +1,18 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+
+from apps.tasks.services.timelog_rollup import TimeLogRollupService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily time log rollup table from the time logs"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with transaction.atomic():
+            count = TimeLogRollupService.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup rows"))
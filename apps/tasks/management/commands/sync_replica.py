@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from config.db_router import REPLICA_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database to the read replica file. With "
+        "--interval the copy repeats every N seconds, so the replica lags "
+        "behind the primary by up to that long."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Seconds between copies; 0 copies once and exits",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if REPLICA_DB_ALIAS not in settings.DATABASES:
+            raise CommandError("Set JUSK_REPLICA_DB to the replica file path")
+        replica_path = Path(str(settings.DATABASES[REPLICA_DB_ALIAS]["NAME"]))
+        try:
+            while True:
+                started = time.perf_counter()
+                self._copy(replica_path)
+                self.stdout.write(
+                    f"Replica {replica_path} synced in "
+                    f"{time.perf_counter() - started:.2f}s",
+                )
+                if not options["interval"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+    @staticmethod
+    def _copy(replica_path: Path) -> None:
+        # Копия собирается рядом и подменяет реплику целиком: читатели видят
+        # либо старый снимок, либо новый, но не наполовину записанный файл
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        temp_path = replica_path.with_name(f"{replica_path.name}.tmp")
+        target = sqlite3.connect(temp_path)
+        try:
+            primary.connection.backup(target)
+            # Реплику только читают, журнал WAL ей не нужен
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+        os.replace(temp_path, replica_path)
+        primary.close()
@@ -0,0 +1,36 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+
+from apps.tasks.services.task_hours import TaskHoursService
+
+
+class Command(BaseCommand):
+    help = "Compare rolled-up task and project hours with the time logs"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Overwrite drifted counters with the recomputed values",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with transaction.atomic():
+            drift = TaskHoursService.find_drift()
+            for entry in drift:
+                self.stdout.write(
+                    f"{entry['field']} #{entry['object_id']}: "
+                    f"stored {entry['stored']}, actual {entry['actual']}",
+                )
+            if drift and options["repair"]:
+                TaskHoursService.repair(drift)
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("No drift found"))
+        elif options["repair"]:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} counters"))
+        else:
+            self.stdout.write(
+                self.style.WARNING(f"Found {len(drift)} drifted counters"),
+            )
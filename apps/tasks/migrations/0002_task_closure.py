@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(editable=False)),
+                ('ancestor', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='tasks.task')),
+                ('descendant', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='tasks.task')),
+            ],
+            options={
+                'verbose_name': 'task closure',
+                'verbose_name_plural': 'task closures',
+                'db_table': 'task_closure',
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='task_closure__descendant_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='task_closure__ancestor_descendant_unique')],
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO task_closure (ancestor_id, descendant_id, depth)
+                WITH RECURSIVE closure (ancestor_id, descendant_id, depth) AS (
+                    SELECT id, id, 0
+                    FROM tasks
+                    UNION ALL
+                    SELECT c.ancestor_id, t.id, c.depth + 1
+                    FROM closure c
+                    INNER JOIN tasks t ON t.parent_id = c.descendant_id
+                )
+                SELECT ancestor_id, descendant_id, depth FROM closure;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_total_hours'),
+        ('tasks', '0002_task_closure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='own_hours',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtree_hours',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunSQL(
+            sql=[
+                """
+                UPDATE tasks SET own_hours = COALESCE(
+                    (SELECT SUM(l.hours) FROM task_timelogs l WHERE l.task_id = tasks.id),
+                    0
+                );
+                """,
+                """
+                UPDATE tasks SET subtree_hours = COALESCE(
+                    (
+                        SELECT SUM(l.hours)
+                        FROM task_closure c
+                        INNER JOIN task_timelogs l ON l.task_id = c.descendant_id
+                        WHERE c.ancestor_id = tasks.id
+                    ),
+                    0
+                );
+                """,
+                """
+                UPDATE projects SET total_hours = COALESCE(
+                    (
+                        SELECT SUM(l.hours)
+                        FROM task_timelogs l
+                        INNER JOIN tasks t ON t.id = l.task_id
+                        WHERE t.project_id = projects.id
+                    ),
+                    0
+                );
+                """,
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    TaskTimeLog = apps.get_model('tasks', 'TaskTimeLog')
+    TimeLogDailyRollup = apps.get_model('tasks', 'TimeLogDailyRollup')
+    db_alias = schema_editor.connection.alias
+    rows = (
+        TaskTimeLog.objects.using(db_alias)
+        .annotate(day=TruncDate('created_at'))
+        .values('task__project_id', 'task_id', 'creator_id', 'day')
+        .annotate(total=models.Sum('hours'))
+        .order_by()
+    )
+    TimeLogDailyRollup.objects.using(db_alias).bulk_create(
+        (
+            TimeLogDailyRollup(
+                project_id=row['task__project_id'],
+                task_id=row['task_id'],
+                user_id=row['creator_id'],
+                day=row['day'],
+                hours=row['total'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_total_hours'),
+        ('tasks', '0003_task_hours'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeLogDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(editable=False)),
+                ('hours', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12)),
+                ('project', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project')),
+                ('task', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tasks.task')),
+                ('user', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'daily time log rollup',
+                'verbose_name_plural': 'daily time log rollups',
+                'db_table': 'task_timelog_daily',
+                'indexes': [models.Index(fields=['project', 'day'], name='timelog_rollup__project_idx'), models.Index(fields=['user', 'day'], name='timelog_rollup__user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'user', 'day'), name='timelog_rollup__task_user_day_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
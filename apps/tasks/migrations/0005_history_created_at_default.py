@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_timelog_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskhistoryentry',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:31
+
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+EVENT_PREFIXES = {
+    'task_created': ' created',
+    'task_updated': ' updated',
+    'timelog_added': 'Added time log',
+    'timelog_updated': 'Updated time log',
+    'timelog_deleted': 'Deleted time log',
+    'comment_added': 'Left comment',
+    'comment_updated': 'Updated comment',
+    'comment_deleted': 'Deleted comment',
+}
+
+TRACKED_FIELDS = (
+    'title',
+    'description',
+    'status_id',
+    'executor_id',
+    'project_id',
+    'parent_id',
+)
+
+
+def backfill_events(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    TaskHistoryEntry = apps.get_model('tasks', 'TaskHistoryEntry')
+    Task = apps.get_model('tasks', 'Task')
+    db_alias = schema_editor.connection.alias
+    for event, marker in EVENT_PREFIXES.items():
+        entries = TaskHistoryEntry.objects.using(db_alias).filter(event='')
+        if marker.startswith(' '):
+            entries = entries.filter(text__startswith='Task #', text__endswith=marker)
+        else:
+            entries = entries.filter(text__startswith=marker)
+        entries.update(event=event)
+
+    # Текущее состояние задачи совпадает с состоянием после её последнего
+    # task_created/task_updated: от этого снимка и строится реконструкция
+    latest_ids = (
+        TaskHistoryEntry.objects.filter(
+            event__in=['task_created', 'task_updated'],
+            task_id=models.OuterRef('id'),
+        )
+        .order_by('-created_at', '-id')
+        .values('id')[:1]
+    )
+    entries = []
+    for task in (
+        Task.objects.using(db_alias)
+        .annotate(entry_id=models.Subquery(latest_ids))
+        .filter(entry_id__isnull=False)
+        .values('entry_id', *TRACKED_FIELDS)
+        .iterator()
+    ):
+        entry_id = task.pop('entry_id')
+        entries.append(TaskHistoryEntry(id=entry_id, snapshot=task))
+    TaskHistoryEntry.objects.using(db_alias).bulk_update(entries, ['snapshot'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_history_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskhistoryentry',
+            name='event',
+            field=models.CharField(
+                choices=[
+                    ('task_created', 'Task Created'),
+                    ('task_updated', 'Task Updated'),
+                    ('timelog_added', 'Timelog Added'),
+                    ('timelog_updated', 'Timelog Updated'),
+                    ('timelog_deleted', 'Timelog Deleted'),
+                    ('comment_added', 'Comment Added'),
+                    ('comment_updated', 'Comment Updated'),
+                    ('comment_deleted', 'Comment Deleted'),
+                ],
+                default='',
+                editable=False,
+                max_length=32,
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='taskhistoryentry',
+            name='changes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='taskhistoryentry',
+            name='snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_total_hours'),
+        ('tasks', '0006_history_event_changes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['executor', 'updated_at'], name='task__executor_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status', 'updated_at'], name='task__project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'parent', 'updated_at'], name='task__project_parent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['task', 'created_at'], name='task_comment__task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskhistoryentry',
+            index=models.Index(fields=['task', 'created_at'], name='task_history__task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktimelog',
+            index=models.Index(fields=['task', 'created_at'], name='task_timelog__task_created_idx'),
+        ),
+    ]
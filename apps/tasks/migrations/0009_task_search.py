@@ -0,0 +1,81 @@
+from django.db import migrations
+
+# rowid = id * 2 для задач и id * 2 + 1 для комментариев: синхронизация
+# и удаление идут по rowid, без скана по неиндексируемым колонкам
+CREATE_SQL = (
+    """
+    CREATE VIRTUAL TABLE task_search USING fts5(
+        title,
+        body,
+        task_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER task_search_task_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO task_search (rowid, title, body, task_id)
+        VALUES (new.id * 2, new.title, new.description, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_task_update AFTER UPDATE OF title, description ON tasks
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+    BEGIN
+        UPDATE task_search SET title = new.title, body = new.description
+        WHERE rowid = new.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_task_delete AFTER DELETE ON tasks BEGIN
+        DELETE FROM task_search WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_comment_insert AFTER INSERT ON task_comments BEGIN
+        INSERT INTO task_search (rowid, title, body, task_id)
+        VALUES (new.id * 2 + 1, '', new.text, new.task_id);
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_comment_update AFTER UPDATE OF text ON task_comments
+    WHEN old.text IS NOT new.text
+    BEGIN
+        UPDATE task_search SET body = new.text WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_comment_delete AFTER DELETE ON task_comments BEGIN
+        DELETE FROM task_search WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    INSERT INTO task_search (rowid, title, body, task_id)
+    SELECT id * 2, title, description, id FROM tasks
+    """,
+    """
+    INSERT INTO task_search (rowid, title, body, task_id)
+    SELECT id * 2 + 1, '', text, task_id FROM task_comments
+    """,
+)
+
+DROP_SQL = (
+    "DROP TRIGGER IF EXISTS task_search_task_insert",
+    "DROP TRIGGER IF EXISTS task_search_task_update",
+    "DROP TRIGGER IF EXISTS task_search_task_delete",
+    "DROP TRIGGER IF EXISTS task_search_comment_insert",
+    "DROP TRIGGER IF EXISTS task_search_comment_update",
+    "DROP TRIGGER IF EXISTS task_search_comment_delete",
+    "DROP TABLE IF EXISTS task_search",
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_project_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, reverse_sql=DROP_SQL),
+    ]
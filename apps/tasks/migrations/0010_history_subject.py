@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_task_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskhistoryentry',
+            name='subject_id',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
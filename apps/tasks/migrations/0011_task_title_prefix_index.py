@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:14
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_total_hours'),
+        ('tasks', '0010_history_subject'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(models.F('project'), django.db.models.functions.text.Lower('title'), name='task__project_title_idx'),
+        ),
+    ]
@@ -1,9 +1,13 @@
 from typing import TYPE_CHECKING, Any
 
 from django.core.validators import MinValueValidator
-from django.db import connection, models
+from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django_stubs_ext.db.models import TypedModelMeta
 
+from apps.tasks.services.task_forest import TaskForest
+
 if TYPE_CHECKING:
     pass
 
@@ -21,6 +25,21 @@ class WithCreatedAtAndUpdatedAt(models.Model):
         abstract = True
 
 
+class TaskQuerySet(models.QuerySet["Task"]):
+    def forest(self) -> TaskForest:
+        # Иерархия задач выборки одним запросом; предки и глубина полны,
+        # если выборка замкнута по родителям, например весь проект
+        return TaskForest(self.order_by().values_list("id", "parent_id"))
+
+    def subtrees(self) -> TaskForest:
+        # Задачи выборки вместе со всеми потомками, одним запросом по closure
+        return TaskForest(
+            TaskClosure.objects.filter(ancestor__in=self.values("id"))
+            .order_by()
+            .values_list("descendant_id", "descendant__parent_id"),
+        )
+
+
 class Task(WithCreatedAtAndUpdatedAt):
     title = models.CharField(
         max_length=128,
@@ -31,6 +50,18 @@ class Task(WithCreatedAtAndUpdatedAt):
     last_timelog_number = models.PositiveIntegerField(
         default=0,
     )
+    own_hours = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
+    subtree_hours = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
     description = models.TextField()
     executor = models.ForeignKey(
         "users.User",
@@ -64,6 +95,8 @@ class Task(WithCreatedAtAndUpdatedAt):
         blank=True,
     )
 
+    objects = TaskQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.title
 
@@ -79,24 +112,12 @@ class Task(WithCreatedAtAndUpdatedAt):
     def get_all_descendant_ids(self) -> list[int]:
         if self.descendant_ids is not None:
             return self.descendant_ids
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                    WITH RECURSIVE task_descendants AS (
-                        SELECT id
-                        FROM tasks
-                        WHERE parent_id = %s
-                        UNION ALL
-                        SELECT t.id
-                        FROM tasks t
-                        INNER JOIN task_descendants td ON td.id = t.parent_id
-                    )
-                    SELECT * FROM task_descendants;
-                    """,
-                [self.id],
-            )
-            result = cursor.fetchall()
-        self.descendant_ids = [row[0] for row in result]
+        self.descendant_ids = list(
+            TaskClosure.objects.filter(
+                ancestor_id=self.id,
+                depth__gt=0,
+            ).values_list("descendant_id", flat=True),
+        )
         return self.descendant_ids
 
     class Meta(TypedModelMeta):
@@ -104,6 +125,73 @@ class Task(WithCreatedAtAndUpdatedAt):
         verbose_name = "task"
         verbose_name_plural = "tasks"
         ordering = ["-updated_at"]
+        # Индексы под сортировку по умолчанию: выборка без temp b-tree
+        indexes = [
+            models.Index(
+                fields=["executor", "updated_at"],
+                name="task__executor_updated_idx",
+            ),
+            models.Index(
+                fields=["project", "status", "updated_at"],
+                name="task__project_status_idx",
+            ),
+            models.Index(
+                fields=["project", "parent", "updated_at"],
+                name="task__project_parent_idx",
+            ),
+            models.Index(
+                fields=["project", "updated_at"],
+                name="task__project_updated_idx",
+            ),
+            models.Index(
+                fields=["project", "created_at"],
+                name="task__project_created_idx",
+            ),
+            # Префиксный поиск заголовка в автодополнении
+            models.Index(
+                models.F("project"),
+                Lower("title"),
+                name="task__project_title_idx",
+            ),
+        ]
+
+
+class TaskClosure(models.Model):
+    # One row per (ancestor, descendant) pair, including the zero-depth row
+    # linking each task to itself. Maintained by TaskHierarchyService.
+
+    ancestor = models.ForeignKey(
+        "tasks.Task",
+        on_delete=models.CASCADE,
+        related_name="descendant_links",
+        editable=False,
+    )
+    descendant = models.ForeignKey(
+        "tasks.Task",
+        on_delete=models.CASCADE,
+        related_name="ancestor_links",
+        editable=False,
+    )
+    depth = models.PositiveIntegerField(
+        editable=False,
+    )
+
+    class Meta(TypedModelMeta):
+        db_table = "task_closure"
+        verbose_name = "task closure"
+        verbose_name_plural = "task closures"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"],
+                name="task_closure__ancestor_descendant_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["descendant", "depth"],
+                name="task_closure__descendant_idx",
+            ),
+        ]
 
 
 class TaskComment(WithCreatedAtAndUpdatedAt):
@@ -128,6 +216,12 @@ class TaskComment(WithCreatedAtAndUpdatedAt):
         verbose_name = "task comment"
         verbose_name_plural = "task comments"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["task", "created_at"],
+                name="task_comment__task_created_idx",
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["task", "number"],
@@ -136,6 +230,17 @@ class TaskComment(WithCreatedAtAndUpdatedAt):
         ]
 
 
+class TaskHistoryEvent(models.TextChoices):
+    TASK_CREATED = "task_created"
+    TASK_UPDATED = "task_updated"
+    TIMELOG_ADDED = "timelog_added"
+    TIMELOG_UPDATED = "timelog_updated"
+    TIMELOG_DELETED = "timelog_deleted"
+    COMMENT_ADDED = "comment_added"
+    COMMENT_UPDATED = "comment_updated"
+    COMMENT_DELETED = "comment_deleted"
+
+
 class TaskHistoryEntry(models.Model):
     task = models.ForeignKey(
         "tasks.Task",
@@ -144,8 +249,34 @@ class TaskHistoryEntry(models.Model):
         editable=False,
     )
     text = models.TextField()
+    event = models.CharField(
+        max_length=32,
+        choices=TaskHistoryEvent.choices,
+        editable=False,
+    )
+    # {"поле": [старое, новое]} для task_updated
+    changes = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    # Полное состояние задачи после события, пишется раз в несколько изменений
+    snapshot = models.JSONField(
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    # id комментария или записи времени для их событий. Не внешний ключ:
+    # событие удаления переживает сам объект
+    subject_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    # Не auto_now_add: время проставляется при буферизации записи,
+    # bulk_create при сбросе буфера не должен его перезаписать
     created_at = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         editable=False,
     )
     user = models.ForeignKey(
@@ -159,6 +290,12 @@ class TaskHistoryEntry(models.Model):
         verbose_name = "task history entry"
         verbose_name_plural = "task history entries"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["task", "created_at"],
+                name="task_history__task_created_idx",
+            ),
+        ]
 
 
 class TaskTimeLog(WithCreatedAtAndUpdatedAt):
@@ -194,9 +331,66 @@ class TaskTimeLog(WithCreatedAtAndUpdatedAt):
         verbose_name = "time log"
         verbose_name_plural = "time logs"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["task", "created_at"],
+                name="task_timelog__task_created_idx",
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["task", "number"],
                 name="task_timelog__task_number_unique",
             ),
         ]
+
+
+class TimeLogDailyRollup(models.Model):
+    project = models.ForeignKey(
+        "projects.Project",
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+    )
+    task = models.ForeignKey(
+        "tasks.Task",
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+    )
+    user = models.ForeignKey(
+        "users.User",
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+    )
+    day = models.DateField(
+        editable=False,
+    )
+    hours = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
+
+    class Meta(TypedModelMeta):
+        db_table = "task_timelog_daily"
+        verbose_name = "daily time log rollup"
+        verbose_name_plural = "daily time log rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["task", "user", "day"],
+                name="timelog_rollup__task_user_day_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["project", "day"],
+                name="timelog_rollup__project_idx",
+            ),
+            models.Index(
+                fields=["user", "day"],
+                name="timelog_rollup__user_idx",
+            ),
+        ]
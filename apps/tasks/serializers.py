@@ -1,8 +1,14 @@
+import datetime
+from typing import Any
+
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
 
 from apps.users.models import User
 
-from .models import TaskComment, TaskTimeLog
+from .models import Task, TaskComment, TaskHistoryEntry, TaskTimeLog
+from .services.keyset import decode_cursor
 
 
 class TimeLogSerializer(serializers.ModelSerializer[TaskTimeLog]):
@@ -23,3 +29,119 @@ class CommentSerializer(serializers.ModelSerializer[TaskComment]):
     class Meta:
         model = TaskComment
         fields = ["id", "text", "creator", "created_at", "updated_at"]
+
+
+class TimeLogEntrySerializer(TimeLogSerializer):
+    # Не is_own: страница записей одинакова для всех и может кэшироваться
+    creator_id = serializers.IntegerField(read_only=True)
+    was_updated = serializers.BooleanField(read_only=True)
+    url = serializers.SerializerMethodField()
+
+    class Meta(TimeLogSerializer.Meta):
+        fields = [
+            *TimeLogSerializer.Meta.fields,
+            "number",
+            "creator_id",
+            "was_updated",
+            "url",
+        ]
+
+    def get_url(self, timelog: TaskTimeLog) -> str:
+        return reverse(
+            "tasks:timelog_detail",
+            kwargs={"task_id": timelog.task_id, "timelog_id": timelog.id},
+        )
+
+
+class CommentEntrySerializer(CommentSerializer):
+    creator_id = serializers.IntegerField(read_only=True)
+    was_updated = serializers.BooleanField(read_only=True)
+    url = serializers.SerializerMethodField()
+
+    class Meta(CommentSerializer.Meta):
+        fields = [
+            *CommentSerializer.Meta.fields,
+            "number",
+            "creator_id",
+            "was_updated",
+            "url",
+        ]
+
+    def get_url(self, comment: TaskComment) -> str:
+        return reverse(
+            "tasks:comment_detail",
+            kwargs={"task_id": comment.task_id, "comment_id": comment.id},
+        )
+
+
+class HistoryEntrySerializer(serializers.ModelSerializer[TaskHistoryEntry]):
+    user: serializers.StringRelatedField[User] = serializers.StringRelatedField(
+        read_only=True,
+    )
+
+    class Meta:
+        model = TaskHistoryEntry
+        fields = ["id", "event", "text", "changes", "user", "created_at"]
+
+
+class BoardTaskSerializer(serializers.ModelSerializer[Task]):
+    executor: serializers.StringRelatedField[User] = serializers.StringRelatedField(
+        read_only=True,
+    )
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Task
+        fields = ["id", "title", "executor", "updated_at", "url"]
+
+    def get_url(self, task: Task) -> str:
+        return reverse("tasks:task", kwargs={"task_id": task.id})
+
+
+class KeysetQuerySerializer(serializers.Serializer[None]):
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate_cursor(self, value: str) -> Any:
+        try:
+            return decode_cursor(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e)) from e
+
+
+class ReportQuerySerializer(serializers.Serializer[None]):
+    period = serializers.ChoiceField(choices=["week", "month"], default="week")
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    user = serializers.IntegerField(required=False)
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, Any]:
+        attrs.setdefault("end", datetime.date.today())
+        attrs.setdefault("start", attrs["end"] - datetime.timedelta(days=90))
+        if attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must not be after end")
+        return attrs
+
+
+class TaskStateQuerySerializer(serializers.Serializer[None]):
+    at = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, Any]:
+        attrs.setdefault("at", timezone.now())
+        return attrs
+
+
+class TaskAutocompleteQuerySerializer(serializers.Serializer[None]):
+    q = serializers.CharField(
+        max_length=128,
+        required=False,
+        allow_blank=True,
+        default="",
+    )
+    exclude_subtree_of = serializers.IntegerField(required=False)
+
+
+class TaskSearchQuerySerializer(serializers.Serializer[None]):
+    q = serializers.CharField(max_length=128, trim_whitespace=True)
+    project = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
@@ -0,0 +1,38 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+class CacheVersions:
+    # Счётчики версий для ключей кэша: смена версии делает недоступными все
+    # значения, сохранённые под старой, без поиска и удаления самих значений
+    @staticmethod
+    def get_many(*keys: str) -> dict[str, int]:
+        versions: dict[str, int] = cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # Начальная версия от времени: пропавший из кэша счётчик
+                # не вернёт к жизни старые значения
+                version = time.time_ns()
+                if not cache.add(key, version, None):
+                    version = cache.get(key, version)
+                versions[key] = version
+        return versions
+
+    @staticmethod
+    def bump(*keys: str) -> None:
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+
+    @staticmethod
+    def invalidate(*keys: str) -> None:
+        if not keys:
+            return
+        # Сразу — для чтений в той же транзакции, после коммита — для
+        # параллельных запросов, успевших закэшировать старое значение
+        CacheVersions.bump(*keys)
+        transaction.on_commit(lambda: CacheVersions.bump(*keys))
@@ -0,0 +1,217 @@
+import hashlib
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, cast
+
+from django.db import models
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from rest_framework.request import Request
+
+from apps.projects.models import ProjectJoinRequest, ProjectMember
+from apps.tasks.models import Task, TaskComment, TaskHistoryEntry, TaskTimeLog
+from apps.tasks.services.project_membership import ProjectMembershipService
+from apps.tasks.services.task_version import TaskVersionService
+from apps.users.models import User
+
+REQUEST_ATTR = "_conditional_get"
+
+TASK_TIMESTAMPS = (
+    "updated_at",
+    "project__updated_at",
+    "parent__updated_at",
+    "comments_at",
+    "timelogs_at",
+    "history_at",
+    "children_at",
+)
+PROJECT_TIMESTAMPS = ("updated_at", "join_requests_at")
+
+
+def _aggregate(
+    queryset: models.QuerySet[Any],
+    group: str,
+    aggregate: models.Aggregate,
+) -> models.Subquery:
+    # Агрегат по связанным строкам подзапросом в SELECT основной выборки
+    return models.Subquery(
+        queryset.order_by().values(group).annotate(value=aggregate).values("value"),
+    )
+
+
+class ConditionalGetService:
+    # Валидаторы для условного GET: одна небольшая выборка меток времени и
+    # счётчиков вместо полной загрузки и рендера. ETag учитывает и то, что
+    # меткой времени не выражается (часы поддерева, состав участников), поэтому
+    # именно он главный: при If-None-Match дата из If-Modified-Since
+    # не проверяется
+    @staticmethod
+    def etag(*parts: Any) -> str:
+        return hashlib.sha1(
+            repr(parts).encode(),
+            usedforsecurity=False,
+        ).hexdigest()[:32]
+
+    @staticmethod
+    def page_parts(request: HttpRequest | Request) -> tuple[Any, ...]:
+        # HTML-страница содержит пользователя и CSRF-токен из его cookie:
+        # после смены сессии закэшированная браузером копия не годится.
+        # get_token() заводит секрет до рендера, иначе ETag первого ответа
+        # посчитается без cookie и не совпадёт со следующим запросом
+        get_token(request)
+        return request.user.id, request.META["CSRF_COOKIE"]
+
+    @staticmethod
+    def task_state(
+        request: HttpRequest | Request, task_id: int
+    ) -> Mapping[str, Any] | None:
+        cache: dict[tuple[str, int], Mapping[str, Any] | None] = (
+            request.__dict__.setdefault(REQUEST_ATTR, {})
+        )
+        key = ("task", task_id)
+        if key not in cache:
+            task = models.OuterRef("id")
+            cache[key] = (
+                ProjectMembershipService.tasks(cast(User, request.user))
+                .filter(id=task_id)
+                .values(
+                    "project_id",
+                    "subtree_hours",
+                    "updated_at",
+                    "project__updated_at",
+                    # Страница показывает название родителя и имя исполнителя:
+                    # их правка не меняет строку самой задачи
+                    "parent__updated_at",
+                    "executor__email",
+                    "executor__first_name",
+                    "executor__last_name",
+                    comments_at=_aggregate(
+                        TaskComment.objects.filter(task_id=task),
+                        "task_id",
+                        models.Max("updated_at"),
+                    ),
+                    timelogs_at=_aggregate(
+                        TaskTimeLog.objects.filter(task_id=task),
+                        "task_id",
+                        models.Max("updated_at"),
+                    ),
+                    history_at=_aggregate(
+                        TaskHistoryEntry.objects.filter(task_id=task),
+                        "task_id",
+                        models.Max("created_at"),
+                    ),
+                    children_at=_aggregate(
+                        Task.objects.filter(
+                            project_id=models.OuterRef("project_id"),
+                            parent_id=task,
+                        ),
+                        "parent_id",
+                        models.Max("updated_at"),
+                    ),
+                )
+                .first()
+            )
+        return cache[key]
+
+    @staticmethod
+    def task_activity_etag(request: HttpRequest | Request, task_id: int) -> str | None:
+        state = ConditionalGetService.task_state(request, task_id)
+        if state is None:
+            return None
+        # Удаления пишутся в историю, а версия фрагментов меняется на любое
+        # событие задачи
+        return ConditionalGetService.etag(
+            *state.values(),
+            TaskVersionService.fragment_version(task_id, state["project_id"]),
+        )
+
+    @staticmethod
+    def task_page_etag(request: HttpRequest | Request, task_id: int) -> str | None:
+        activity_etag = ConditionalGetService.task_activity_etag(request, task_id)
+        if activity_etag is None:
+            return None
+        return ConditionalGetService.etag(
+            activity_etag,
+            *ConditionalGetService.page_parts(request),
+        )
+
+    @staticmethod
+    def task_last_modified(
+        request: HttpRequest | Request, task_id: int
+    ) -> datetime | None:
+        state = ConditionalGetService.task_state(request, task_id)
+        if state is None:
+            return None
+        timestamps: list[datetime] = [
+            state[field] for field in TASK_TIMESTAMPS if state[field]
+        ]
+        return max(timestamps)
+
+    @staticmethod
+    def project_state(
+        request: HttpRequest | Request, project_id: int
+    ) -> Mapping[str, Any] | None:
+        cache: dict[tuple[str, int], Mapping[str, Any] | None] = (
+            request.__dict__.setdefault(REQUEST_ATTR, {})
+        )
+        key = ("project", project_id)
+        if key not in cache:
+            project = models.OuterRef("id")
+            cache[key] = (
+                ProjectMembershipService.projects(cast(User, request.user))
+                .filter(id=project_id)
+                .values(
+                    "owner_id",
+                    "total_hours",
+                    "updated_at",
+                    members_count=_aggregate(
+                        ProjectMember.objects.filter(project_id=project),
+                        "project_id",
+                        models.Count("id"),
+                    ),
+                    members_last_id=_aggregate(
+                        ProjectMember.objects.filter(project_id=project),
+                        "project_id",
+                        models.Max("id"),
+                    ),
+                    join_requests_count=_aggregate(
+                        ProjectJoinRequest.objects.filter(project_id=project),
+                        "project_id",
+                        models.Count("id"),
+                    ),
+                    join_requests_at=_aggregate(
+                        ProjectJoinRequest.objects.filter(project_id=project),
+                        "project_id",
+                        models.Max("created_at"),
+                    ),
+                )
+                .first()
+            )
+        return cache[key]
+
+    @staticmethod
+    def project_page_etag(
+        request: HttpRequest | Request, project_id: int
+    ) -> str | None:
+        state = ConditionalGetService.project_state(request, project_id)
+        if state is None:
+            return None
+        # Версия проекта меняется при правке статусов
+        return ConditionalGetService.etag(
+            *state.values(),
+            TaskVersionService.project_version(project_id),
+            *ConditionalGetService.page_parts(request),
+        )
+
+    @staticmethod
+    def project_last_modified(
+        request: HttpRequest | Request,
+        project_id: int,
+    ) -> datetime | None:
+        state = ConditionalGetService.project_state(request, project_id)
+        if state is None:
+            return None
+        timestamps: list[datetime] = [
+            state[field] for field in PROJECT_TIMESTAMPS if state[field]
+        ]
+        return max(timestamps)
@@ -0,0 +1,67 @@
+import base64
+import datetime
+
+from django.db import models
+from django.utils.dateparse import parse_datetime
+
+Cursor = tuple[datetime.datetime, int]
+
+
+def encode_cursor(value: datetime.datetime, pk: int) -> str:
+    return base64.urlsafe_b64encode(f"{value.isoformat()}|{pk}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        value, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError
+        return parsed, int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class KeysetPaginator[M: models.Model]:
+    # Страница всегда упорядочена по (field, id) в одном направлении: курсор
+    # указывает на последнюю отданную строку, OFFSET не используется
+    def __init__(
+        self,
+        queryset: models.QuerySet[M],
+        limit: int,
+        field: str = "created_at",
+        descending: bool = True,
+    ) -> None:
+        self.queryset = queryset
+        self.limit = limit
+        self.field = field
+        self.descending = descending
+
+    def get_queryset(self, cursor: Cursor | None = None) -> models.QuerySet[M]:
+        if self.descending:
+            queryset = self.queryset.order_by(f"-{self.field}", "-id")
+            range_lookup, strict_lookup = "lte", "lt"
+        else:
+            queryset = self.queryset.order_by(self.field, "id")
+            range_lookup, strict_lookup = "gte", "gt"
+        if cursor is not None:
+            value, pk = cursor
+            # Отдельное нестрогое условие даёт индексу диапазон по полю сортировки
+            queryset = queryset.filter(
+                models.Q(**{f"{self.field}__{range_lookup}": value}),
+                models.Q(**{f"{self.field}__{strict_lookup}": value})
+                | models.Q(**{f"id__{strict_lookup}": pk}),
+            )
+        return queryset[: self.limit + 1]
+
+    def page(self, cursor: Cursor | None = None) -> tuple[list[M], str | None]:
+        return self.split(list(self.get_queryset(cursor)))
+
+    async def apage(self, cursor: Cursor | None = None) -> tuple[list[M], str | None]:
+        return self.split([item async for item in self.get_queryset(cursor)])
+
+    def split(self, items: list[M]) -> tuple[list[M], str | None]:
+        if len(items) <= self.limit:
+            return items, None
+        last = items[self.limit - 1]
+        return items[: self.limit], encode_cursor(getattr(last, self.field), last.pk)
@@ -0,0 +1,57 @@
+from django.http import HttpRequest
+
+from apps.projects.models import Project, ProjectMember, ProjectStatus
+
+REQUEST_ATTR = "_project_access"
+
+
+class ProjectAccess:
+    # Участники и статусы проекта, загруженные один раз на запрос: проверки
+    # прав, формы и шаблоны работают с ними в памяти
+    def __init__(
+        self,
+        project: Project,
+        members: list[ProjectMember],
+        statuses: list[ProjectStatus],
+    ) -> None:
+        self.project = project
+        self.members = members
+        self.statuses = statuses
+        self.member_ids = frozenset(member.user_id for member in members)
+        self.status_ids = frozenset(status.id for status in statuses)
+
+    @staticmethod
+    def load(project: Project) -> "ProjectAccess":
+        return ProjectAccess(
+            project,
+            list(
+                ProjectMember.objects.filter(project=project)
+                .select_related("user")
+                .only(
+                    "id",
+                    "project_id",
+                    "user__id",
+                    "user__email",
+                    "user__first_name",
+                    "user__last_name",
+                )
+                .order_by("id"),
+            ),
+            list(ProjectStatus.objects.filter(project=project)),
+        )
+
+    @staticmethod
+    def for_request(request: HttpRequest, project: Project) -> "ProjectAccess":
+        cache: dict[int, ProjectAccess] = request.__dict__.setdefault(REQUEST_ATTR, {})
+        if project.id not in cache:
+            cache[project.id] = ProjectAccess.load(project)
+        return cache[project.id]
+
+    def is_member(self, user_id: int | None) -> bool:
+        return user_id in self.member_ids
+
+    def is_valid_status(self, status_id: int | None) -> bool:
+        # Пустой статус допустим только у проекта без статусов
+        if status_id:
+            return status_id in self.status_ids
+        return not self.status_ids
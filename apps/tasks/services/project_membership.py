@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, models
+
+from apps.projects.models import Project, ProjectMember
+from apps.tasks.models import Task
+from apps.tasks.services.cache_versions import CacheVersions
+from apps.users.models import User
+
+MEMBERSHIP_CACHE_TIMEOUT = 3600
+
+
+class ProjectMembershipService:
+    # Множество проектов пользователя хранится под ключом с версией:
+    # инвалидация меняет версию, и значение, прочитанное из БД до изменения,
+    # уже не попадёт под актуальный ключ
+    @staticmethod
+    def version_key(user_id: int) -> str:
+        return f"project_membership:{user_id}:version"
+
+    @staticmethod
+    def project_ids(user_id: int) -> frozenset[int]:
+        version_key = ProjectMembershipService.version_key(user_id)
+        version = CacheVersions.get_many(version_key)[version_key]
+        key = f"project_membership:{user_id}:{version}"
+        project_ids: frozenset[int] | None = cache.get(key)
+        if project_ids is None:
+            # С основной базы, как и всё, что кэшируется дольше запроса
+            project_ids = frozenset(
+                ProjectMember.objects.using(DEFAULT_DB_ALIAS)
+                .filter(user_id=user_id)
+                .values_list(
+                    "project_id",
+                    flat=True,
+                ),
+            )
+            cache.set(key, project_ids, MEMBERSHIP_CACHE_TIMEOUT)
+        return project_ids
+
+    @staticmethod
+    def is_member(user_id: int, project_id: int) -> bool:
+        return project_id in ProjectMembershipService.project_ids(user_id)
+
+    @staticmethod
+    def invalidate(*user_ids: int) -> None:
+        CacheVersions.invalidate(
+            *(ProjectMembershipService.version_key(user_id) for user_id in user_ids),
+        )
+
+    @staticmethod
+    def projects(user: User) -> models.QuerySet[Project]:
+        return Project.objects.filter(
+            id__in=ProjectMembershipService.project_ids(user.id),
+        )
+
+    @staticmethod
+    def tasks(user: User) -> models.QuerySet[Task]:
+        return Task.objects.filter(
+            project_id__in=ProjectMembershipService.project_ids(user.id),
+        )
@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+
+from apps.tasks.models import Task
+
+COUNTS_CACHE_TIMEOUT = 300
+
+
+class TaskBoardService:
+    @staticmethod
+    def counts_cache_key(project_id: int) -> str:
+        return f"task_board:{project_id}:counts"
+
+    @staticmethod
+    def column_counts(project_id: int) -> dict[int | None, int]:
+        key = TaskBoardService.counts_cache_key(project_id)
+        counts: dict[int | None, int] | None = cache.get(key)
+        if counts is None:
+            # Все колонки одним GROUP BY по (project, status) индексу. Значение
+            # живёт в кэше дольше запроса, поэтому читается с основной базы:
+            # отстающая реплика не должна попасть в кэш под новым ключом
+            counts = dict(
+                Task.objects.using(DEFAULT_DB_ALIAS)
+                .filter(project_id=project_id)
+                .order_by()
+                .values("status_id")
+                .annotate(count=models.Count("id"))
+                .values_list("status_id", "count"),
+            )
+            cache.set(key, counts, COUNTS_CACHE_TIMEOUT)
+        return counts
+
+    @staticmethod
+    def column_queryset(
+        project_id: int,
+        status_id: int | None,
+    ) -> models.QuerySet[Task]:
+        return (
+            Task.objects.filter(project_id=project_id, status_id=status_id)
+            .select_related("executor")
+            .only(
+                "id",
+                "title",
+                "updated_at",
+                "executor__id",
+                "executor__email",
+                "executor__first_name",
+                "executor__last_name",
+            )
+        )
+
+    @staticmethod
+    def invalidate(*project_ids: int) -> None:
+        # После коммита: иначе параллельный запрос успеет закэшировать
+        # счётчики, прочитанные до коммита
+        keys = [TaskBoardService.counts_cache_key(id_) for id_ in project_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
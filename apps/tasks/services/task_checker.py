@@ -1,6 +1,6 @@
 from django.forms import ValidationError
 
-from apps.projects.models import Project
+from apps.tasks.services.project_access import ProjectAccess
 from apps.tasks.services.task_history import TaskOldValues
 from apps.users.models import User
 
@@ -9,38 +9,31 @@ class TaskChecker:
     @staticmethod
     def check_all(
         status_id: int | None,
-        project: Project,
+        access: ProjectAccess,
         user: User,
         executor: User | None,
         old_values: TaskOldValues | None = None,
     ) -> None:
+        # Все проверки — по множествам из контекста проекта, без запросов
         try:
             if old_values:
                 # Проверка на изменение проекта и наличие пользователя в новом проекте
-                if old_values["project_id"] != project.id:
-                    assert project.members.filter(user=user).exists()
+                if old_values["project_id"] != access.project.id:
+                    assert access.is_member(user.id)
 
                 # Проверка на изменение исполнителя и его участие в проекте
                 if executor and old_values["executor_id"] != executor.id:
-                    assert project.members.filter(user=executor).exists()
+                    assert access.is_member(executor.id)
 
                 # Проверка на изменение статуса
                 if old_values["status_id"] != status_id:
-                    if status_id:
-                        assert project.statuses.filter(id=status_id).exists()
-                    else:
-                        assert not project.statuses.exists()
+                    assert access.is_valid_status(status_id)
             else:
                 # Пользователь должен быть участником проекта
-                assert project.members.filter(user=user).exists()
+                assert access.is_member(user.id)
                 # Исполнитель тоже должен быть участником проекта
-                assert (
-                    executor is None or project.members.filter(user=executor).exists()
-                )
+                assert executor is None or access.is_member(executor.id)
                 # Статус должен существовать в проекте (или быть пустым, если у проекта нет статусов)
-                if status_id:
-                    assert project.statuses.filter(id=status_id).exists()
-                else:
-                    assert not project.statuses.exists()
+                assert access.is_valid_status(status_id)
         except AssertionError as exc:
             raise ValidationError("The changes you made are not allowed") from exc
@@ -0,0 +1,45 @@
+from django.db import models
+
+from apps.tasks.models import Task
+from apps.tasks.services.project_membership import ProjectMembershipService
+from apps.users.models import User
+
+USER_FIELDS = ("id", "email", "first_name", "last_name")
+
+
+class TaskDetailLoader:
+    # Страница задачи читает проект, статус, исполнителя и родителя: всё это
+    # приходит одним JOIN, дети — вторым запросом, без ленивых обращений
+    @staticmethod
+    def get_queryset(user: User) -> models.QuerySet[Task]:
+        return TaskDetailLoader.select(ProjectMembershipService.tasks(user))
+
+    @staticmethod
+    def select(tasks: models.QuerySet[Task]) -> models.QuerySet[Task]:
+        return tasks.select_related("project", "status", "executor", "parent").only(
+            "id",
+            "title",
+            "description",
+            "created_at",
+            "updated_at",
+            "subtree_hours",
+            "project__id",
+            "project__title",
+            "status__id",
+            "status__name",
+            *(f"executor__{field}" for field in USER_FIELDS),
+            "parent__id",
+            "parent__title",
+        )
+
+    @staticmethod
+    def get_children(task: Task) -> models.QuerySet[Task]:
+        # project_id в фильтре позволяет пройти по task__project_parent_idx
+        return Task.objects.filter(
+            project_id=task.project_id,
+            parent_id=task.id,
+        ).only("id", "title", "updated_at")
+
+    @staticmethod
+    async def aget_children(task: Task) -> list[Task]:
+        return [child async for child in TaskDetailLoader.get_children(task)]
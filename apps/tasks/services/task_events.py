@@ -0,0 +1,43 @@
+import asyncio
+import contextlib
+import threading
+from collections import defaultdict
+from collections.abc import Iterator
+
+Waiter = tuple[asyncio.AbstractEventLoop, asyncio.Event]
+
+
+class TaskEventBroker:
+    # Оповещения внутри процесса о новых записях истории задачи. Сами события
+    # читаются из task_history: оповещение лишь будит поток раньше очередного
+    # опроса, поэтому запись из другого процесса дойдёт с задержкой опроса
+    _lock = threading.Lock()
+    _waiters: defaultdict[int, set[Waiter]] = defaultdict(set)
+
+    @classmethod
+    @contextlib.contextmanager
+    def subscribe(cls, task_id: int) -> Iterator[asyncio.Event]:
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with cls._lock:
+            cls._waiters[task_id].add(waiter)
+        try:
+            yield waiter[1]
+        finally:
+            with cls._lock:
+                cls._waiters[task_id].discard(waiter)
+                if not cls._waiters[task_id]:
+                    del cls._waiters[task_id]
+
+    @classmethod
+    def notify(cls, *task_ids: int) -> None:
+        # Вызывается из синхронного кода после коммита, в потоке запроса
+        with cls._lock:
+            waiters = [
+                waiter
+                for task_id in task_ids
+                for waiter in cls._waiters.get(task_id, ())
+            ]
+        for loop, event in waiters:
+            # Цикл отключившегося клиента мог уже закрыться
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(event.set)
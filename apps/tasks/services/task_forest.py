@@ -0,0 +1,78 @@
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from apps.tasks.models import Task
+
+
+class TaskForest:
+    # Иерархия загруженных задач в памяти; строится методами TaskQuerySet
+    # forest() и subtrees(). Для поддеревьев корни леса — загруженные
+    # корни, поэтому ancestors() и depth() считаются от них, а не от
+    # настоящих корней проекта. Запрос о задаче вне леса — ошибка
+    # вызывающего, а не пустой ответ
+    def __init__(self, pairs: Iterable[tuple[int, int | None]]) -> None:
+        self.parents: dict[int, int | None] = dict(pairs)
+        self.children: defaultdict[int, list[int]] = defaultdict(list)
+        for task_id, parent_id in self.parents.items():
+            if parent_id in self.parents:
+                self.children[parent_id].append(task_id)
+        self._subtree_sizes: dict[int, int] = {}
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self.parents
+
+    def roots(self) -> list[int]:
+        return [
+            task_id
+            for task_id, parent_id in self.parents.items()
+            if parent_id not in self.parents
+        ]
+
+    def _require(self, task_id: int) -> None:
+        if task_id not in self.parents:
+            raise KeyError(f"Task #{task_id} is not in the loaded forest")
+
+    def descendants(self, task_id: int) -> list[int]:
+        self._require(task_id)
+        result: list[int] = []
+        stack = list(self.children[task_id])
+        while stack:
+            child_id = stack.pop()
+            result.append(child_id)
+            stack.extend(self.children[child_id])
+        return result
+
+    def ancestors(self, task_id: int) -> list[int]:
+        self._require(task_id)
+        result: list[int] = []
+        parent_id = self.parents.get(task_id)
+        while parent_id is not None and parent_id in self.parents:
+            result.append(parent_id)
+            parent_id = self.parents[parent_id]
+        return result
+
+    def depth(self, task_id: int) -> int:
+        return len(self.ancestors(task_id))
+
+    def subtree_size(self, task_id: int) -> int:
+        self._require(task_id)
+        if not self._subtree_sizes:
+            # Обход в обратном порядке: дети считаются раньше родителей
+            order = self.roots()
+            position = 0
+            while position < len(order):
+                order.extend(self.children[order[position]])
+                position += 1
+            for node_id in reversed(order):
+                self._subtree_sizes[node_id] = 1 + sum(
+                    self._subtree_sizes[child_id] for child_id in self.children[node_id]
+                )
+        return self._subtree_sizes[task_id]
+
+    def attach(self, tasks: Iterable["Task"]) -> None:
+        # Заполняет кэш get_all_descendant_ids() у загруженных экземпляров
+        for task in tasks:
+            if task.id in self.parents:
+                task.descendant_ids = self.descendants(task.id)
@@ -0,0 +1,94 @@
+from django.core.exceptions import ValidationError
+from django.db import connection
+
+from apps.tasks.models import Task, TaskClosure
+from apps.tasks.services.task_hours import TaskHoursService
+
+REBUILD_CLOSURE_SQL = """
+    INSERT INTO task_closure (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE closure (ancestor_id, descendant_id, depth) AS (
+        SELECT id, id, 0
+        FROM tasks
+        UNION ALL
+        SELECT c.ancestor_id, t.id, c.depth + 1
+        FROM closure c
+        INNER JOIN tasks t ON t.parent_id = c.descendant_id
+    )
+    SELECT ancestor_id, descendant_id, depth FROM closure;
+"""
+
+
+class TaskHierarchyService:
+    @staticmethod
+    def insert(task: Task) -> None:
+        # Новая задача: ссылка на саму себя + ссылки от всех предков родителя
+        links = [TaskClosure(ancestor_id=task.id, descendant_id=task.id, depth=0)]
+        if task.parent_id:
+            links += [
+                TaskClosure(
+                    ancestor_id=ancestor_id,
+                    descendant_id=task.id,
+                    depth=depth + 1,
+                )
+                for ancestor_id, depth in TaskClosure.objects.filter(
+                    descendant_id=task.parent_id,
+                ).values_list("ancestor_id", "depth")
+            ]
+        TaskClosure.objects.bulk_create(links)
+
+    @staticmethod
+    def check_parent(task: Task, parent: Task | None, project_id: int) -> None:
+        # Для форм: проверка до сохранения, пока move() не начал менять closure
+        if parent is None:
+            return
+        if parent.project_id != project_id:
+            raise ValidationError("The parent task must belong to the same project")
+        TaskHierarchyService._check_not_in_subtree(task, parent.id)
+
+    @staticmethod
+    def _check_not_in_subtree(task: Task, parent_id: int | None) -> None:
+        # Ссылка задачи на саму себя тоже в closure: родитель-сама-себе отсекается
+        if (
+            task.id
+            and parent_id
+            and TaskClosure.objects.filter(
+                ancestor_id=task.id,
+                descendant_id=parent_id,
+            ).exists()
+        ):
+            raise ValidationError("A task cannot be moved under its own subtree")
+
+    @staticmethod
+    def move(task: Task) -> None:
+        TaskHierarchyService._check_not_in_subtree(task, task.parent_id)
+
+        TaskHoursService.shift_ancestors(task, sign=-1)
+        subtree = TaskClosure.objects.filter(ancestor_id=task.id).values(
+            "descendant_id",
+        )
+        # Отвязываем поддерево от старых предков
+        TaskClosure.objects.filter(descendant_id__in=subtree).exclude(
+            ancestor_id__in=subtree,
+        ).delete()
+        if not task.parent_id:
+            return
+        # Привязываем поддерево ко всем предкам нового родителя
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                    INSERT INTO task_closure (ancestor_id, descendant_id, depth)
+                    SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1
+                    FROM task_closure a
+                    CROSS JOIN task_closure d
+                    WHERE a.descendant_id = %s AND d.ancestor_id = %s;
+                    """,
+                [task.parent_id, task.id],
+            )
+        TaskHoursService.shift_ancestors(task, sign=1)
+
+    @staticmethod
+    def rebuild() -> int:
+        TaskClosure.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(REBUILD_CLOSURE_SQL)
+        return TaskClosure.objects.count()
@@ -1,12 +1,23 @@
+import datetime
+from collections.abc import Iterable
 from decimal import Decimal
-from typing import TypedDict
+from functools import partial
+from typing import Any, TypedDict, cast
+from weakref import WeakKeyDictionary
+
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.utils import timezone
 
 from apps.tasks.models import (
     Task,
     TaskComment,
     TaskHistoryEntry,
+    TaskHistoryEvent,
     TaskTimeLog,
 )
+from apps.tasks.services.task_events import TaskEventBroker
+from apps.tasks.services.task_version import TaskVersionService
 from apps.users.models import User
 
 
@@ -19,6 +30,17 @@ class TaskOldValues(TypedDict):
     parent_id: int | None
 
 
+TRACKED_FIELDS = tuple(TaskOldValues.__annotations__)
+
+# Снимок состояния пишется не реже чем раз в столько событий задачи,
+# поэтому реконструкция проигрывает ограниченное число диффов
+SNAPSHOT_INTERVAL = 20
+
+STATE_EVENTS = [TaskHistoryEvent.TASK_CREATED, TaskHistoryEvent.TASK_UPDATED]
+
+TaskChanges = dict[str, list[Any]]
+
+
 class TimeLogOldValues(TypedDict):
     hours: Decimal
     description: str | None
@@ -28,6 +50,64 @@ class TaskCommentOldValues(TypedDict):
     text: str
 
 
+class TaskHistoryBuffer:
+    # Буфер одной транзакции: соединение плюс его внешний atomic-блок.
+    # После отката транзакции её буфер не переиспользуется
+    _buffers: "WeakKeyDictionary[BaseDatabaseWrapper, TaskHistoryBuffer]" = (
+        WeakKeyDictionary()
+    )
+
+    def __init__(self, connection: BaseDatabaseWrapper) -> None:
+        self.connection = connection
+        self.atomic = connection.atomic_blocks[0]
+        self.entries: list[TaskHistoryEntry] = []
+        # Savepoint каждой добавленной записи, в порядке добавления
+        self.scopes: list[set[str | None]] = []
+
+    @classmethod
+    def add(
+        cls,
+        entry: TaskHistoryEntry,
+        using: str = DEFAULT_DB_ALIAS,
+    ) -> TaskHistoryEntry:
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            entry.save(using=using)
+            TaskEventBroker.notify(entry.task_id)
+            return entry
+        buffer = cls._buffers.get(connection)
+        if buffer is None or buffer.atomic is not connection.atomic_blocks[0]:
+            buffer = cls._buffers[connection] = cls(connection)
+        index = len(buffer.scopes)
+        buffer.scopes.append(set(connection.savepoint_ids))
+        # Запись попадает в буфер через собственный on_commit-колбэк:
+        # при откате savepoint Django отбросит его вместе с записью
+        transaction.on_commit(partial(buffer.collect, entry, index), using=using)
+        return entry
+
+    def collect(self, entry: TaskHistoryEntry, index: int) -> None:
+        self.entries.append(entry)
+        following = index + 1
+        if following == len(self.scopes):
+            self._buffers.pop(self.connection, None)
+        elif self.scopes[following] <= self.scopes[index]:
+            # Колбэк следующей записи зарегистрирован в тех же или внешних
+            # savepoint: раз выполнился этот, выполнится и он, сброс за ним
+            return
+        # Следующая запись могла откатиться вместе со своим savepoint, поэтому
+        # накопленное пишется сейчас. Без вложенных savepoint это один INSERT
+        # на транзакцию
+        self.flush()
+
+    def flush(self) -> None:
+        if self.entries:
+            TaskHistoryEntry.objects.using(self.connection.alias).bulk_create(
+                self.entries,
+            )
+            TaskEventBroker.notify(*{entry.task_id for entry in self.entries})
+        self.entries = []
+
+
 class TaskHistoryService:
     def __init__(
         self,
@@ -37,29 +117,115 @@ class TaskHistoryService:
         self.task = task
         self.user = user
 
-    def create(self) -> None:
-        self.task.history.create(
-            text=f"Task #{self.task.id} created",
-            created_at=self.task.created_at,
-            user=self.user,
+    def _write(
+        self,
+        event: TaskHistoryEvent,
+        text: str,
+        changes: TaskChanges | None = None,
+        snapshot: TaskOldValues | None = None,
+        subject: TaskComment | TaskTimeLog | None = None,
+    ) -> TaskHistoryEntry:
+        # Каждое событие меняет что-то на странице задачи
+        TaskVersionService.invalidate(self.task.id)
+        # Время события фиксируется сразу, запись уходит в БД после коммита
+        return TaskHistoryBuffer.add(
+            TaskHistoryEntry(
+                task=self.task,
+                user=self.user,
+                event=event,
+                text=text,
+                changes=changes or {},
+                snapshot=snapshot,
+                subject_id=subject.id if subject else None,
+                created_at=timezone.now(),
+            ),
+        )
+
+    def _snapshot(self) -> TaskOldValues:
+        return cast(
+            TaskOldValues,
+            {field: getattr(self.task, field) for field in TRACKED_FIELDS},
         )
 
-    def update(self) -> None:
-        self.task.history.create(
-            text=f"Task #{self.task.id} updated",
-            created_at=self.task.updated_at,
-            user=self.user,
+    def _needs_snapshot(self) -> bool:
+        recent_ids = (
+            self.task.history.filter(event__in=STATE_EVENTS)
+            .order_by("-created_at", "-id")
+            .values("id")[: SNAPSHOT_INTERVAL - 1]
         )
+        return not TaskHistoryEntry.objects.filter(
+            id__in=recent_ids,
+            snapshot__isnull=False,
+        ).exists()
+
+    def create(self) -> TaskHistoryEntry:
+        TaskVersionService.invalidate(self.task.parent_id)
+        return self._write(
+            TaskHistoryEvent.TASK_CREATED,
+            f"Task #{self.task.id} created",
+            snapshot=self._snapshot(),
+        )
+
+    def update(
+        self,
+        old_values: TaskOldValues,
+        changed_fields: Iterable[str],
+    ) -> TaskHistoryEntry:
+        changes: TaskChanges = {}
+        for name in changed_fields:
+            field = Task._meta.get_field(name)
+            attname = getattr(field, "attname", name)
+            if attname in TRACKED_FIELDS:
+                changes[attname] = [
+                    old_values[attname],  # type: ignore[literal-required]
+                    getattr(self.task, attname),
+                ]
+        # Страница родителя показывает список детей с их заголовками
+        if "parent_id" in changes or "title" in changes:
+            TaskVersionService.invalidate(old_values["parent_id"], self.task.parent_id)
+        text = f"Task #{self.task.id} updated"
+        if changes:
+            text += ": " + ", ".join(attname.removesuffix("_id") for attname in changes)
+        return self._write(
+            TaskHistoryEvent.TASK_UPDATED,
+            text,
+            changes=changes,
+            snapshot=self._snapshot() if self._needs_snapshot() else None,
+        )
+
+    @staticmethod
+    def state_at(task: Task, at: datetime.datetime) -> TaskOldValues | None:
+        history = task.history.filter(created_at__lte=at)
+        base = (
+            history.filter(snapshot__isnull=False)
+            .order_by("-created_at", "-id")
+            .only("id", "created_at", "snapshot")
+            .first()
+        )
+        if base is None:
+            return None
+        state = dict(base.snapshot or {})
+        for changes in (
+            history.filter(event=TaskHistoryEvent.TASK_UPDATED)
+            .filter(
+                models.Q(created_at__gt=base.created_at)
+                | models.Q(created_at=base.created_at, id__gt=base.id),
+            )
+            .order_by("created_at", "id")
+            .values_list("changes", flat=True)
+        ):
+            for field, (_, new) in changes.items():
+                state[field] = new
+        return cast(TaskOldValues, state)
 
     def add_timelog(
         self,
         timelog: TaskTimeLog,
     ) -> TaskHistoryEntry:
-        return self.task.history.create(
-            text=f"Added time log #{timelog.number}",
-            created_at=timelog.created_at,
-            user=self.user,
-            task=self.task,
+        return self._write(
+            TaskHistoryEvent.TIMELOG_ADDED,
+            f"Added time log #{timelog.number}",
+            subject=timelog,
         )
 
     def update_timelog(
@@ -72,26 +238,24 @@ class TaskHistoryService:
             or old_values["description"] != timelog.description
         ):
             return None
-        return self.task.history.create(
-            text=f"Updated time log #{timelog.number}",
-            created_at=timelog.updated_at,
-            user=self.user,
-            task=self.task,
+        return self._write(
+            TaskHistoryEvent.TIMELOG_UPDATED,
+            f"Updated time log #{timelog.number}",
+            subject=timelog,
         )
 
     def delete_timelog(self, timelog: TaskTimeLog) -> TaskHistoryEntry:
-        return self.task.history.create(
-            text=f"Deleted time log #{timelog.number}",
-            user=self.user,
-            task=self.task,
+        return self._write(
+            TaskHistoryEvent.TIMELOG_DELETED,
+            f"Deleted time log #{timelog.number}",
+            subject=timelog,
         )
 
     def add_comment(self, comment: TaskComment) -> TaskHistoryEntry:
-        return self.task.history.create(
-            text=f"Left comment #{comment.number}",
-            created_at=comment.created_at,
-            user=self.user,
-            task=self.task,
+        return self._write(
+            TaskHistoryEvent.COMMENT_ADDED,
+            f"Left comment #{comment.number}",
+            subject=comment,
         )
 
     def update_comment(
@@ -101,16 +265,15 @@ class TaskHistoryService:
     ) -> TaskHistoryEntry | None:
         if old_values["text"] == comment.text:
             return None
-        return self.task.history.create(
-            text=f"Updated comment #{comment.number}",
-            created_at=comment.updated_at,
-            user=self.user,
-            task=self.task,
+        return self._write(
+            TaskHistoryEvent.COMMENT_UPDATED,
+            f"Updated comment #{comment.number}",
+            subject=comment,
         )
 
     def delete_comment(self, comment: TaskComment) -> TaskHistoryEntry:
-        return self.task.history.create(
-            text=f"Deleted comment #{comment.number}",
-            user=self.user,
-            task=self.task,
+        return self._write(
+            TaskHistoryEvent.COMMENT_DELETED,
+            f"Deleted comment #{comment.number}",
+            subject=comment,
         )
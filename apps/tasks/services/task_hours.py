@@ -0,0 +1,172 @@
+from decimal import Decimal
+from typing import Literal, TypedDict
+
+from django.db import models
+
+from apps.projects.models import Project
+from apps.tasks.models import Task, TaskClosure, TaskTimeLog
+
+
+class HoursDrift(TypedDict):
+    field: Literal["own_hours", "subtree_hours", "total_hours"]
+    object_id: int
+    stored: Decimal
+    actual: Decimal
+
+
+HOURS_SUM = models.Sum(
+    "hours",
+    output_field=models.DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+class TaskHoursService:
+    @staticmethod
+    def apply_delta(task: Task, delta: Decimal) -> None:
+        if not delta:
+            return
+        Task.objects.filter(id=task.id).update(
+            own_hours=models.F("own_hours") + delta,
+        )
+        Task.objects.filter(
+            id__in=TaskClosure.objects.filter(descendant_id=task.id).values(
+                "ancestor_id",
+            ),
+        ).update(subtree_hours=models.F("subtree_hours") + delta)
+        Project.objects.filter(id=task.project_id).update(
+            total_hours=models.F("total_hours") + delta,
+        )
+        # Держим экземпляр в актуальном состоянии для ответа и task.save()
+        task.own_hours += delta
+        task.subtree_hours += delta
+
+    @staticmethod
+    def shift_ancestors(task: Task, sign: int) -> None:
+        # Вызывается до отвязки поддерева (sign=-1) и после привязки (sign=1)
+        subtree_hours = Task.objects.values_list("subtree_hours", flat=True).get(
+            id=task.id,
+        )
+        if not subtree_hours:
+            return
+        Task.objects.filter(
+            id__in=TaskClosure.objects.filter(
+                descendant_id=task.id,
+                depth__gt=0,
+            ).values("ancestor_id"),
+        ).update(subtree_hours=models.F("subtree_hours") + sign * subtree_hours)
+
+    @staticmethod
+    def subtract_deleted(task: Task) -> None:
+        # Вызывается перед удалением для каждой задачи каскада. Каждая снимает
+        # только собственные часы: предки вне удаляемого поддерева в сумме
+        # теряют ровно его subtree_hours, без двойного вычитания
+        own_hours = (
+            Task.objects.filter(id=task.id).values_list("own_hours", flat=True).first()
+        )
+        if not own_hours:
+            return
+        Task.objects.filter(
+            id__in=TaskClosure.objects.filter(
+                descendant_id=task.id,
+                depth__gt=0,
+            ).values("ancestor_id"),
+        ).update(subtree_hours=models.F("subtree_hours") - own_hours)
+        Project.objects.filter(id=task.project_id).update(
+            total_hours=models.F("total_hours") - own_hours,
+        )
+
+    @staticmethod
+    def change_project(task: Task, old_project_id: int) -> None:
+        own_hours = Task.objects.values_list("own_hours", flat=True).get(id=task.id)
+        if not own_hours or old_project_id == task.project_id:
+            return
+        Project.objects.filter(id=old_project_id).update(
+            total_hours=models.F("total_hours") - own_hours,
+        )
+        Project.objects.filter(id=task.project_id).update(
+            total_hours=models.F("total_hours") + own_hours,
+        )
+
+    @staticmethod
+    def find_drift() -> list[HoursDrift]:
+        own = dict(
+            TaskTimeLog.objects.values("task_id")
+            .annotate(total=HOURS_SUM)
+            .values_list("task_id", "total")
+            .order_by(),
+        )
+        subtree = dict(
+            TaskClosure.objects.values("ancestor_id")
+            .annotate(
+                total=models.Sum(
+                    "descendant__timelogs__hours",
+                    output_field=HOURS_SUM.output_field,
+                ),
+            )
+            .values_list("ancestor_id", "total")
+            .order_by(),
+        )
+        per_project = dict(
+            TaskTimeLog.objects.values("task__project_id")
+            .annotate(total=HOURS_SUM)
+            .values_list("task__project_id", "total")
+            .order_by(),
+        )
+
+        drift: list[HoursDrift] = []
+        for task_id, own_hours, subtree_hours in Task.objects.values_list(
+            "id",
+            "own_hours",
+            "subtree_hours",
+        ).iterator():
+            actual = own.get(task_id) or Decimal(0)
+            if own_hours != actual:
+                drift.append(
+                    HoursDrift(
+                        field="own_hours",
+                        object_id=task_id,
+                        stored=own_hours,
+                        actual=actual,
+                    ),
+                )
+            actual = subtree.get(task_id) or Decimal(0)
+            if subtree_hours != actual:
+                drift.append(
+                    HoursDrift(
+                        field="subtree_hours",
+                        object_id=task_id,
+                        stored=subtree_hours,
+                        actual=actual,
+                    ),
+                )
+        for project_id, total_hours in Project.objects.values_list(
+            "id",
+            "total_hours",
+        ):
+            actual = per_project.get(project_id) or Decimal(0)
+            if total_hours != actual:
+                drift.append(
+                    HoursDrift(
+                        field="total_hours",
+                        object_id=project_id,
+                        stored=total_hours,
+                        actual=actual,
+                    ),
+                )
+        return drift
+
+    @staticmethod
+    def repair(drift: list[HoursDrift]) -> None:
+        for entry in drift:
+            if entry["field"] == "total_hours":
+                Project.objects.filter(id=entry["object_id"]).update(
+                    total_hours=entry["actual"],
+                )
+            elif entry["field"] == "own_hours":
+                Task.objects.filter(id=entry["object_id"]).update(
+                    own_hours=entry["actual"],
+                )
+            else:
+                Task.objects.filter(id=entry["object_id"]).update(
+                    subtree_hours=entry["actual"],
+                )
@@ -0,0 +1,34 @@
+from typing import Literal
+
+from django.db import connection
+
+from apps.tasks.models import Task
+
+NumberColumn = Literal["last_comment_number", "last_timelog_number"]
+
+
+class TaskNumberAllocator:
+    @staticmethod
+    def reserve_comment_numbers(task: Task, count: int = 1) -> range:
+        return TaskNumberAllocator._reserve(task, "last_comment_number", count)
+
+    @staticmethod
+    def reserve_timelog_numbers(task: Task, count: int = 1) -> range:
+        return TaskNumberAllocator._reserve(task, "last_timelog_number", count)
+
+    @staticmethod
+    def _reserve(task: Task, column: NumberColumn, count: int) -> range:
+        # Один UPDATE ... RETURNING: номер выдаётся атомарно, без чтения
+        # счётчика в Python и без блокировки строки на время сохранения формы
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE tasks SET {column} = {column} + %s WHERE id = %s "
+                f"RETURNING {column}",
+                [count, task.id],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            raise Task.DoesNotExist
+        last_number: int = row[0]
+        setattr(task, column, last_number)
+        return range(last_number - count + 1, last_number + 1)
@@ -0,0 +1,152 @@
+import re
+from typing import TypedDict
+
+from django.db import connection, models
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat, Lower
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+from django.utils.html import escape
+
+from apps.users.models import User
+
+# Управляющие символы вместо тегов: snippet() отдаёт пользовательский текст,
+# который сначала экранируется, а уже потом размечается
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+SNIPPET_TOKENS = 12
+MAX_QUERY_TERMS = 8
+
+# Больше любого символа в UTF-8: верхняя граница диапазона по префиксу
+MAX_CHAR = "\U0010ffff"
+
+# Заголовок задачи весит больше текста
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+
+class TaskSearchResult(TypedDict):
+    task_id: int
+    comment_number: int | None
+    project_id: int
+    title: str
+    snippet: str
+
+
+class TaskSearchService:
+    @staticmethod
+    def build_query(text: str) -> str:
+        # Каждое слово — префиксный терм: подходит для набора на лету и не даёт
+        # пользователю написать синтаксис FTS5
+        terms = re.findall(r"\w+", text)[:MAX_QUERY_TERMS]
+        return " ".join(f'"{term}"*' for term in terms)
+
+    @staticmethod
+    def highlight(snippet: str) -> str:
+        return (
+            escape(snippet)
+            .replace(HIGHLIGHT_START, "<mark>")
+            .replace(HIGHLIGHT_END, "</mark>")
+        )
+
+    @staticmethod
+    def search(
+        user: User,
+        text: str,
+        limit: int = 20,
+        project_id: int | None = None,
+    ) -> list[TaskSearchResult]:
+        query = TaskSearchService.build_query(text)
+        if not query:
+            return []
+        project_filter = "AND t.project_id = %s" if project_id is not None else ""
+        params: list[str | int | float] = [
+            HIGHLIGHT_START,
+            HIGHLIGHT_END,
+            SNIPPET_TOKENS,
+            query,
+            user.id,
+        ]
+        if project_id is not None:
+            params.append(project_id)
+        params += [TITLE_WEIGHT, BODY_WEIGHT, limit]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                    SELECT
+                        t.id,
+                        c.number,
+                        t.project_id,
+                        t.title,
+                        snippet(task_search, -1, %s, %s, '…', %s)
+                    FROM task_search s
+                    INNER JOIN tasks t ON t.id = s.task_id
+                    LEFT JOIN task_comments c
+                        ON s.rowid %% 2 = 1 AND c.id = s.rowid / 2
+                    WHERE task_search MATCH %s
+                        AND t.project_id IN (
+                            SELECT project_id FROM project_members WHERE user_id = %s
+                        )
+                        {project_filter}
+                    ORDER BY bm25(task_search, %s, %s)
+                    LIMIT %s
+                """,
+                params,
+            )
+            rows = cursor.fetchall()
+        return [
+            TaskSearchResult(
+                task_id=task_id,
+                comment_number=comment_number,
+                project_id=task_project_id,
+                title=title,
+                snippet=TaskSearchService.highlight(snippet),
+            )
+            for task_id, comment_number, task_project_id, title, snippet in rows
+        ]
+
+    @staticmethod
+    def match_condition(text: str) -> models.Q:
+        # Для админки: подзапрос без проверки членства и без ранжирования
+        query = TaskSearchService.build_query(text)
+        if not query:
+            return models.Q(pk__in=[])
+        return models.Q(
+            id__in=RawSQL(
+                "SELECT task_id FROM task_search WHERE task_search MATCH %s",
+                [query],
+            ),
+        )
+
+    @staticmethod
+    def title_prefix_condition(prefix: str) -> models.Q:
+        # LIKE без учёта регистра SQLite по индексу не ведёт, поэтому префикс
+        # ищется диапазоном по lower(title) из индекса task__project_title_idx.
+        # lower() в SQLite, как и LIKE, складывает регистр только у ASCII
+        title = Lower("title")
+        start = Lower(models.Value(prefix))
+        return models.Q(
+            GreaterThanOrEqual(title, start),
+            LessThan(title, Concat(start, models.Value(MAX_CHAR))),
+        )
+
+    @staticmethod
+    def rebuild() -> int:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM task_search")
+            cursor.execute(
+                """
+                    INSERT INTO task_search (rowid, title, body, task_id)
+                    SELECT id * 2, title, description, id FROM tasks
+                """,
+            )
+            count = int(cursor.rowcount)
+            cursor.execute(
+                """
+                    INSERT INTO task_search (rowid, title, body, task_id)
+                    SELECT id * 2 + 1, '', text, task_id FROM task_comments
+                """,
+            )
+            count += cursor.rowcount
+            # Сливаем b-tree сегменты индекса в один
+            cursor.execute("INSERT INTO task_search (task_search) VALUES ('optimize')")
+        return count
@@ -0,0 +1,35 @@
+from apps.tasks.services.cache_versions import CacheVersions
+
+
+class TaskVersionService:
+    # Версия фрагментов страницы задачи: своя у задачи (поля, дети,
+    # комментарии) и у проекта (название проекта, имена статусов)
+    @staticmethod
+    def task_key(task_id: int) -> str:
+        return f"task:{task_id}:version"
+
+    @staticmethod
+    def project_key(project_id: int) -> str:
+        return f"task_project:{project_id}:version"
+
+    @staticmethod
+    def fragment_version(task_id: int, project_id: int) -> str:
+        task_key = TaskVersionService.task_key(task_id)
+        project_key = TaskVersionService.project_key(project_id)
+        versions = CacheVersions.get_many(task_key, project_key)
+        return f"{versions[task_key]}.{versions[project_key]}"
+
+    @staticmethod
+    def project_version(project_id: int) -> int:
+        project_key = TaskVersionService.project_key(project_id)
+        return CacheVersions.get_many(project_key)[project_key]
+
+    @staticmethod
+    def invalidate(*task_ids: int | None) -> None:
+        CacheVersions.invalidate(
+            *(TaskVersionService.task_key(id_) for id_ in task_ids if id_),
+        )
+
+    @staticmethod
+    def invalidate_project(project_id: int) -> None:
+        CacheVersions.invalidate(TaskVersionService.project_key(project_id))
@@ -0,0 +1,155 @@
+import csv
+import datetime
+import json
+from collections.abc import AsyncIterator, Iterator
+from typing import Any, TypedDict
+
+from django.db import models
+from django.utils import timezone
+
+from apps.projects.models import ProjectMember
+from apps.tasks.models import TaskTimeLog
+from apps.tasks.services.keyset import KeysetPaginator, decode_cursor
+from apps.users.models import User
+
+EXPORT_COLUMNS = [
+    "id",
+    "created_at",
+    "project_id",
+    "project",
+    "task_id",
+    "task",
+    "number",
+    "user_id",
+    "user",
+    "hours",
+    "description",
+]
+
+
+class TimeLogExportFilters(TypedDict):
+    start: datetime.date | None
+    end: datetime.date | None
+    project_id: int | None
+    user_id: int | None
+
+
+class _Echo:
+    def write(self, value: str) -> str:
+        return value
+
+
+class TimeLogExportService:
+    def __init__(
+        self,
+        user: User,
+        filters: TimeLogExportFilters,
+        chunk_size: int = 2000,
+    ) -> None:
+        self.user = user
+        self.filters = filters
+        self.chunk_size = chunk_size
+
+    def get_queryset(self) -> models.QuerySet[TaskTimeLog]:
+        timelogs = TaskTimeLog.objects.filter(
+            task__project_id__in=ProjectMember.objects.filter(
+                user=self.user,
+            ).values("project_id"),
+        )
+        if (project_id := self.filters["project_id"]) is not None:
+            timelogs = timelogs.filter(task__project_id=project_id)
+        if (user_id := self.filters["user_id"]) is not None:
+            timelogs = timelogs.filter(creator_id=user_id)
+        if start := self.filters["start"]:
+            timelogs = timelogs.filter(created_at__gte=self._day_start(start))
+        if end := self.filters["end"]:
+            timelogs = timelogs.filter(
+                created_at__lt=self._day_start(end + datetime.timedelta(days=1)),
+            )
+        return (
+            timelogs.select_related("creator", "task__project")
+            .only(
+                "id",
+                "created_at",
+                "number",
+                "hours",
+                "description",
+                "creator__id",
+                "creator__email",
+                "creator__first_name",
+                "creator__last_name",
+                "task__id",
+                "task__title",
+                "task__project__id",
+                "task__project__title",
+            )
+            .order_by("created_at", "id")
+        )
+
+    def rows(self) -> Iterator[dict[str, Any]]:
+        for timelog in self.get_queryset().iterator(chunk_size=self.chunk_size):
+            yield self._row(timelog)
+
+    async def arows(self) -> AsyncIterator[dict[str, Any]]:
+        # Под ASGI синхронный генератор StreamingHttpResponse вычитывается
+        # целиком в память. Здесь каждая порция читается отдельным запросом
+        # по ключу (created_at, id), между порциями поток отдаёт строки
+        paginator = KeysetPaginator(
+            self.get_queryset(),
+            self.chunk_size,
+            field="created_at",
+            descending=False,
+        )
+        cursor = None
+        while True:
+            timelogs, next_cursor = await paginator.apage(cursor)
+            for timelog in timelogs:
+                yield self._row(timelog)
+            if next_cursor is None:
+                return
+            cursor = decode_cursor(next_cursor)
+
+    def stream_csv(self) -> Iterator[str]:
+        writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_COLUMNS)
+        # Заголовок уходит клиенту ещё до выполнения запроса
+        yield writer.writeheader()
+        for row in self.rows():
+            yield writer.writerow(row)
+
+    async def astream_csv(self) -> AsyncIterator[str]:
+        writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_COLUMNS)
+        yield writer.writeheader()
+        async for row in self.arows():
+            yield writer.writerow(row)
+
+    def stream_ndjson(self) -> Iterator[str]:
+        for row in self.rows():
+            yield self._json_line(row)
+
+    async def astream_ndjson(self) -> AsyncIterator[str]:
+        async for row in self.arows():
+            yield self._json_line(row)
+
+    @staticmethod
+    def _row(timelog: TaskTimeLog) -> dict[str, Any]:
+        return {
+            "id": timelog.id,
+            "created_at": timelog.created_at.isoformat(),
+            "project_id": timelog.task.project.id,
+            "project": timelog.task.project.title,
+            "task_id": timelog.task.id,
+            "task": timelog.task.title,
+            "number": timelog.number,
+            "user_id": timelog.creator.id,
+            "user": str(timelog.creator),
+            "hours": f"{timelog.hours:.2f}",
+            "description": timelog.description or "",
+        }
+
+    @staticmethod
+    def _json_line(row: dict[str, Any]) -> str:
+        return json.dumps(row, ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def _day_start(day: datetime.date) -> datetime.datetime:
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
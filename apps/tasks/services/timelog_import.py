@@ -0,0 +1,247 @@
+import csv
+import datetime
+import io
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from itertools import islice
+from typing import IO, Any, TypedDict
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.projects.models import ProjectMember
+from apps.tasks.models import (
+    Task,
+    TaskHistoryEntry,
+    TaskHistoryEvent,
+    TaskTimeLog,
+)
+from apps.tasks.services.task_events import TaskEventBroker
+from apps.tasks.services.task_hours import TaskHoursService
+from apps.tasks.services.task_numbers import TaskNumberAllocator
+from apps.tasks.services.task_version import TaskVersionService
+from apps.tasks.services.timelog_rollup import RollupKey, TimeLogRollupService
+from apps.users.models import User
+
+MAX_HOURS = Decimal("999.99")
+
+
+class TimeLogImportRow(TypedDict):
+    row: int
+    task_id: int
+    creator_id: int
+    hours: Decimal
+    description: str | None
+    created_at: datetime.datetime | None
+
+
+class TimeLogImportError(TypedDict):
+    row: int
+    errors: list[str]
+
+
+class TimeLogImportResult(TypedDict):
+    created: int
+    errors: list[TimeLogImportError]
+
+
+class TimeLogImportService:
+    def __init__(
+        self,
+        user: User,
+        batch_size: int = 1000,
+        allow_user_override: bool = False,
+    ) -> None:
+        self.user = user
+        self.batch_size = batch_size
+        # Колонка user записывает время на другого участника. Это доступно
+        # только администратору через команду, в API автор всегда тот,
+        # кто импортирует
+        self.allow_user_override = allow_user_override
+        # Все проверки доступа идут по заранее загруженным множествам
+        members = ProjectMember.objects.filter(
+            project_id__in=ProjectMember.objects.filter(user=user).values(
+                "project_id",
+            ),
+        ).values_list("project_id", "user_id", "user__email")
+        self.member_ids: defaultdict[int, set[int]] = defaultdict(set)
+        self.user_ids_by_email: dict[str, int] = {}
+        for project_id, user_id, email in members:
+            self.member_ids[project_id].add(user_id)
+            self.user_ids_by_email[email.lower()] = user_id
+        self.task_projects: dict[int, int] = dict(
+            Task.objects.filter(project_id__in=list(self.member_ids))
+            .order_by()
+            .values_list("id", "project_id"),
+        )
+
+    @staticmethod
+    def read_csv(stream: IO[bytes]) -> Iterator[dict[str, Any]]:
+        yield from csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig"))
+
+    def import_rows(self, rows: Iterable[Any]) -> TimeLogImportResult:
+        result = TimeLogImportResult(created=0, errors=[])
+        valid_rows = self._validate(rows, result["errors"])
+        while batch := list(islice(valid_rows, self.batch_size)):
+            result["created"] += self._import_batch(batch)
+        return result
+
+    def _validate(
+        self,
+        rows: Iterable[Any],
+        errors: list[TimeLogImportError],
+    ) -> Iterator[TimeLogImportRow]:
+        for number, raw in enumerate(rows, start=1):
+            # JSON может прислать вместо строки что угодно: ошибка только
+            # у этой строки, остальные импортируются
+            if not isinstance(raw, dict):
+                errors.append(
+                    TimeLogImportError(row=number, errors=["expected an object"]),
+                )
+                continue
+            row_errors: list[str] = []
+
+            task_id = None
+            try:
+                task_id = int(raw.get("task") or raw.get("task_id") or "")
+            except (TypeError, ValueError):
+                row_errors.append("task: a task id is required")
+            project_id = self.task_projects.get(task_id) if task_id else None
+            if task_id and project_id is None:
+                row_errors.append(f"task: task #{task_id} not found")
+
+            creator_id = self.user.id
+            if email := str(raw.get("user") or "").strip().lower():
+                creator_id = self.user_ids_by_email.get(email, 0)
+            if creator_id != self.user.id and not self.allow_user_override:
+                row_errors.append("user: time can only be logged as yourself")
+            elif (
+                project_id is not None and creator_id not in self.member_ids[project_id]
+            ):
+                row_errors.append("user: not a member of the task's project")
+
+            hours = Decimal(0)
+            try:
+                hours = Decimal(str(raw.get("hours", "")).strip())
+                if not (0 < hours <= MAX_HOURS) or hours != round(hours, 2):
+                    raise InvalidOperation
+            except InvalidOperation:
+                row_errors.append("hours: expected a number from 0.01 to 999.99")
+
+            created_at = None
+            if value := str(raw.get("created_at") or "").strip():
+                created_at = self._parse_created_at(value)
+                if created_at is None:
+                    row_errors.append("created_at: expected an ISO date or datetime")
+
+            if row_errors or task_id is None:
+                errors.append(TimeLogImportError(row=number, errors=row_errors))
+                continue
+            yield TimeLogImportRow(
+                row=number,
+                task_id=task_id,
+                creator_id=creator_id,
+                hours=hours,
+                description=raw.get("description") or None,
+                created_at=created_at,
+            )
+
+    def _import_batch(self, batch: list[TimeLogImportRow]) -> int:
+        rows_by_task: defaultdict[int, list[TimeLogImportRow]] = defaultdict(list)
+        for row in batch:
+            rows_by_task[row["task_id"]].append(row)
+        now = timezone.now()
+
+        with transaction.atomic():
+            tasks = Task.objects.only(
+                "id",
+                "project_id",
+                "own_hours",
+                "subtree_hours",
+            ).in_bulk(list(rows_by_task))
+            timelogs: list[TaskTimeLog] = []
+            for task_id, task_rows in rows_by_task.items():
+                numbers = TaskNumberAllocator.reserve_timelog_numbers(
+                    tasks[task_id],
+                    len(task_rows),
+                )
+                timelogs += [
+                    TaskTimeLog(
+                        task_id=task_id,
+                        number=number,
+                        creator_id=row["creator_id"],
+                        hours=row["hours"],
+                        description=row["description"],
+                    )
+                    for number, row in zip(numbers, task_rows, strict=True)
+                ]
+            TaskTimeLog.objects.bulk_create(timelogs, batch_size=self.batch_size)
+
+            # auto_now_add перезаписывает дату при вставке, исторические
+            # даты проставляем отдельным bulk_update
+            dated = []
+            for timelog, row in zip(
+                timelogs,
+                (row for task_rows in rows_by_task.values() for row in task_rows),
+                strict=True,
+            ):
+                if row["created_at"]:
+                    timelog.created_at = timelog.updated_at = row["created_at"]
+                    dated.append(timelog)
+            if dated:
+                TaskTimeLog.objects.bulk_update(
+                    dated,
+                    ["created_at", "updated_at"],
+                    batch_size=self.batch_size,
+                )
+
+            TaskHistoryEntry.objects.bulk_create(
+                (
+                    TaskHistoryEntry(
+                        task_id=timelog.task_id,
+                        user=self.user,
+                        event=TaskHistoryEvent.TIMELOG_ADDED,
+                        text=f"Added time log #{timelog.number}",
+                        subject_id=timelog.id,
+                    )
+                    for timelog in timelogs
+                ),
+                batch_size=self.batch_size,
+            )
+
+            rollup: defaultdict[RollupKey, Decimal] = defaultdict(Decimal)
+            for timelog in timelogs:
+                rollup[
+                    (
+                        tasks[timelog.task_id].project_id,
+                        timelog.task_id,
+                        timelog.creator_id,
+                        timezone.localdate(timelog.created_at or now),
+                    )
+                ] += timelog.hours
+            TimeLogRollupService.apply_many(rollup)
+            for task_id, task_rows in rows_by_task.items():
+                TaskHoursService.apply_delta(
+                    tasks[task_id],
+                    sum((row["hours"] for row in task_rows), Decimal(0)),
+                )
+            Task.objects.filter(id__in=list(rows_by_task)).update(updated_at=now)
+            # История пишется напрямую, минуя TaskHistoryService
+            TaskVersionService.invalidate(*rows_by_task)
+            transaction.on_commit(partial(TaskEventBroker.notify, *rows_by_task))
+        return len(timelogs)
+
+    @staticmethod
+    def _parse_created_at(value: str) -> datetime.datetime | None:
+        try:
+            parsed = parse_datetime(value)
+            if parsed is None and (day := parse_date(value)):
+                parsed = datetime.datetime.combine(day, datetime.time.min)
+        except ValueError:
+            return None
+        if parsed is not None and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
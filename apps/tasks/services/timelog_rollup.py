@@ -0,0 +1,155 @@
+import datetime
+from decimal import Decimal
+from typing import Literal, TypedDict
+
+from django.db import connection, models
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from apps.tasks.models import Task, TaskTimeLog, TimeLogDailyRollup
+
+Period = Literal["week", "month"]
+
+PERIOD_TRUNC = {
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+ROLLUP_HOURS_SUM = models.Sum(
+    "hours",
+    output_field=models.DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+class TimesheetRow(TypedDict):
+    period: datetime.date
+    user_id: int
+    hours: Decimal
+
+
+class BurnRow(TypedDict):
+    period: datetime.date
+    hours: Decimal
+    cumulative_hours: Decimal
+
+
+RollupKey = tuple[int, int, int, datetime.date]  # project, task, user, day
+
+
+class TimeLogRollupService:
+    @staticmethod
+    def apply(timelog: TaskTimeLog, delta: Decimal) -> None:
+        TimeLogRollupService.apply_many(
+            {
+                (
+                    timelog.task.project_id,
+                    timelog.task_id,
+                    timelog.creator_id,
+                    timezone.localdate(timelog.created_at),
+                ): delta,
+            },
+        )
+
+    @staticmethod
+    def apply_many(deltas: dict[RollupKey, Decimal]) -> None:
+        params = [(*key, delta) for key, delta in deltas.items() if delta]
+        if not params:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                """
+                    INSERT INTO task_timelog_daily
+                        (project_id, task_id, user_id, day, hours)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (task_id, user_id, day)
+                    DO UPDATE SET hours = task_timelog_daily.hours + excluded.hours;
+                    """,
+                params,
+            )
+
+    @staticmethod
+    def change_project(task: Task) -> None:
+        TimeLogDailyRollup.objects.filter(task_id=task.id).update(
+            project_id=task.project_id,
+        )
+
+    @staticmethod
+    def rebuild(batch_size: int = 1000) -> int:
+        TimeLogDailyRollup.objects.all().delete()
+        rows = (
+            TaskTimeLog.objects.annotate(day=TruncDate("created_at"))
+            .values("task__project_id", "task_id", "creator_id", "day")
+            .annotate(total=ROLLUP_HOURS_SUM)
+            .order_by()
+        )
+        created = TimeLogDailyRollup.objects.bulk_create(
+            (
+                TimeLogDailyRollup(
+                    project_id=row["task__project_id"],
+                    task_id=row["task_id"],
+                    user_id=row["creator_id"],
+                    day=row["day"],
+                    hours=row["total"],
+                )
+                for row in rows.iterator(chunk_size=batch_size)
+            ),
+            batch_size=batch_size,
+        )
+        return len(created)
+
+
+class TimeLogReportService:
+    @staticmethod
+    def timesheet(
+        period: Period,
+        start: datetime.date,
+        end: datetime.date,
+        project_id: int | None = None,
+        user_id: int | None = None,
+    ) -> list[TimesheetRow]:
+        rollups = TimeLogDailyRollup.objects.filter(day__gte=start, day__lte=end)
+        if project_id is not None:
+            rollups = rollups.filter(project_id=project_id)
+        if user_id is not None:
+            rollups = rollups.filter(user_id=user_id)
+        return [
+            TimesheetRow(
+                period=row["period"],
+                user_id=row["user_id"],
+                hours=row["total"],
+            )
+            for row in rollups.annotate(period=PERIOD_TRUNC[period]("day"))
+            .values("period", "user_id")
+            .annotate(total=ROLLUP_HOURS_SUM)
+            .order_by("period", "user_id")
+        ]
+
+    @staticmethod
+    def project_burn(
+        project_id: int,
+        period: Period,
+        start: datetime.date,
+        end: datetime.date,
+    ) -> list[BurnRow]:
+        rollups = TimeLogDailyRollup.objects.filter(project_id=project_id)
+        before_start = rollups.filter(day__lt=start).aggregate(
+            total=ROLLUP_HOURS_SUM,
+        )
+        cumulative = before_start["total"] or Decimal(0)
+        rows: list[BurnRow] = []
+        for row in (
+            rollups.filter(day__gte=start, day__lte=end)
+            .annotate(period=PERIOD_TRUNC[period]("day"))
+            .values("period")
+            .annotate(total=ROLLUP_HOURS_SUM)
+            .order_by("period")
+        ):
+            cumulative += row["total"]
+            rows.append(
+                BurnRow(
+                    period=row["period"],
+                    hours=row["total"],
+                    cumulative_hours=cumulative,
+                ),
+            )
+        return rows
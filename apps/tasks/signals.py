@@ -0,0 +1,40 @@
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.projects.models import ProjectMember
+from apps.tasks.models import Task
+from apps.tasks.services.project_membership import ProjectMembershipService
+from apps.tasks.services.task_hours import TaskHoursService
+
+
+# Сигналы, а не вызовы во вьюхах: участников удаляют и каскадом вместе
+# с проектом или пользователем, и из админки
+@receiver(post_save, sender=ProjectMember)
+def invalidate_membership_on_save(
+    sender: type[ProjectMember],
+    instance: ProjectMember,
+    **kwargs: Any,
+) -> None:
+    ProjectMembershipService.invalidate(instance.user_id)
+
+
+@receiver(post_delete, sender=ProjectMember)
+def invalidate_membership_on_delete(
+    sender: type[ProjectMember],
+    instance: ProjectMember,
+    **kwargs: Any,
+) -> None:
+    ProjectMembershipService.invalidate(instance.user_id)
+
+
+# До удаления: после него связей в task_closure уже нет. Задачи удаляют
+# каскадом с родителем, проектом или пользователем и из админки
+@receiver(pre_delete, sender=Task)
+def subtract_hours_on_delete(
+    sender: type[Task],
+    instance: Task,
+    **kwargs: Any,
+) -> None:
+    TaskHoursService.subtract_deleted(instance)
@@ -0,0 +1,24 @@
+// Alpine-компонент виджета AutocompleteSelect
+function autocompleteSelect() {
+  return {
+    query: "",
+
+    async search() {
+      const select = this.$refs.select;
+      const url = new URL(select.dataset.url, window.location.origin);
+      url.searchParams.set("q", this.query);
+      const response = await fetch(url);
+      if (!response.ok) return;
+      const data = await response.json();
+
+      const selected = select.selectedOptions[0];
+      for (const option of [...select.options]) {
+        if (option.value && option !== selected) option.remove();
+      }
+      for (const item of data.results) {
+        if (selected && String(item.id) === selected.value) continue;
+        select.add(new Option(item.text, item.id));
+      }
+    },
+  };
+}
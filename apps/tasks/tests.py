@@ -1,2 +1,2374 @@
+import asyncio
+import contextlib
+import csv
+import datetime
+import importlib
+import io
+import json
+import tempfile
+from collections.abc import Callable
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, cast
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models, transaction
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.projects.models import Project, ProjectMember, ProjectStatus
+from apps.tasks.admin import TaskAdminForm
+from apps.tasks.forms.task_filter import NO_STATUS, TASK_LIST_SORTS
+from apps.tasks.models import (
+    Task,
+    TaskClosure,
+    TaskComment,
+    TaskHistoryEntry,
+    TaskHistoryEvent,
+    TaskTimeLog,
+    TimeLogDailyRollup,
+)
+from apps.tasks.services.keyset import KeysetPaginator
+from apps.tasks.services.project_access import ProjectAccess
+from apps.tasks.services.project_membership import ProjectMembershipService
+from apps.tasks.services.task_board import TaskBoardService
+from apps.tasks.services.task_checker import TaskChecker
+from apps.tasks.services.task_events import TaskEventBroker
+from apps.tasks.services.task_hierarchy import TaskHierarchyService
+from apps.tasks.services.task_history import (
+    SNAPSHOT_INTERVAL,
+    TRACKED_FIELDS,
+    TaskHistoryService,
+    TaskOldValues,
+)
+from apps.tasks.services.task_hours import TaskHoursService
+from apps.tasks.services.task_numbers import TaskNumberAllocator
+from apps.tasks.services.task_search import TaskSearchService
+from apps.tasks.services.timelog_export import (
+    EXPORT_COLUMNS,
+    TimeLogExportFilters,
+    TimeLogExportService,
+)
+from apps.tasks.services.timelog_import import TimeLogImportService
+from apps.tasks.services.timelog_rollup import (
+    TimeLogReportService,
+    TimeLogRollupService,
+)
+from apps.tasks.views import (
+    AsyncTaskEventsView,
+    AsyncTaskView,
+    AsyncTimeLogExportView,
+    HomeView,
+    ProjectTasksView,
+    TaskAutocompleteAPIView,
+    TaskCommentsAPIView,
+    TaskHistoryAPIView,
+    TaskTimeLogsAPIView,
+    TaskView,
+)
+from apps.users.models import User
+from config.db_router import (
+    REPLICA_DB_ALIAS,
+    STICKY_COOKIE,
+    PrimaryReplicaRouter,
+    ReplicaRoutingMiddleware,
+)
+
+MONDAY = datetime.date(2026, 3, 2)
+APRIL_FIRST = datetime.date(2026, 4, 1)
+
+
+class TaskHierarchyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="tree@example.com", password="x")
+        cls.project = Project.objects.create(title="Tree", owner=cls.user)
+
+    def create(self, title: str, parent: Task | None = None) -> Task:
+        task = Task.objects.create(
+            title=title,
+            description="",
+            creator=self.user,
+            project=self.project,
+            parent=parent,
+        )
+        TaskHierarchyService.insert(task)
+        return task
+
+    @staticmethod
+    def closure() -> set[tuple[int, int, int]]:
+        return set(
+            TaskClosure.objects.values_list("ancestor_id", "descendant_id", "depth"),
+        )
+
+    def assert_matches_rebuild(self) -> None:
+        maintained = self.closure()
+        TaskHierarchyService.rebuild()
+        self.assertEqual(maintained, self.closure())
+
+    def test_insert_and_move(self) -> None:
+        root = self.create("Root")
+        a = self.create("A", root)
+        b = self.create("B", a)
+        c = self.create("C", b)
+        other = self.create("Other")
+        self.assertIn((root.id, c.id, 3), self.closure())
+        self.assert_matches_rebuild()
+
+        # Поддерево B переезжает под другой корень вместе с C
+        b.parent = other
+        b.save(update_fields=["parent"])
+        TaskHierarchyService.move(b)
+        closure = self.closure()
+        self.assertIn((other.id, c.id, 2), closure)
+        self.assertNotIn((root.id, c.id, 3), closure)
+        self.assert_matches_rebuild()
+
+        # И в корень
+        b.parent = None
+        b.save(update_fields=["parent"])
+        TaskHierarchyService.move(b)
+        self.assertNotIn((other.id, c.id, 2), self.closure())
+        self.assert_matches_rebuild()
+
+    def test_move_under_own_subtree(self) -> None:
+        root = self.create("Root")
+        child = self.create("Child", root)
+        grandchild = self.create("Grandchild", child)
+        before = self.closure()
+        for parent in [child, grandchild]:
+            root.parent = parent
+            with self.subTest(parent=parent.title), self.assertRaises(ValidationError):
+                TaskHierarchyService.move(root)
+        self.assertEqual(before, self.closure())
+
+    def test_admin_rejects_invalid_parent(self) -> None:
+        root = self.create("Root")
+        child = self.create("Child", root)
+        other_project = Project.objects.create(title="Elsewhere", owner=self.user)
+        foreign = Task.objects.create(
+            title="Foreign",
+            description="",
+            creator=self.user,
+            project=other_project,
+        )
+        before = self.closure()
+        self.client.force_login(
+            User.objects.create_superuser(email="admin@example.com", password="x"),
+        )
+        url = reverse("admin:tasks_task_change", args=[root.id])
+        for parent, message in [
+            (root, "own subtree"),
+            (child, "own subtree"),
+            (foreign, "same project"),
+        ]:
+            with self.subTest(parent=parent.title):
+                response = self.client.post(
+                    url,
+                    {
+                        "title": "Root",
+                        "description": "x",
+                        "project": self.project.id,
+                        "parent": parent.id,
+                    },
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(message, str(response.context["errors"]))
+        root.refresh_from_db()
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(before, self.closure())
+
+        other_root = self.create("Other root")
+        response = self.client.post(
+            url,
+            {
+                "title": "Root",
+                "description": "x",
+                "project": self.project.id,
+                "parent": other_root.id,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn((other_root.id, child.id, 2), self.closure())
+
+    def test_migration_backfill(self) -> None:
+        root = self.create("Root")
+        self.create("Leaf", self.create("Middle", root))
+        expected = self.closure()
+        backfill = importlib.import_module(
+            "apps.tasks.migrations.0002_task_closure",
+        ).Migration.operations[1]
+        TaskClosure.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(backfill.sql)
+        self.assertEqual(expected, self.closure())
+
+
+class TaskForestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        user = User.objects.create_user(email="forest@example.com", password="x")
+        cls.project = Project.objects.create(title="Forest", owner=user)
+
+        def create(title: str, parent: Task | None = None) -> Task:
+            task = Task.objects.create(
+                title=title,
+                description="",
+                creator=user,
+                project=cls.project,
+                parent=parent,
+            )
+            TaskHierarchyService.insert(task)
+            return task
+
+        cls.root = create("Root")
+        cls.middle = create("Middle", cls.root)
+        cls.leaf = create("Leaf", cls.middle)
+        cls.sibling = create("Sibling", cls.middle)
+        cls.other_root = create("Other root")
+
+    def test_project_forest(self) -> None:
+        forest = Task.objects.filter(project=self.project).forest()
+        self.assertCountEqual(forest.roots(), [self.root.id, self.other_root.id])
+        self.assertCountEqual(
+            forest.descendants(self.root.id),
+            [self.middle.id, self.leaf.id, self.sibling.id],
+        )
+        self.assertEqual(forest.ancestors(self.leaf.id), [self.middle.id, self.root.id])
+        self.assertEqual(forest.depth(self.leaf.id), 2)
+        self.assertEqual(forest.subtree_size(self.root.id), 4)
+        self.assertEqual(forest.subtree_size(self.other_root.id), 1)
+
+    def test_subtrees(self) -> None:
+        with self.assertNumQueries(1):
+            forest = Task.objects.filter(id=self.middle.id).subtrees()
+        self.assertEqual(forest.roots(), [self.middle.id])
+        self.assertNotIn(self.root.id, forest)
+        # Глубина и предки отсчитываются от загруженного корня
+        self.assertEqual(forest.depth(self.leaf.id), 1)
+        self.assertEqual(forest.ancestors(self.leaf.id), [self.middle.id])
+        self.assertEqual(forest.subtree_size(self.middle.id), 3)
+
+        for method in [
+            forest.descendants,
+            forest.ancestors,
+            forest.depth,
+            forest.subtree_size,
+        ]:
+            with self.subTest(method=method.__name__), self.assertRaises(KeyError):
+                method(self.root.id)
+
+    def test_attach(self) -> None:
+        tasks = list(Task.objects.filter(id__in=[self.middle.id, self.leaf.id]))
+        Task.objects.filter(id__in=[self.middle.id]).subtrees().attach(tasks)
+        middle, leaf = sorted(tasks, key=lambda task: task.id)
+        with self.assertNumQueries(0):
+            self.assertCountEqual(
+                middle.get_all_descendant_ids(),
+                [self.leaf.id, self.sibling.id],
+            )
+            self.assertEqual(leaf.get_all_descendant_ids(), [])
+        # Экземпляры вне леса не трогаются: кэш заполнится своим запросом
+        other_root = Task.objects.get(id=self.other_root.id)
+        Task.objects.filter(id=self.middle.id).subtrees().attach([other_root])
+        self.assertIsNone(other_root.descendant_ids)
+
+    def test_project_task_list(self) -> None:
+        self.client.force_login(self.project.owner)
+        ProjectMember.objects.create(project=self.project, user=self.project.owner)
+        url = reverse("tasks:project_tasks", args=[self.project.id])
+        response = self.client.get(url)
+        counts = {
+            task.id: len(task.get_all_descendant_ids())
+            for task in response.context["tasks"]
+        }
+        self.assertEqual(
+            counts,
+            {
+                self.root.id: 3,
+                self.middle.id: 2,
+                self.leaf.id: 0,
+                self.sibling.id: 0,
+                self.other_root.id: 0,
+            },
+        )
+        # Подзадачи страницы не добавляют по запросу на задачу
+        Task.objects.create(
+            title="Extra",
+            description="",
+            creator=self.project.owner,
+            project=self.project,
+        )
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        for _ in range(3):
+            TaskHierarchyService.insert(
+                Task.objects.create(
+                    title="More",
+                    description="",
+                    creator=self.project.owner,
+                    project=self.project,
+                    parent=self.leaf,
+                ),
+            )
+        with self.assertNumQueries(len(before)):
+            self.client.get(url)
+
+
+class TaskHoursTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="hours@example.com", password="x")
+        cls.project = Project.objects.create(title="Hours", owner=cls.user)
+        cls.other_project = Project.objects.create(title="Other", owner=cls.user)
+
+    def setUp(self) -> None:
+        self.root = self.create("Root")
+        self.child = self.create("Child", self.root)
+        self.grandchild = self.create("Grandchild", self.child)
+        self.log(self.grandchild, "3")
+        self.log(self.child, "2")
+
+    def create(self, title: str, parent: Task | None = None) -> Task:
+        task = Task.objects.create(
+            title=title,
+            description="",
+            creator=self.user,
+            project=self.project,
+            parent=parent,
+        )
+        TaskHierarchyService.insert(task)
+        return task
+
+    def log(self, task: Task, hours: str) -> None:
+        task.last_timelog_number += 1
+        task.save(update_fields=["last_timelog_number"])
+        TaskTimeLog.objects.create(
+            task=task,
+            number=task.last_timelog_number,
+            creator=self.user,
+            hours=Decimal(hours),
+        )
+        TaskHoursService.apply_delta(task, Decimal(hours))
+
+    def hours(self, task: Task) -> tuple[Decimal, Decimal]:
+        return Task.objects.values_list("own_hours", "subtree_hours").get(id=task.id)
+
+    def total(self, project: Project) -> Decimal:
+        return Project.objects.values_list("total_hours", flat=True).get(
+            id=project.id,
+        )
+
+    def test_apply_delta(self) -> None:
+        self.assertEqual(self.hours(self.root), (0, 5))
+        self.assertEqual(self.hours(self.child), (2, 5))
+        self.assertEqual(self.hours(self.grandchild), (3, 3))
+        self.assertEqual(self.total(self.project), 5)
+        self.assertEqual(TaskHoursService.find_drift(), [])
+
+    def test_move_shifts_ancestors(self) -> None:
+        new_root = self.create("New root")
+        self.child.parent = new_root
+        self.child.save(update_fields=["parent"])
+        TaskHierarchyService.move(self.child)
+        self.assertEqual(self.hours(self.root), (0, 0))
+        self.assertEqual(self.hours(new_root), (0, 5))
+        self.assertEqual(TaskHoursService.find_drift(), [])
+
+    def test_change_project(self) -> None:
+        self.grandchild.project = self.other_project
+        self.grandchild.save(update_fields=["project"])
+        TaskHoursService.change_project(self.grandchild, self.project.id)
+        self.assertEqual(self.total(self.project), 2)
+        self.assertEqual(self.total(self.other_project), 3)
+        self.assertEqual(TaskHoursService.find_drift(), [])
+
+    def test_delete_subtracts_hours(self) -> None:
+        self.grandchild.delete()
+        self.assertEqual(self.hours(self.root), (0, 2))
+        self.assertEqual(self.total(self.project), 2)
+        self.assertEqual(TaskHoursService.find_drift(), [])
+
+        # Каскад: поддерево снимается с предков один раз
+        top = self.create("Top")
+        self.root.parent = top
+        self.root.save(update_fields=["parent"])
+        TaskHierarchyService.move(self.root)
+        self.assertEqual(self.hours(top), (0, 2))
+        Task.objects.filter(id=self.child.id).delete()
+        self.assertEqual(self.hours(top), (0, 0))
+        self.assertEqual(self.hours(self.root), (0, 0))
+        self.assertEqual(self.total(self.project), 0)
+        self.assertEqual(TaskHoursService.find_drift(), [])
+
+    def test_verify_command_repairs_drift(self) -> None:
+        Task.objects.filter(id=self.root.id).update(subtree_hours=7)
+        Project.objects.filter(id=self.project.id).update(total_hours=1)
+        out = io.StringIO()
+        call_command("verify_task_hours", stdout=out)
+        self.assertIn("Found 2 drifted counters", out.getvalue())
+        self.assertEqual(self.hours(self.root), (0, 7))
+
+        out = io.StringIO()
+        call_command("verify_task_hours", "--repair", stdout=out)
+        self.assertIn("Repaired 2 counters", out.getvalue())
+        self.assertEqual(TaskHoursService.find_drift(), [])
+
+
+class TaskNumberAllocatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="numbers@example.com", password="x")
+        cls.project = Project.objects.create(title="Numbers", owner=cls.user)
+        cls.other_project = Project.objects.create(title="Other", owner=cls.user)
+
+    def create(self, project: Project) -> Task:
+        task = Task.objects.create(
+            title="Task",
+            description="",
+            creator=self.user,
+            project=project,
+        )
+        TaskHierarchyService.insert(task)
+        return task
+
+    def counters(self, task: Task) -> tuple[int, int]:
+        return Task.objects.values_list(
+            "last_comment_number",
+            "last_timelog_number",
+        ).get(id=task.id)
+
+    def test_sequential_allocation(self) -> None:
+        task = self.create(self.project)
+        self.assertEqual(TaskNumberAllocator.reserve_comment_numbers(task), range(1, 2))
+        self.assertEqual(TaskNumberAllocator.reserve_comment_numbers(task), range(2, 3))
+        self.assertEqual(
+            TaskNumberAllocator.reserve_comment_numbers(task, 3),
+            range(3, 6),
+        )
+        self.assertEqual(task.last_comment_number, 5)
+        self.assertEqual(TaskNumberAllocator.reserve_timelog_numbers(task), range(1, 2))
+        self.assertEqual(self.counters(task), (5, 1))
+
+    def test_no_reuse_after_delete(self) -> None:
+        task = self.create(self.project)
+        for number in TaskNumberAllocator.reserve_comment_numbers(task, 2):
+            TaskComment.objects.create(
+                task=task,
+                number=number,
+                text="x",
+                creator=self.user,
+            )
+        TaskComment.objects.filter(task=task, number=2).delete()
+        self.assertEqual(TaskNumberAllocator.reserve_comment_numbers(task), range(3, 4))
+
+    def test_sequence_per_task(self) -> None:
+        first = self.create(self.project)
+        second = self.create(self.project)
+        foreign = self.create(self.other_project)
+        TaskNumberAllocator.reserve_comment_numbers(first, 4)
+        self.assertEqual(
+            TaskNumberAllocator.reserve_comment_numbers(second),
+            range(1, 2),
+        )
+        self.assertEqual(
+            TaskNumberAllocator.reserve_comment_numbers(foreign),
+            range(1, 2),
+        )
+        self.assertEqual(
+            TaskNumberAllocator.reserve_comment_numbers(first), range(5, 6)
+        )
+
+    def test_missing_task(self) -> None:
+        task = self.create(self.project)
+        Task.objects.filter(id=task.id).delete()
+        with self.assertRaises(Task.DoesNotExist):
+            TaskNumberAllocator.reserve_timelog_numbers(task)
+
+    def test_admin_keeps_counters(self) -> None:
+        task = self.create(self.project)
+        TaskNumberAllocator.reserve_comment_numbers(task)
+        clean = TaskAdminForm.clean
+
+        def concurrent_clean(form: TaskAdminForm) -> dict[str, Any]:
+            # Объект формы уже загружен: параллельный запрос выдаёт номера
+            # и добавляет часы до сохранения
+            TaskNumberAllocator.reserve_comment_numbers(task, 2)
+            TaskNumberAllocator.reserve_timelog_numbers(task)
+            TaskHoursService.apply_delta(task, Decimal(3))
+            return clean(form)
+
+        self.client.force_login(
+            User.objects.create_superuser(email="admin@example.com", password="x"),
+        )
+        with mock.patch.object(TaskAdminForm, "clean", concurrent_clean):
+            response = self.client.post(
+                reverse("admin:tasks_task_change", args=[task.id]),
+                {
+                    "title": "Renamed",
+                    "description": "x",
+                    "project": self.project.id,
+                },
+            )
+        self.assertEqual(response.status_code, 302)
+        task.refresh_from_db()
+        self.assertEqual(task.title, "Renamed")
+        self.assertEqual(self.counters(task), (3, 1))
+        self.assertEqual((task.own_hours, task.subtree_hours), (3, 3))
+
+
+class TimeLogRollupTests(TestCase):
+    """Инкрементальный учёт совпадает с пересборкой из журналов."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="rollup@example.com", password="x")
+        cls.other = User.objects.create_user(email="mate@example.com", password="x")
+        cls.project = Project.objects.create(title="Rollup", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.other)
+        cls.task = Task.objects.create(
+            title="First",
+            description="",
+            creator=cls.user,
+            project=cls.project,
+        )
+        cls.second = Task.objects.create(
+            title="Second",
+            description="",
+            creator=cls.user,
+            project=cls.project,
+        )
+
+    def log(
+        self,
+        task: Task,
+        user: User,
+        hours: str,
+        day: datetime.date,
+    ) -> TaskTimeLog:
+        timelog = TaskTimeLog.objects.create(
+            task=task,
+            number=TaskTimeLog.objects.filter(task=task).count() + 1,
+            creator=user,
+            hours=Decimal(hours),
+        )
+        TaskTimeLog.objects.filter(id=timelog.id).update(
+            created_at=timezone.make_aware(
+                datetime.datetime.combine(day, datetime.time(12)),
+            ),
+        )
+        timelog.refresh_from_db()
+        TimeLogRollupService.apply(timelog, timelog.hours)
+        return timelog
+
+    @staticmethod
+    def rollups() -> set[tuple[int, int, int, datetime.date, Decimal]]:
+        # Удаление оставляет нулевую строку, пересборка её не создаёт
+        return set(
+            TimeLogDailyRollup.objects.exclude(hours=0).values_list(
+                "project_id",
+                "task_id",
+                "user_id",
+                "day",
+                "hours",
+            ),
+        )
+
+    def seed(self) -> None:
+        self.log(self.task, self.user, "1.50", MONDAY)
+        self.log(self.task, self.user, "2.00", MONDAY)
+        self.log(self.task, self.other, "3.00", MONDAY + datetime.timedelta(days=2))
+        self.log(self.second, self.user, "4.00", MONDAY + datetime.timedelta(days=7))
+        self.log(self.second, self.other, "0.25", APRIL_FIRST)
+
+    def test_incremental_matches_rebuild(self) -> None:
+        self.seed()
+        edited = self.log(self.task, self.other, "5.00", MONDAY)
+        edited.hours = Decimal("4.25")
+        edited.save()
+        TimeLogRollupService.apply(edited, Decimal("-0.75"))
+        deleted = self.log(self.second, self.user, "2.00", APRIL_FIRST)
+        deleted.delete()
+        TimeLogRollupService.apply(deleted, -deleted.hours)
+        TimeLogRollupService.apply_many(
+            {
+                (self.project.id, self.task.id, self.user.id, MONDAY): Decimal(0),
+            },
+        )
+
+        incremental = self.rollups()
+        self.assertIn(
+            (self.project.id, self.task.id, self.user.id, MONDAY, Decimal("3.50")),
+            incremental,
+        )
+        self.assertEqual(TimeLogRollupService.rebuild(), 5)
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_timesheet(self) -> None:
+        self.seed()
+        end = APRIL_FIRST
+        self.assertEqual(
+            TimeLogReportService.timesheet("week", MONDAY, end),
+            [
+                {"period": MONDAY, "user_id": self.user.id, "hours": Decimal("3.5")},
+                {"period": MONDAY, "user_id": self.other.id, "hours": Decimal(3)},
+                {
+                    "period": MONDAY + datetime.timedelta(days=7),
+                    "user_id": self.user.id,
+                    "hours": Decimal(4),
+                },
+                {
+                    "period": datetime.date(2026, 3, 30),
+                    "user_id": self.other.id,
+                    "hours": Decimal("0.25"),
+                },
+            ],
+        )
+        self.assertEqual(
+            TimeLogReportService.timesheet(
+                "month",
+                MONDAY,
+                end,
+                project_id=self.project.id,
+                user_id=self.user.id,
+            ),
+            [
+                {
+                    "period": datetime.date(2026, 3, 1),
+                    "user_id": self.user.id,
+                    "hours": Decimal("7.5"),
+                },
+            ],
+        )
+        self.assertEqual(
+            TimeLogReportService.timesheet("month", APRIL_FIRST, end),
+            [
+                {
+                    "period": datetime.date(2026, 4, 1),
+                    "user_id": self.other.id,
+                    "hours": Decimal("0.25"),
+                },
+            ],
+        )
+
+    def test_project_burn(self) -> None:
+        self.seed()
+        # Часы до начала периода входят в накопленный итог
+        self.assertEqual(
+            TimeLogReportService.project_burn(
+                self.project.id,
+                "week",
+                MONDAY + datetime.timedelta(days=7),
+                APRIL_FIRST,
+            ),
+            [
+                {
+                    "period": MONDAY + datetime.timedelta(days=7),
+                    "hours": Decimal(4),
+                    "cumulative_hours": Decimal("10.5"),
+                },
+                {
+                    "period": datetime.date(2026, 3, 30),
+                    "hours": Decimal("0.25"),
+                    "cumulative_hours": Decimal("10.75"),
+                },
+            ],
+        )
+
+    def test_report_views(self) -> None:
+        self.seed()
+        self.client.force_login(self.other)
+        response = self.client.get(
+            reverse("tasks:my_timesheet"),
+            {"period": "month", "start": MONDAY, "end": APRIL_FIRST},
+        )
+        self.assertEqual(
+            response.json()["rows"],
+            [
+                {
+                    "period": "2026-03-01",
+                    "user_id": self.other.id,
+                    "user": str(self.other),
+                    "hours": "3.00",
+                },
+                {
+                    "period": "2026-04-01",
+                    "user_id": self.other.id,
+                    "user": str(self.other),
+                    "hours": "0.25",
+                },
+            ],
+        )
+        response = self.client.get(
+            reverse("tasks:project_burn", args=[self.project.id]),
+            {"start": APRIL_FIRST, "end": MONDAY},
+        )
+        self.assertEqual(response.status_code, 400)
+
+        outsider = User.objects.create_user(email="out@example.com", password="x")
+        self.client.force_login(outsider)
+        for name in ["tasks:project_timesheet", "tasks:project_burn"]:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=[self.project.id]))
+                self.assertEqual(response.status_code, 404)
+
+
+class TimeLogExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(
+            email="export@example.com",
+            password="x",
+            first_name="Ann",
+            last_name="Lee",
+        )
+        cls.other = User.objects.create_user(
+            email="colleague@example.com", password="x"
+        )
+        cls.project = Project.objects.create(title="Export", owner=cls.user)
+        cls.second_project = Project.objects.create(title="Second", owner=cls.user)
+        cls.hidden_project = Project.objects.create(title="Hidden", owner=cls.other)
+        for project, user in [
+            (cls.project, cls.user),
+            (cls.project, cls.other),
+            (cls.second_project, cls.user),
+            (cls.hidden_project, cls.other),
+        ]:
+            ProjectMember.objects.create(project=project, user=user)
+        cls.logs = {}
+        for key, project, user, hours, day in [
+            ("first", cls.project, cls.user, "1.50", MONDAY),
+            ("colleague", cls.project, cls.other, "2.00", MONDAY),
+            ("second", cls.second_project, cls.user, "3.00", APRIL_FIRST),
+            ("hidden", cls.hidden_project, cls.other, "4.00", MONDAY),
+        ]:
+            task = Task.objects.create(
+                title=f"{key.title()}, task",
+                description="",
+                creator=user,
+                project=project,
+            )
+            timelog = TaskTimeLog.objects.create(
+                task=task,
+                number=1,
+                creator=user,
+                hours=Decimal(hours),
+                description=f"Worked on\n{key}",
+            )
+            # Крайние минуты суток: граница end включает весь день
+            TaskTimeLog.objects.filter(id=timelog.id).update(
+                created_at=timezone.make_aware(
+                    datetime.datetime.combine(day, datetime.time(23, 59)),
+                ),
+            )
+            cls.logs[key] = timelog
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user)
+
+    def export(self, **params: Any) -> list[dict[str, str]]:
+        response = self.client.get(reverse("tasks:timelog_export"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(content.splitlines()[0], ",".join(EXPORT_COLUMNS))
+        return list(csv.DictReader(io.StringIO(content)))
+
+    def ids(self, **params: Any) -> list[int]:
+        return [int(row["id"]) for row in self.export(**params)]
+
+    def test_membership_scoping(self) -> None:
+        self.assertEqual(
+            self.ids(),
+            [self.logs[key].id for key in ["first", "colleague", "second"]],
+        )
+        # Чужой проект не раскрывается и явным фильтром
+        self.assertEqual(self.ids(project=self.hidden_project.id), [])
+
+    def test_filters(self) -> None:
+        for params, keys in [
+            ({"project": self.second_project.id}, ["second"]),
+            ({"user": self.other.id}, ["colleague"]),
+            ({"start": APRIL_FIRST}, ["second"]),
+            ({"end": MONDAY}, ["first", "colleague"]),
+            ({"start": MONDAY, "end": MONDAY, "user": self.user.id}, ["first"]),
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.ids(**params),
+                    [self.logs[key].id for key in keys],
+                )
+
+    def test_csv_row(self) -> None:
+        timelog = self.logs["first"]
+        timelog.refresh_from_db()
+        [row] = self.export(user=self.user.id, project=self.project.id)
+        self.assertEqual(
+            row,
+            {
+                "id": str(timelog.id),
+                "created_at": timelog.created_at.isoformat(),
+                "project_id": str(self.project.id),
+                "project": "Export",
+                "task_id": str(timelog.task_id),
+                "task": "First, task",
+                "number": "1",
+                "user_id": str(self.user.id),
+                "user": str(self.user),
+                "hours": "1.50",
+                "description": "Worked on\nfirst",
+            },
+        )
+
+    def test_ndjson(self) -> None:
+        response = self.client.get(
+            reverse("tasks:timelog_export"),
+            {"format": "ndjson", "project": self.second_project.id},
+        )
+        [line] = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(line)["hours"], "3.00")
+
+    def test_invalid_filters(self) -> None:
+        response = self.client.get(
+            reverse("tasks:timelog_export"),
+            {"start": APRIL_FIRST, "end": MONDAY},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("end", response.json())
+
+    @override_settings(ROOT_URLCONF="config.urls_asgi")
+    async def test_async_export(self) -> None:
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("tasks:timelog_export"))
+        self.assertIs(response.resolver_match.func.view_class, AsyncTimeLogExportView)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(
+            [int(row["id"]) for row in csv.DictReader(io.StringIO(content.decode()))],
+            [self.logs[key].id for key in ["first", "colleague", "second"]],
+        )
+
+        # Порции по одной строке: две записи с одинаковым created_at
+        # разделяются по id без пропусков и повторов
+        export = TimeLogExportService(
+            user=self.user,
+            filters=TimeLogExportFilters(
+                start=None,
+                end=None,
+                project_id=None,
+                user_id=None,
+            ),
+            chunk_size=1,
+        )
+        rows = [row async for row in export.arows()]
+        self.assertEqual(rows, await sync_to_async(lambda: list(export.rows()))())
+
+
+class TimeLogImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="import@example.com", password="x")
+        cls.other = User.objects.create_user(email="Mate@Example.com", password="x")
+        cls.outsider = User.objects.create_user(
+            email="outsider@example.com",
+            password="x",
+        )
+        cls.project = Project.objects.create(title="Import", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.other)
+        hidden_project = Project.objects.create(title="Hidden", owner=cls.outsider)
+        ProjectMember.objects.create(project=hidden_project, user=cls.outsider)
+
+        def create(title: str, **kwargs: Any) -> Task:
+            task = Task.objects.create(
+                title=title,
+                description="",
+                creator=cls.user,
+                **kwargs,
+            )
+            TaskHierarchyService.insert(task)
+            return task
+
+        cls.parent = create("Parent", project=cls.project)
+        cls.task = create("Child", project=cls.project, parent=cls.parent)
+        cls.hidden_task = create("Hidden", project=hidden_project)
+
+    def import_rows(
+        self,
+        rows: list[Any],
+        batch_size: int = 1000,
+        allow_user_override: bool = True,
+    ) -> Any:
+        service = TimeLogImportService(
+            user=self.user,
+            batch_size=batch_size,
+            allow_user_override=allow_user_override,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            return service.import_rows(rows)
+
+    def test_mixed_rows(self) -> None:
+        result = self.import_rows(
+            [
+                {"task": self.task.id, "hours": "1.5"},
+                [1, 2],
+                None,
+                {"task": "abc", "hours": "1"},
+                {"task": self.hidden_task.id, "hours": "1"},
+                {"task": self.task.id, "hours": "1000"},
+                {"task": self.task.id, "hours": "1.555"},
+                {"task": self.task.id, "hours": "0"},
+                {"task": self.task.id, "hours": "1", "user": self.outsider.email},
+                {"task": self.task.id, "hours": "1", "created_at": "yesterday"},
+                {"task_id": str(self.task.id), "hours": 2, "user": " mate@example.COM"},
+            ],
+        )
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(
+            [(error["row"], error["errors"]) for error in result["errors"]],
+            [
+                (2, ["expected an object"]),
+                (3, ["expected an object"]),
+                (4, ["task: a task id is required"]),
+                (5, [f"task: task #{self.hidden_task.id} not found"]),
+                (6, ["hours: expected a number from 0.01 to 999.99"]),
+                (7, ["hours: expected a number from 0.01 to 999.99"]),
+                (8, ["hours: expected a number from 0.01 to 999.99"]),
+                (9, ["user: not a member of the task's project"]),
+                (10, ["created_at: expected an ISO date or datetime"]),
+            ],
+        )
+        self.assertEqual(
+            list(
+                TaskTimeLog.objects.order_by("number").values_list(
+                    "creator_id",
+                    "hours",
+                ),
+            ),
+            [(self.user.id, Decimal("1.5")), (self.other.id, Decimal(2))],
+        )
+
+    def test_user_override(self) -> None:
+        rows = [
+            {"task": self.task.id, "hours": "1", "user": self.user.email},
+            {"task": self.task.id, "hours": "1", "user": self.other.email},
+            {"task": self.task.id, "hours": "1", "user": "nobody@example.com"},
+        ]
+        result = self.import_rows(rows, allow_user_override=False)
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(
+            [(error["row"], error["errors"]) for error in result["errors"]],
+            [
+                (2, ["user: time can only be logged as yourself"]),
+                (3, ["user: time can only be logged as yourself"]),
+            ],
+        )
+
+        # Участник проекта не записывает время на коллегу через API
+        self.client.force_login(self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("tasks:timelog_import"),
+                rows,
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(
+            [error["row"] for error in response.json()["errors"]],
+            [1, 3],
+        )
+        self.assertEqual(
+            list(TaskTimeLog.objects.order_by("id").values_list("creator_id")),
+            [(self.user.id,), (self.other.id,)],
+        )
+
+    def test_non_object_rows_via_api(self) -> None:
+        self.client.force_login(self.user)
+        url = reverse("tasks:timelog_import")
+        for payload, rows in [([1, 2], [1, 2]), ({"rows": [None]}, [1])]:
+            with self.subTest(payload=payload):
+                response = self.client.post(
+                    url,
+                    payload,
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["created"], 0)
+                self.assertEqual(
+                    [error["row"] for error in response.json()["errors"]],
+                    rows,
+                )
+
+    def test_numbers_per_task(self) -> None:
+        TaskNumberAllocator.reserve_timelog_numbers(self.task, 2)
+        # Партии по две строки: номера задачи идут подряд и через границу партии
+        self.import_rows(
+            [
+                {"task": self.task.id, "hours": "1"},
+                {"task": self.parent.id, "hours": "1"},
+                {"task": self.task.id, "hours": "1"},
+                {"task": self.task.id, "hours": "1"},
+            ],
+            batch_size=2,
+        )
+        self.assertEqual(
+            list(
+                TaskTimeLog.objects.filter(task=self.task)
+                .order_by("id")
+                .values_list("number", flat=True),
+            ),
+            [3, 4, 5],
+        )
+        self.assertEqual(
+            list(TaskTimeLog.objects.filter(task=self.parent).values_list("number")),
+            [(1,)],
+        )
+        self.task.refresh_from_db()
+        self.parent.refresh_from_db()
+        self.assertEqual(self.task.last_timelog_number, 5)
+        self.assertEqual(self.parent.last_timelog_number, 1)
+
+    def test_side_effects(self) -> None:
+        self.import_rows(
+            [
+                {
+                    "task": self.task.id,
+                    "hours": "2.50",
+                    "description": "Imported",
+                    "created_at": "2026-03-02",
+                },
+                {"task": self.parent.id, "hours": "1"},
+            ],
+        )
+        self.task.refresh_from_db()
+        self.parent.refresh_from_db()
+        self.project.refresh_from_db()
+        self.assertEqual(self.task.own_hours, Decimal("2.5"))
+        self.assertEqual(self.task.subtree_hours, Decimal("2.5"))
+        self.assertEqual(self.parent.own_hours, Decimal(1))
+        self.assertEqual(self.parent.subtree_hours, Decimal("3.5"))
+        self.assertEqual(self.project.total_hours, Decimal("3.5"))
+
+        timelog = TaskTimeLog.objects.get(task=self.task)
+        self.assertEqual(timelog.description, "Imported")
+        self.assertEqual(timezone.localdate(timelog.created_at), MONDAY)
+        self.assertEqual(
+            set(
+                TimeLogDailyRollup.objects.values_list("task_id", "day", "hours"),
+            ),
+            {
+                (self.task.id, MONDAY, Decimal("2.5")),
+                (self.parent.id, timezone.localdate(), Decimal(1)),
+            },
+        )
+        entry = TaskHistoryEntry.objects.get(task=self.task)
+        self.assertEqual(entry.event, TaskHistoryEvent.TIMELOG_ADDED)
+        self.assertEqual(entry.subject_id, timelog.id)
+        self.assertEqual(entry.text, "Added time log #1")
+        self.assertEqual(entry.user, self.user)
+
+    def test_command(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = Path(directory) / "timelogs.csv"
+            csv_path.write_text(
+                "task,hours,description,user,created_at\n"
+                f"{self.task.id},1.25,From CSV,mate@example.com,2026-03-02T10:00\n"
+                f"{self.task.id},oops,,,\n",
+                encoding="utf-8",
+            )
+            json_path = Path(directory) / "timelogs.json"
+            json_path.write_text(
+                json.dumps({"rows": [{"task": self.parent.id, "hours": "2"}, 5]}),
+            )
+            for path, created in [(csv_path, 1), (json_path, 1)]:
+                stdout, stderr = io.StringIO(), io.StringIO()
+                with self.subTest(path=path.name):
+                    call_command(
+                        "import_timelogs",
+                        path,
+                        user=self.user.email,
+                        stdout=stdout,
+                        stderr=stderr,
+                    )
+                    self.assertIn(
+                        f"Imported {created} time logs, 1 rows rejected",
+                        stdout.getvalue(),
+                    )
+                    self.assertIn("row 2: ", stderr.getvalue())
+
+            json_path.write_text('"rows"')
+            with self.assertRaisesMessage(CommandError, "Expected a JSON list"):
+                call_command("import_timelogs", json_path, user=self.user.email)
+        with self.assertRaisesMessage(CommandError, "not found"):
+            call_command("import_timelogs", csv_path, user="nobody@example.com")
+        self.assertEqual(
+            TaskTimeLog.objects.get(task=self.task).creator_id,
+            self.other.id,
+        )
+        self.assertEqual(TaskTimeLog.objects.get(task=self.parent).hours, Decimal(2))
+
+
+class TaskHistoryBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="buffer@example.com", password="x")
+        cls.project = Project.objects.create(title="Buffer", owner=cls.user)
+        cls.task = Task.objects.create(
+            title="Buffered",
+            description="",
+            creator=cls.user,
+            project=cls.project,
+        )
+
+    def setUp(self) -> None:
+        self.history_service = TaskHistoryService(task=self.task, user=self.user)
+
+    def comment(self, number: int) -> TaskHistoryEntry:
+        return self.history_service.add_comment(
+            TaskComment(id=number, task=self.task, number=number),
+        )
+
+    @staticmethod
+    def written() -> list[str]:
+        return list(
+            TaskHistoryEntry.objects.order_by("id").values_list("text", flat=True),
+        )
+
+    @staticmethod
+    def inserts(queries: CaptureQueriesContext) -> int:
+        return sum(
+            query["sql"].startswith('INSERT INTO "task_history"')
+            for query in queries.captured_queries
+        )
+
+    def test_one_flush_per_transaction(self) -> None:
+        with (
+            CaptureQueriesContext(connection) as queries,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            # Запись из завершившегося savepoint уходит тем же INSERT,
+            # что и следующие за ней записи транзакции
+            with transaction.atomic():
+                self.comment(1)
+            for number in range(2, 6):
+                self.comment(number)
+            self.assertEqual(self.written(), [])
+        self.assertEqual(
+            self.written(),
+            [f"Left comment #{number}" for number in range(1, 6)],
+        )
+        self.assertEqual(self.inserts(queries), 1)
+
+    def test_rolled_back_savepoint(self) -> None:
+        with (
+            CaptureQueriesContext(connection) as queries,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            # Первая запись буфера откатывается: сброс от неё не зависит
+            with contextlib.suppress(RuntimeError), transaction.atomic():
+                self.comment(1)
+                raise RuntimeError
+            self.comment(2)
+            with contextlib.suppress(RuntimeError), transaction.atomic():
+                self.comment(3)
+                raise RuntimeError
+            with transaction.atomic():
+                self.comment(4)
+        self.assertEqual(self.written(), ["Left comment #2", "Left comment #4"])
+        # Перед savepoint, который мог откатиться, накопленное пишется отдельно
+        self.assertEqual(self.inserts(queries), 2)
+
+    def test_returned_entries(self) -> None:
+        before = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = self.comment(1)
+            # Время события известно сразу, id появляется после сброса
+            self.assertIsNone(entry.id)
+            self.assertGreaterEqual(entry.created_at, before)
+        stored = TaskHistoryEntry.objects.get()
+        self.assertEqual(entry.id, stored.id)
+        self.assertEqual(entry.created_at, stored.created_at)
+        self.assertEqual(stored.subject_id, 1)
+
+
+class TaskStateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="state@example.com", password="x")
+        cls.project = Project.objects.create(title="State", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        cls.statuses = [
+            ProjectStatus.objects.create(project=cls.project, name=name, position=0)
+            for name in ["Open", "Done"]
+        ]
+        cls.task = Task.objects.create(
+            title="Title 0",
+            description="",
+            creator=cls.user,
+            project=cls.project,
+        )
+        cls.created_at = timezone.make_aware(datetime.datetime(2026, 3, 2, 9))
+
+    def at(self, minutes: int) -> datetime.datetime:
+        return self.created_at + datetime.timedelta(minutes=minutes)
+
+    def state(self) -> dict[str, Any]:
+        return {field: getattr(self.task, field) for field in TRACKED_FIELDS}
+
+    def record(self, updates: int) -> dict[int, dict[str, Any]]:
+        # Состояние задачи после каждого события, по минуте на событие
+        history_service = TaskHistoryService(task=self.task, user=self.user)
+        with (
+            mock.patch.object(timezone, "now", return_value=self.created_at),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            history_service.create()
+        states = {0: self.state()}
+        for number in range(1, updates + 1):
+            old_values = cast(TaskOldValues, self.state())
+            self.task.title = f"Title {number}"
+            changed = ["title"]
+            if number % 7 == 0:
+                self.task.status = self.statuses[number // 7 % 2]
+                changed.append("status")
+            self.task.save()
+            with (
+                mock.patch.object(timezone, "now", return_value=self.at(number)),
+                self.captureOnCommitCallbacks(execute=True),
+            ):
+                history_service.update(old_values, changed)
+                if number % 10 == 0:
+                    # Прочие события не входят в интервал снимков
+                    history_service.add_comment(
+                        TaskComment(id=number, task=self.task, number=number),
+                    )
+            states[number] = self.state()
+        return states
+
+    def test_snapshot_interval(self) -> None:
+        self.record(SNAPSHOT_INTERVAL * 2 + 5)
+        self.assertEqual(
+            [
+                entry.text
+                for entry in self.task.history.filter(
+                    snapshot__isnull=False,
+                ).order_by("created_at")
+            ],
+            [
+                f"Task #{self.task.id} created",
+                f"Task #{self.task.id} updated: title",
+                f"Task #{self.task.id} updated: title",
+            ],
+        )
+        self.assertEqual(
+            list(
+                self.task.history.filter(snapshot__isnull=False)
+                .order_by("created_at")
+                .values_list("created_at", flat=True),
+            ),
+            [self.at(0), self.at(SNAPSHOT_INTERVAL), self.at(SNAPSHOT_INTERVAL * 2)],
+        )
+
+    def test_state_at(self) -> None:
+        updates = SNAPSHOT_INTERVAL * 2 + 5
+        states = self.record(updates)
+        self.assertIsNone(
+            TaskHistoryService.state_at(self.task, self.at(0) - datetime.timedelta(1)),
+        )
+        for number in [0, 1, 7, 14, 19, 20, 21, 28, 39, 40, 41, updates]:
+            for at in [
+                self.at(number),
+                self.at(number) + datetime.timedelta(seconds=30),
+            ]:
+                with self.subTest(number=number, at=at):
+                    self.assertEqual(
+                        TaskHistoryService.state_at(self.task, at),
+                        states[number],
+                    )
+
+    def test_view(self) -> None:
+        self.record(3)
+        url = reverse("tasks:task_state", args=[self.task.id])
+        self.client.force_login(self.user)
+
+        response = self.client.get(url, {"at": self.at(2).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["state"]["title"], "Title 2")
+        self.assertEqual(self.client.get(url).json()["state"]["title"], "Title 3")
+
+        # Снимка ещё нет: ответ 404 с пояснением, а не пустое состояние
+        response = self.client.get(url, {"at": "2026-03-01T00:00:00Z"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            response.json(),
+            {"detail": "No history recorded for this task at that time"},
+        )
+        self.assertEqual(self.client.get(url, {"at": "yesterday"}).status_code, 400)
+
+        self.client.force_login(
+            User.objects.create_user(email="stranger@example.com", password="x"),
+        )
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class QueryPlanTests(TestCase):
+    """Горячие выборки должны идти по индексу без полного скана и temp b-tree."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="plan@example.com", password="x")
+        cls.project = Project.objects.create(title="Plan", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        cls.status = ProjectStatus.objects.create(
+            project=cls.project,
+            name="Open",
+            position=0,
+        )
+        cls.task = Task.objects.create(
+            title="Plan",
+            description="",
+            creator=cls.user,
+            executor=cls.user,
+            project=cls.project,
+        )
+
+    def get_plan(self, queryset: models.QuerySet[Any]) -> list[str]:
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[3] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset: models.QuerySet[Any], index: str) -> None:
+        plan = self.get_plan(queryset)
+        self.assertTrue(
+            any(f"INDEX {index} " in step for step in plan),
+            f"{index} is not used: {plan}",
+        )
+        for step in plan:
+            self.assertNotIn("TEMP B-TREE", step, plan)
+            self.assertFalse(step.startswith("SCAN"), plan)
+
+    def get_view_context(self, view_class: Any, **kwargs: Any) -> dict[str, Any]:
+        request = RequestFactory().get("/")
+        request.user = self.user
+        view = view_class()
+        view.setup(request, **kwargs)
+        context: dict[str, Any] = view.get_context_data(**kwargs)
+        return context
+
+    def test_home_tasks(self) -> None:
+        cursor = (timezone.now(), 1)
+        for filters, index in [
+            ({}, "task__executor_updated_idx"),
+            (
+                {"project": self.project, "status": self.status},
+                "task__project_status_idx",
+            ),
+        ]:
+            paginator = KeysetPaginator(
+                HomeView.get_tasks(self.user, filters),
+                HomeView.page_size,
+                field="updated_at",
+            )
+            with self.subTest(filters=filters):
+                self.assertUsesIndex(paginator.get_queryset(), index)
+                self.assertUsesIndex(paginator.get_queryset(cursor), index)
+
+    def test_task_children(self) -> None:
+        context = self.get_view_context(TaskView, task_id=self.task.id)
+        self.assertUsesIndex(context["children"], "task__project_parent_idx")
+
+    def test_project_root_tasks(self) -> None:
+        self.assertUsesIndex(
+            Task.objects.filter(project=self.project, parent=None),
+            "task__project_parent_idx",
+        )
+
+    def test_project_tasks_by_status(self) -> None:
+        self.assertUsesIndex(
+            Task.objects.filter(project=self.project, status=self.status),
+            "task__project_status_idx",
+        )
+
+    def test_project_task_list(self) -> None:
+        cursor = (timezone.now(), 1)
+        cases: list[tuple[dict[str, Any], str]] = [
+            ({"sort": "-updated_at"}, "task__project_updated_idx"),
+            ({"sort": "updated_at"}, "task__project_updated_idx"),
+            ({"sort": "-created_at"}, "task__project_created_idx"),
+            ({"sort": "created_at"}, "task__project_created_idx"),
+            ({"status": str(self.status.id)}, "task__project_status_idx"),
+            ({"status": NO_STATUS}, "task__project_status_idx"),
+            ({"roots": True}, "task__project_parent_idx"),
+            ({"parent": self.task}, "task__project_parent_idx"),
+        ]
+        for filters, index in cases:
+            field, descending = TASK_LIST_SORTS[filters.get("sort", "-updated_at")]
+            paginator = KeysetPaginator(
+                ProjectTasksView.get_tasks(self.project, filters),
+                ProjectTasksView.page_size,
+                field=field,
+                descending=descending,
+            )
+            with self.subTest(filters=filters):
+                self.assertUsesIndex(paginator.get_queryset(), index)
+                self.assertUsesIndex(paginator.get_queryset(cursor), index)
+
+    def test_board_columns(self) -> None:
+        cursor = (timezone.now(), 1)
+        for status_id in [self.status.id, None]:
+            paginator = KeysetPaginator(
+                TaskBoardService.column_queryset(self.project.id, status_id),
+                20,
+                field="updated_at",
+            )
+            with self.subTest(status_id=status_id):
+                self.assertUsesIndex(
+                    paginator.get_queryset(), "task__project_status_idx"
+                )
+                self.assertUsesIndex(
+                    paginator.get_queryset(cursor),
+                    "task__project_status_idx",
+                )
+
+    def test_activity_pages(self) -> None:
+        cursor = (timezone.now(), 1)
+        for view_class, index in [
+            (TaskCommentsAPIView, "task_comment__task_created_idx"),
+            (TaskTimeLogsAPIView, "task_timelog__task_created_idx"),
+            (TaskHistoryAPIView, "task_history__task_created_idx"),
+        ]:
+            paginator = KeysetPaginator(view_class.get_queryset(self.task.id), 20)
+            with self.subTest(view=view_class.__name__):
+                self.assertUsesIndex(paginator.get_queryset(), index)
+                self.assertUsesIndex(paginator.get_queryset(cursor), index)
+
+    def test_task_autocomplete(self) -> None:
+        self.assertUsesIndex(
+            TaskAutocompleteAPIView.get_queryset(self.project, "Pl")[:20],
+            "task__project_title_idx",
+        )
+
+
+class TaskViewQueryBudgetTests(TestCase):
+    """Число запросов страницы задачи не зависит от числа записей."""
+
+    # Сессия и пользователь + валидаторы, задача с JOIN, дети,
+    # первая страница комментариев
+    TASK_PAGE_QUERIES = 6
+    # Сессия и пользователь + валидаторы с проверкой доступа, страница
+    ACTIVITY_PAGE_QUERIES = 4
+    # Сессия и пользователь + валидаторы, задача: остальное берётся из кэша
+    # фрагмента
+    CACHED_TASK_PAGE_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="budget@example.com", password="x")
+        cls.project = Project.objects.create(title="Budget", owner=cls.user)
+        cls.status = status = ProjectStatus.objects.create(
+            project=cls.project,
+            name="Open",
+            position=0,
+        )
+        parent = Task.objects.create(
+            title="Parent",
+            description="",
+            creator=cls.user,
+            project=cls.project,
+        )
+        cls.task = Task.objects.create(
+            title="Budget",
+            description="",
+            creator=cls.user,
+            executor=cls.user,
+            status=status,
+            parent=parent,
+            project=cls.project,
+        )
+        Task.objects.bulk_create(
+            Task(
+                title=f"Child {number}",
+                description="",
+                creator=cls.user,
+                parent=cls.task,
+                project=cls.project,
+            )
+            for number in range(5)
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        authors = User.objects.bulk_create(
+            User(email=f"author{number}@example.com", password="!")
+            for number in range(1, 31)
+        )
+        ProjectMember.objects.bulk_create(
+            ProjectMember(project=cls.project, user=author) for author in authors
+        )
+        # История пишется после коммита: внутри TestCase колбэки запускаем сами
+        with cls.captureOnCommitCallbacks(execute=True):
+            for number, author in enumerate(authors, start=1):
+                comment = TaskComment.objects.create(
+                    task=cls.task,
+                    number=number,
+                    creator=author,
+                    text="comment",
+                )
+                timelog = TaskTimeLog.objects.create(
+                    task=cls.task,
+                    number=number,
+                    creator=author,
+                    hours=1,
+                )
+                history_service = TaskHistoryService(task=cls.task, user=author)
+                history_service.add_comment(comment)
+                history_service.add_timelog(timelog)
+        Task.objects.filter(id=cls.task.id).update(
+            last_comment_number=len(authors),
+            last_timelog_number=len(authors),
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client.force_login(self.user)
+        # Бюджет считается для прогретого кэша членства
+        ProjectMembershipService.project_ids(self.user.id)
+
+    def test_task_page(self) -> None:
+        url = reverse("tasks:task", kwargs={"task_id": self.task.id})
+        with self.assertNumQueries(self.TASK_PAGE_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Child 4")
+        self.assertContains(response, "author30@example.com")
+
+    def test_task_page_fragment_cache(self) -> None:
+        url = reverse("tasks:task", kwargs={"task_id": self.task.id})
+        self.client.get(url)
+        with self.assertNumQueries(self.CACHED_TASK_PAGE_QUERIES):
+            response = self.client.get(url)
+        self.assertContains(response, "Child 4")
+        self.assertContains(response, f'name="user-id" content="{self.user.id}"')
+
+        # Фрагмент общий: другой участник получает его без лишних запросов
+        other = User.objects.get(email="author1@example.com")
+        ProjectMembershipService.project_ids(other.id)
+        self.client.force_login(other)
+        with self.assertNumQueries(self.CACHED_TASK_PAGE_QUERIES):
+            response = self.client.get(url)
+        self.assertContains(response, "Child 4")
+
+        # Новый комментарий меняет версию задачи, фрагмент рисуется заново
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("tasks:edit_task", kwargs={"task_id": self.task.id}),
+                {
+                    "title": self.task.title,
+                    "description": "-",
+                    "status": self.status.id,
+                    "executor": self.user.id,
+                    "parent": self.task.parent_id,
+                    "comment_text": "fresh comment",
+                },
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertContains(self.client.get(url), "fresh comment")
+
+        # Переименование дочерней задачи меняет версию родителя
+        child = Task.objects.get(title="Child 4")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("tasks:edit_task", kwargs={"task_id": child.id}),
+                {
+                    "title": "Renamed child",
+                    "description": "-",
+                    "status": self.status.id,
+                    "parent": self.task.id,
+                },
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertContains(self.client.get(url), "Renamed child")
+
+    def test_fragment_tracks_parent_and_executor(self) -> None:
+        url = reverse("tasks:task", kwargs={"task_id": self.task.id})
+        self.assertContains(self.client.get(url), "Parent")
+
+        # Переименование родителя не трогает строку задачи и её версию
+        parent = Task.objects.get(id=self.task.parent_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("tasks:edit_task", kwargs={"task_id": parent.id}),
+                {"title": "Renamed parent", "description": "-"},
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertContains(self.client.get(url), "Renamed parent")
+
+        self.user.first_name, self.user.last_name = "Ann", "Lee"
+        self.user.save(update_fields=["first_name", "last_name"])
+        self.assertContains(self.client.get(url), "Ann Lee")
+
+    def test_activity_pages(self) -> None:
+        for name, count in [
+            ("task_comments", 30),
+            ("task_timelogs", 30),
+            ("task_history", 60),
+        ]:
+            url = reverse(f"tasks:{name}", kwargs={"task_id": self.task.id})
+            with (
+                self.subTest(name=name),
+                self.assertNumQueries(self.ACTIVITY_PAGE_QUERIES),
+            ):
+                response = self.client.get(url, {"limit": 100})
+            self.assertEqual(len(response.json()["results"]), count)
+
+
+class TaskBoardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="board@example.com", password="x")
+        cls.project = Project.objects.create(title="Board", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        cls.todo, cls.done = ProjectStatus.objects.bulk_create(
+            [
+                ProjectStatus(project=cls.project, name="To do", position=0),
+                ProjectStatus(project=cls.project, name="Done", position=1),
+            ],
+        )
+        Task.objects.bulk_create(
+            Task(
+                title=f"Task {number}",
+                description="",
+                creator=cls.user,
+                project=cls.project,
+                status=cls.todo if number % 3 else cls.done,
+            )
+            for number in range(30)
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_counts_come_from_one_cached_query(self) -> None:
+        with self.assertNumQueries(1):
+            counts = TaskBoardService.column_counts(self.project.id)
+        self.assertEqual(counts, {self.todo.id: 20, self.done.id: 10})
+        with self.assertNumQueries(0):
+            TaskBoardService.column_counts(self.project.id)
+
+    def test_column_pages(self) -> None:
+        url = reverse(
+            "tasks:task_board_column",
+            kwargs={"project_id": self.project.id, "status_id": self.todo.id},
+        )
+        seen: list[int] = []
+        params: dict[str, Any] = {"limit": 7}
+        while True:
+            data = self.client.get(url, params).json()
+            seen += [task["id"] for task in data["results"]]
+            if not data["next_cursor"]:
+                break
+            params["cursor"] = data["next_cursor"]
+        self.assertEqual(
+            seen,
+            list(
+                Task.objects.filter(status=self.todo)
+                .order_by("-updated_at", "-id")
+                .values_list("id", flat=True),
+            ),
+        )
+
+    def test_status_change_invalidates_counts(self) -> None:
+        TaskBoardService.column_counts(self.project.id)
+        task = Task.objects.filter(status=self.done).first()
+        assert task is not None
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("tasks:edit_task", kwargs={"task_id": task.id}),
+                {"title": task.title, "description": "-", "status": self.todo.id},
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            TaskBoardService.column_counts(self.project.id),
+            {self.todo.id: 21, self.done.id: 9},
+        )
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(
+            email="alice@example.com",
+            password="x",
+            first_name="Alice",
+            last_name="Smith",
+        )
+        cls.member = User.objects.create_user(
+            email="bob@example.com",
+            password="x",
+            first_name="Bob",
+            last_name="Stone",
+        )
+        cls.outsider = User.objects.create_user(
+            email="bobby@example.com",
+            password="x",
+        )
+        cls.project = Project.objects.create(title="Autocomplete", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.member)
+        other_project = Project.objects.create(title="Other", owner=cls.outsider)
+        ProjectMember.objects.create(project=other_project, user=cls.outsider)
+
+        def create(title: str, parent: Task | None = None) -> Task:
+            task = Task.objects.create(
+                title=title,
+                description="",
+                creator=cls.user,
+                project=cls.project,
+                parent=parent,
+            )
+            TaskHierarchyService.insert(task)
+            return task
+
+        cls.release = create("Release")
+        cls.review = create("review notes", cls.release)
+        cls.report = create("Report")
+        cls.numbered = create(f"{cls.report.id} days left")
+        cls.unrelated = create("Unrelated")
+        Task.objects.create(
+            title="Reports elsewhere",
+            description="",
+            creator=cls.outsider,
+            project=other_project,
+        )
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user)
+
+    def tasks(self, **params: Any) -> list[int]:
+        response = self.client.get(
+            reverse("tasks:task_autocomplete", args=[self.project.id]),
+            params,
+        )
+        self.assertEqual(response.status_code, 200)
+        return [result["id"] for result in response.json()["results"]]
+
+    def test_task_title_prefix(self) -> None:
+        # Без учёта регистра, по алфавиту, только задачи проекта
+        self.assertEqual(
+            self.tasks(q="re"),
+            [self.release.id, self.report.id, self.review.id],
+        )
+        self.assertEqual(self.tasks(q="REP"), [self.report.id])
+        self.assertEqual(self.tasks(q="notes"), [])
+        self.assertEqual(len(self.tasks()), 5)
+
+    def test_task_id(self) -> None:
+        self.assertEqual(
+            self.tasks(q=str(self.report.id)),
+            [self.numbered.id, self.report.id],
+        )
+
+    def test_exclude_subtree(self) -> None:
+        self.assertEqual(
+            self.tasks(q="re", exclude_subtree_of=self.release.id),
+            [self.report.id],
+        )
+
+    def test_invalid_params(self) -> None:
+        url = reverse("tasks:task_autocomplete", args=[self.project.id])
+        response = self.client.get(url, {"exclude_subtree_of": "abc"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("exclude_subtree_of", response.json())
+
+    def test_non_member(self) -> None:
+        self.client.force_login(self.outsider)
+        for name in ["tasks:task_autocomplete", "projects:member_autocomplete"]:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=[self.project.id]))
+                self.assertEqual(response.status_code, 404)
+
+    def test_edit_form_excludes_subtree(self) -> None:
+        response = self.client.get(reverse("tasks:edit_task", args=[self.release.id]))
+        parent_field = response.context["form"].fields["parent"]
+        # Поддерево исключается подзапросом, а не списком id в параметрах
+        sql, params = parent_field.queryset.query.sql_with_params()
+        self.assertIn("task_closure", sql)
+        self.assertNotIn(self.review.id, params)
+        self.assertCountEqual(
+            parent_field.queryset.values_list("id", flat=True),
+            [self.report.id, self.numbered.id, self.unrelated.id],
+        )
+
+    def test_widget_script_once_per_page(self) -> None:
+        for url in [
+            reverse("tasks:project_tasks", args=[self.project.id]),
+            reverse("tasks:new_task", args=[self.project.id]),
+            reverse("tasks:edit_task", args=[self.release.id]),
+        ]:
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertGreaterEqual(
+                    content.count('x-data="autocompleteSelect()"'), 2
+                )
+                self.assertEqual(content.count("tasks/autocomplete_select.js"), 1)
+                self.assertNotIn("function autocompleteSelect", content)
+
+    def test_members(self) -> None:
+        url = reverse("projects:member_autocomplete", args=[self.project.id])
+        for q, expected in [
+            ("bo", [self.member.id]),
+            ("sMi", [self.user.id]),
+            ("S", [self.user.id, self.member.id]),
+            ("", [self.user.id, self.member.id]),
+        ]:
+            with self.subTest(q=q):
+                response = self.client.get(url, {"q": q})
+                self.assertEqual(
+                    [result["id"] for result in response.json()["results"]],
+                    expected,
+                )
+
+
+class TaskSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="search@example.com", password="x")
+        cls.other = User.objects.create_user(email="other@example.com", password="x")
+        cls.project = Project.objects.create(title="Search", owner=cls.user)
+        cls.hidden_project = Project.objects.create(title="Hidden", owner=cls.other)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        ProjectMember.objects.create(project=cls.hidden_project, user=cls.other)
+        cls.task = Task.objects.create(
+            title="Deploy pipeline",
+            description="Runs <script>migrations</script> before release",
+            creator=cls.user,
+            project=cls.project,
+        )
+        cls.hidden_task = Task.objects.create(
+            title="Deploy secrets",
+            description="",
+            creator=cls.other,
+            project=cls.hidden_project,
+        )
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user)
+
+    def search(self, q: str) -> list[dict[str, Any]]:
+        response = self.client.get(reverse("tasks:task_search"), {"q": q})
+        self.assertEqual(response.status_code, 200)
+        results: list[dict[str, Any]] = response.json()["results"]
+        return results
+
+    def test_results_are_filtered_by_membership(self) -> None:
+        results = self.search("depl")
+        self.assertEqual([result["task_id"] for result in results], [self.task.id])
+        self.assertIn("<mark>Deploy</mark>", results[0]["snippet"])
+
+    def test_snippet_is_escaped(self) -> None:
+        [result] = self.search("migrations")
+        self.assertIn("&lt;script&gt;<mark>migrations</mark>", result["snippet"])
+
+    def test_index_follows_tasks_and_comments(self) -> None:
+        self.task.title = "Release train"
+        self.task.save()
+        self.assertEqual(self.search("pipeline"), [])
+        self.assertEqual(len(self.search("train")), 1)
+
+        comment = TaskComment.objects.create(
+            task=self.task,
+            number=1,
+            creator=self.user,
+            text="Rollback checklist",
+        )
+        [result] = self.search("checklist")
+        self.assertEqual(result["comment_number"], 1)
+        comment.delete()
+        self.assertEqual(self.search("checklist"), [])
+
+    def test_query_syntax_is_not_exposed(self) -> None:
+        self.assertEqual(self.search('" OR NEAR('), [])
+        self.assertEqual(len(self.search("deploy AND")), 0)
+
+    def test_rebuild(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM task_search")
+        self.assertEqual(self.search("deploy"), [])
+        self.assertEqual(TaskSearchService.rebuild(), 2)
+        self.assertEqual(len(self.search("deploy")), 1)
+
+
+class ProjectMembershipTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="member@example.com", password="x")
+        cls.project = Project.objects.create(title="Member", owner=cls.user)
+        cls.other_project = Project.objects.create(title="Other", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+
+    def test_cached_until_membership_changes(self) -> None:
+        self.assertEqual(
+            ProjectMembershipService.project_ids(self.user.id),
+            {self.project.id},
+        )
+        with self.assertNumQueries(0):
+            ProjectMembershipService.project_ids(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            member = ProjectMember.objects.create(
+                project=self.other_project,
+                user=self.user,
+            )
+        self.assertEqual(
+            ProjectMembershipService.project_ids(self.user.id),
+            {self.project.id, self.other_project.id},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            member.delete()
+        self.assertFalse(
+            ProjectMembershipService.is_member(self.user.id, self.other_project.id),
+        )
+
+    def test_removed_member_loses_access(self) -> None:
+        self.client.force_login(self.user)
+        url = reverse("projects:project", kwargs={"project_id": self.project.id})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            ProjectMember.objects.filter(project=self.project).delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ProjectAccessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="access@example.com", password="x")
+        cls.outsider = User.objects.create_user(email="out@example.com", password="x")
+        cls.project = Project.objects.create(title="Access", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        cls.status = ProjectStatus.objects.create(
+            project=cls.project,
+            name="Open",
+            position=0,
+        )
+
+    def test_loaded_once_per_request(self) -> None:
+        request = RequestFactory().get("/")
+        with self.assertNumQueries(2):
+            access = ProjectAccess.for_request(request, self.project)
+            self.assertIs(ProjectAccess.for_request(request, self.project), access)
+
+    def test_checks_run_in_memory(self) -> None:
+        access = ProjectAccess.load(self.project)
+        with self.assertNumQueries(0):
+            TaskChecker.check_all(
+                status_id=self.status.id,
+                access=access,
+                user=self.user,
+                executor=self.user,
+            )
+            for executor, status_id in [
+                (self.outsider, self.status.id),
+                (self.user, None),
+            ]:
+                with self.assertRaises(ValidationError):
+                    TaskChecker.check_all(
+                        status_id=status_id,
+                        access=access,
+                        user=self.user,
+                        executor=executor,
+                    )
+
+    def test_non_member_executor_is_a_form_error(self) -> None:
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("tasks:new_task", kwargs={"project_id": self.project.id}),
+            {
+                "title": "Task",
+                "description": "",
+                "status": self.status.id,
+                "executor": self.outsider.id,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("executor", response.context["form"].errors)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="etag@example.com", password="x")
+        cls.other = User.objects.create_user(email="etag2@example.com", password="x")
+        cls.project = Project.objects.create(title="ETag", owner=cls.user)
+        ProjectMember.objects.bulk_create(
+            ProjectMember(project=cls.project, user=user)
+            for user in [cls.user, cls.other]
+        )
+        cls.task = Task.objects.create(
+            title="ETag",
+            description="",
+            creator=cls.user,
+            project=cls.project,
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client.force_login(self.user)
+        ProjectMembershipService.project_ids(self.user.id)
+
+    def test_unchanged_task_page_is_not_rendered(self) -> None:
+        url = reverse("tasks:task", kwargs={"task_id": self.task.id})
+        response = self.client.get(url)
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+        self.assertIn("private", response.headers["Cache-Control"])
+
+        # Сессия и пользователь + валидаторы
+        with self.assertNumQueries(3):
+            response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        TaskTimeLog.objects.create(
+            task=self.task,
+            number=1,
+            creator=self.user,
+            hours=1,
+        )
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_page_tracks_parent_and_executor(self) -> None:
+        parent = Task.objects.create(
+            title="Parent",
+            description="",
+            creator=self.user,
+            project=self.project,
+        )
+        Task.objects.filter(id=self.task.id).update(parent=parent)
+        url = reverse("tasks:task", kwargs={"task_id": self.task.id})
+        response = self.client.get(url)
+        etag, last_modified = (
+            response.headers["ETag"],
+            response.headers["Last-Modified"],
+        )
+
+        # Родитель переименован позже: устаревают и ETag, и Last-Modified
+        later = timezone.now() + datetime.timedelta(minutes=1)
+        with mock.patch.object(timezone, "now", return_value=later):
+            parent.title = "Renamed parent"
+            parent.save(update_fields=["title", "updated_at"])
+        for headers in [
+            {"If-None-Match": etag},
+            {"If-Modified-Since": last_modified},
+        ]:
+            with self.subTest(headers=headers):
+                response = self.client.get(url, headers=headers)
+                self.assertContains(response, "Renamed parent")
+
+        Task.objects.filter(id=self.task.id).update(executor=self.other)
+        etag = self.client.get(url).headers["ETag"]
+        self.other.first_name, self.other.last_name = "Ann", "Lee"
+        self.other.save(update_fields=["first_name", "last_name"])
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertContains(response, "Ann Lee")
+
+    def test_task_page_etag_is_per_user(self) -> None:
+        url = reverse("tasks:task", kwargs={"task_id": self.task.id})
+        etag = self.client.get(url).headers["ETag"]
+        self.client.force_login(self.other)
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_activity_api(self) -> None:
+        url = reverse("tasks:task_comments", kwargs={"task_id": self.task.id})
+        etag = self.client.get(url).headers["ETag"]
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = TaskComment.objects.create(
+                task=self.task,
+                number=1,
+                creator=self.user,
+                text="new",
+            )
+            TaskHistoryService(task=self.task, user=self.user).add_comment(comment)
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+        # Без членства — 404, а не 304
+        self.client.force_login(
+            User.objects.create_user(email="etag3@example.com", password="x"),
+        )
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 404)
+
+    def test_project_page(self) -> None:
+        url = reverse("projects:project", kwargs={"project_id": self.project.id})
+        etag = self.client.get(url).headers["ETag"]
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        ProjectMember.objects.create(
+            project=self.project,
+            user=User.objects.create_user(email="etag4@example.com", password="x"),
+        )
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "etag4@example.com")
+
+
+@override_settings(ROOT_URLCONF="config.urls_asgi")
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="async@example.com", password="x")
+        cls.project = Project.objects.create(title="Async", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        cls.task = Task.objects.create(
+            title="Async task",
+            description="",
+            creator=cls.user,
+            executor=cls.user,
+            project=cls.project,
+        )
+        Task.objects.create(
+            title="Async child",
+            description="",
+            creator=cls.user,
+            parent=cls.task,
+            project=cls.project,
+        )
+        TaskComment.objects.create(
+            task=cls.task,
+            number=1,
+            creator=cls.user,
+            text="async comment",
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    async def test_task_page(self) -> None:
+        await self.async_client.aforce_login(self.user)
+        url = reverse("tasks:task", kwargs={"task_id": self.task.id})
+        response = await self.async_client.get(url)
+        self.assertIs(response.resolver_match.func.view_class, AsyncTaskView)
+        self.assertContains(response, "Async child")
+        self.assertContains(response, "async comment")
+
+        # Второй рендер берёт фрагмент из кэша
+        response = await self.async_client.get(url)
+        self.assertContains(response, "Async child")
+
+        response = await self.async_client.get(
+            url,
+            headers={"If-None-Match": response.headers["ETag"]},
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_task_page_access(self) -> None:
+        url = reverse("tasks:task", kwargs={"task_id": self.task.id})
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 302)
+
+        await self.async_client.aforce_login(
+            await User.objects.acreate(email="async2@example.com", password="!"),
+        )
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_home(self) -> None:
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("home"), {"q": "Async"})
+        self.assertContains(response, "Async task")
+        self.assertNotContains(response, "Async child")
+
+
+@override_settings(ROOT_URLCONF="config.urls_asgi")
+class TaskEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(email="events@example.com", password="x")
+        cls.project = Project.objects.create(title="Events", owner=cls.user)
+        ProjectMember.objects.create(project=cls.project, user=cls.user)
+        cls.task = Task.objects.create(
+            title="Events",
+            description="",
+            creator=cls.user,
+            project=cls.project,
+        )
+
+    def add_comment(self, text: str) -> TaskComment:
+        comment = TaskComment.objects.create(
+            task=self.task,
+            number=TaskComment.objects.filter(task=self.task).count() + 1,
+            creator=self.user,
+            text=text,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskHistoryService(task=self.task, user=self.user).add_comment(comment)
+        return comment
+
+    def test_events_follow_history(self) -> None:
+        with mock.patch.object(TaskEventBroker, "notify") as notify:
+            comment = self.add_comment("first")
+        notify.assert_called_once_with(self.task.id)
+        events = AsyncTaskEventsView.get_events(self.task.id, 0)
+        self.assertEqual([name for _, name, _ in events], ["comment", "history"])
+        self.assertIsNone(events[0][0])
+        self.assertEqual(events[0][2]["action"], "added")
+        self.assertEqual(events[0][2]["entry"]["text"], "first")
+
+        # Удалённый комментарий: событие добавления пропадает, удаление
+        # остаётся; поток продолжает с id последней записи истории
+        last_id = events[-1][0]
+        comment_id = comment.id
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskHistoryService(task=self.task, user=self.user).delete_comment(comment)
+            comment.delete()
+        events = AsyncTaskEventsView.get_events(self.task.id, 0)
+        self.assertEqual(
+            [name for _, name, _ in events],
+            ["history", "comment", "history"],
+        )
+        events = AsyncTaskEventsView.get_events(self.task.id, last_id)
+        self.assertEqual([name for _, name, _ in events], ["comment", "history"])
+        self.assertEqual(
+            events[0][2], {"action": "deleted", "id": comment_id, "entry": None}
+        )
+
+    async def test_stream(self) -> None:
+        await sync_to_async(self.add_comment)("streamed")
+        await self.async_client.aforce_login(self.user)
+        url = reverse("tasks:task_events", kwargs={"task_id": self.task.id})
+        response = await self.async_client.get(url, headers={"Last-Event-ID": "0"})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        comment_event = (await anext(chunks)).decode()
+        self.assertTrue(comment_event.startswith("event: comment\n"))
+        self.assertIn('"text": "streamed"', comment_event)
+        self.assertIn("event: history", (await anext(chunks)).decode())
+
+    async def test_broker_wakes_subscribers(self) -> None:
+        with TaskEventBroker.subscribe(self.task.id) as wakeup:
+            await asyncio.to_thread(TaskEventBroker.notify, self.task.id)
+            await asyncio.wait_for(wakeup.wait(), 1)
+
+    def test_wsgi_declines_stream(self) -> None:
+        self.client.force_login(self.user)
+        url = reverse(
+            "tasks:task_events",
+            kwargs={"task_id": self.task.id},
+            urlconf="config.urls",
+        )
+        with self.settings(ROOT_URLCONF="config.urls"):
+            self.assertEqual(self.client.get(url).status_code, 204)
+
+
+@mock.patch("config.db_router.replica_configured", new=lambda: True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def handle(
+        self,
+        request: HttpRequest,
+        view: Callable[[], str | None],
+    ) -> tuple[str | None, HttpResponse]:
+        routed: list[str | None] = []
+
+        def get_response(request: HttpRequest) -> HttpResponse:
+            routed.append(view())
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(get_response)(request)
+        return routed[0], response
+
+    def test_reads_go_to_replica_until_a_write(self) -> None:
+        def view() -> str | None:
+            before = self.router.db_for_read(Task)
+            self.assertEqual(self.router.db_for_write(Task), DEFAULT_DB_ALIAS)
+            after = self.router.db_for_read(Task)
+            self.assertEqual(after, DEFAULT_DB_ALIAS)
+            return before
+
+        db, response = self.handle(self.factory.get("/"), view)
+        self.assertEqual(db, REPLICA_DB_ALIAS)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_sticky_after_write(self) -> None:
+        def view() -> str | None:
+            return self.router.db_for_read(Task)
+
+        db, response = self.handle(self.factory.get("/"), view)
+        self.assertEqual(db, REPLICA_DB_ALIAS)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+        db, _ = self.handle(self.factory.post("/"), view)
+        self.assertEqual(db, DEFAULT_DB_ALIAS)
+
+        request = self.factory.get("/")
+        request.COOKIES[STICKY_COOKIE] = "1"
+        db, _ = self.handle(request, view)
+        self.assertEqual(db, DEFAULT_DB_ALIAS)
+
+    def test_primary_outside_requests_transactions_and_sessions(self) -> None:
+        self.assertEqual(self.router.db_for_read(Task), DEFAULT_DB_ALIAS)
+
+        def view() -> str | None:
+            return self.router.db_for_read(Task)
+
+        with mock.patch.object(
+            connections[DEFAULT_DB_ALIAS],
+            "in_atomic_block",
+            new=True,
+        ):
+            db, _ = self.handle(self.factory.get("/"), view)
+        self.assertEqual(db, DEFAULT_DB_ALIAS)
+
+        db, _ = self.handle(
+            self.factory.get("/"),
+            lambda: self.router.db_for_read(Session),
+        )
+        self.assertEqual(db, DEFAULT_DB_ALIAS)
+
+    def test_migrations_skip_only_the_replica(self) -> None:
+        self.assertIs(self.router.allow_migrate(REPLICA_DB_ALIAS, "tasks"), False)
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, "tasks"))
+        self.assertIsNone(self.router.allow_migrate("scratch", "users"))
+
+        # Как у bench_sqlite_concurrency: отдельная база получает всю схему
+        with tempfile.TemporaryDirectory() as directory:
+            connections.settings["scratch"] = connections.configure_settings(
+                {
+                    DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+                    "scratch": {
+                        "ENGINE": "django.db.backends.sqlite3",
+                        "NAME": Path(directory) / "scratch.sqlite3",
+                    },
+                },
+            )["scratch"]
+            try:
+                # Алиас появился после setUpClass, доступ к нему открываем явно
+                with mock.patch.object(type(self), "databases", {"scratch"}):
+                    call_command("migrate", database="scratch", verbosity=0)
+                    tables = connections["scratch"].introspection.table_names()
+            finally:
+                connections["scratch"].close()
+                del connections["scratch"]
+                del connections.settings["scratch"]
+        self.assertIn("users_user", tables)
+        self.assertIn("task_closure", tables)
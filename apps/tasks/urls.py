@@ -2,20 +2,70 @@ from django.urls import path
 
 from apps.tasks.views import (
     CTaskView,
+    ProjectBurnAPIView,
+    ProjectTasksView,
+    TaskAutocompleteAPIView,
+    TaskBoardAPIView,
+    TaskBoardColumnAPIView,
+    TaskBoardView,
     TaskCommentAPIView,
+    TaskCommentsAPIView,
+    TaskEventsView,
+    TaskHistoryAPIView,
+    TaskSearchAPIView,
+    TaskStateAPIView,
     TaskTimeLogAPIView,
+    TaskTimeLogsAPIView,
     TaskUView,
     TaskView,
+    TimeLogExportView,
+    TimeLogImportAPIView,
+    TimesheetAPIView,
 )
 
 app_name = "tasks"
 
 urlpatterns = [
+    path(
+        "projects/<int:project_id>/tasks/",
+        ProjectTasksView.as_view(),
+        name="project_tasks",
+    ),
     path(
         "projects/<int:project_id>/tasks/new",
         CTaskView.as_view(),
         name="new_task",
     ),
+    path(
+        "projects/<int:project_id>/tasks/autocomplete/",
+        TaskAutocompleteAPIView.as_view(),
+        name="task_autocomplete",
+    ),
+    path(
+        "projects/<int:project_id>/board",
+        TaskBoardView.as_view(),
+        name="task_board",
+    ),
+    path(
+        "projects/<int:project_id>/board/columns/",
+        TaskBoardAPIView.as_view(),
+        name="task_board_columns",
+    ),
+    path(
+        "projects/<int:project_id>/board/columns/none/",
+        TaskBoardColumnAPIView.as_view(),
+        name="task_board_no_status_column",
+    ),
+    path(
+        "projects/<int:project_id>/board/columns/<int:status_id>/",
+        TaskBoardColumnAPIView.as_view(),
+        name="task_board_column",
+    ),
+    path(
+        "tasks/search/",
+        TaskSearchAPIView.as_view(),
+        name="task_search",
+    ),
     path(
         "tasks/<int:task_id>",
         TaskView.as_view(),
@@ -26,14 +76,64 @@ urlpatterns = [
         TaskUView.as_view(),
         name="edit_task",
     ),
+    path(
+        "tasks/<int:task_id>/timelogs/",
+        TaskTimeLogsAPIView.as_view(),
+        name="task_timelogs",
+    ),
     path(
         "tasks/<int:task_id>/timelogs/<int:timelog_id>/",
         TaskTimeLogAPIView.as_view(),
         name="timelog_detail",
     ),
+    path(
+        "tasks/<int:task_id>/comments/",
+        TaskCommentsAPIView.as_view(),
+        name="task_comments",
+    ),
     path(
         "tasks/<int:task_id>/comments/<int:comment_id>/",
         TaskCommentAPIView.as_view(),
         name="comment_detail",
     ),
+    path(
+        "tasks/<int:task_id>/history/",
+        TaskHistoryAPIView.as_view(),
+        name="task_history",
+    ),
+    path(
+        "tasks/<int:task_id>/events/",
+        TaskEventsView.as_view(),
+        name="task_events",
+    ),
+    path(
+        "tasks/<int:task_id>/history/state/",
+        TaskStateAPIView.as_view(),
+        name="task_state",
+    ),
+    path(
+        "reports/timesheet/",
+        TimesheetAPIView.as_view(),
+        name="my_timesheet",
+    ),
+    path(
+        "projects/<int:project_id>/reports/timesheet/",
+        TimesheetAPIView.as_view(),
+        name="project_timesheet",
+    ),
+    path(
+        "projects/<int:project_id>/reports/burn/",
+        ProjectBurnAPIView.as_view(),
+        name="project_burn",
+    ),
+    path(
+        "timelogs/export",
+        TimeLogExportView.as_view(),
+        name="timelog_export",
+    ),
+    path(
+        "timelogs/import",
+        TimeLogImportAPIView.as_view(),
+        name="timelog_import",
+    ),
 ]
@@ -0,0 +1,32 @@
+from django.urls import path
+
+from apps.tasks.urls import app_name, urlpatterns
+from apps.tasks.views import (
+    AsyncTaskEventsView,
+    AsyncTaskView,
+    AsyncTimeLogExportView,
+)
+
+# Под ASGI страница задачи, поток её событий и выгрузка времени обслуживаются
+# асинхронными вариантами, остальные маршруты те же: первым совпавшим будет
+# асинхронный
+__all__ = ["app_name", "urlpatterns"]
+
+urlpatterns = [
+    path(
+        "tasks/<int:task_id>",
+        AsyncTaskView.as_view(),
+        name="task",
+    ),
+    path(
+        "tasks/<int:task_id>/events/",
+        AsyncTaskEventsView.as_view(),
+        name="task_events",
+    ),
+    path(
+        "timelogs/export",
+        AsyncTimeLogExportView.as_view(),
+        name="timelog_export",
+    ),
+    *urlpatterns,
+]
@@ -1,12 +1,36 @@
+import asyncio
+import contextlib
+import json
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from functools import partial
 from typing import Any, cast
 
+from asgiref.sync import sync_to_async
 from django import forms
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db import models, transaction
-from django.http import HttpResponse
+from django.contrib.auth.mixins import AccessMixin, LoginRequiredMixin
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models.functions import Lower
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBase,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.views.generic import TemplateView
-from rest_framework import permissions, status
+from rest_framework import permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -14,36 +38,287 @@ from apps.projects.models import Project, ProjectStatus
 from apps.tasks.forms.task import (
     CTaskForm,
     UTaskForm,
+    bind_project,
+)
+from apps.tasks.forms.task_filter import (
+    NO_STATUS,
+    TASK_LIST_SORTS,
+    MyTasksFilterForm,
+    ProjectTasksFilterForm,
+)
+from apps.tasks.forms.timelog_export import TimeLogExportForm
+from apps.tasks.models import (
+    Task,
+    TaskClosure,
+    TaskComment,
+    TaskHistoryEntry,
+    TaskHistoryEvent,
+    TaskTimeLog,
+)
+from apps.tasks.serializers import (
+    BoardTaskSerializer,
+    CommentEntrySerializer,
+    CommentSerializer,
+    HistoryEntrySerializer,
+    KeysetQuerySerializer,
+    ReportQuerySerializer,
+    TaskAutocompleteQuerySerializer,
+    TaskSearchQuerySerializer,
+    TaskStateQuerySerializer,
+    TimeLogEntrySerializer,
+    TimeLogSerializer,
 )
-from apps.tasks.models import Task, TaskComment, TaskTimeLog
-from apps.tasks.serializers import CommentSerializer, TimeLogSerializer
+from apps.tasks.services.conditional_get import ConditionalGetService
+from apps.tasks.services.keyset import Cursor, KeysetPaginator, decode_cursor
+from apps.tasks.services.project_access import ProjectAccess
+from apps.tasks.services.project_membership import ProjectMembershipService
+from apps.tasks.services.task_board import TaskBoardService
 from apps.tasks.services.task_checker import TaskChecker
+from apps.tasks.services.task_detail import USER_FIELDS, TaskDetailLoader
+from apps.tasks.services.task_events import TaskEventBroker
+from apps.tasks.services.task_hierarchy import TaskHierarchyService
 from apps.tasks.services.task_history import (
     TaskCommentOldValues,
     TaskHistoryService,
     TaskOldValues,
     TimeLogOldValues,
 )
+from apps.tasks.services.task_hours import TaskHoursService
+from apps.tasks.services.task_numbers import TaskNumberAllocator
+from apps.tasks.services.task_search import TaskSearchService
+from apps.tasks.services.timelog_export import (
+    TimeLogExportFilters,
+    TimeLogExportService,
+)
+from apps.tasks.services.timelog_import import TimeLogImportService
+from apps.tasks.services.timelog_rollup import (
+    TimeLogReportService,
+    TimeLogRollupService,
+)
 from apps.users.models import User
 from config.typess import AuthenticatedHttpRequest, AuthenticatedRequest
 
 
+class AsyncLoginRequiredMixin(AccessMixin):
+    # LoginRequiredMixin читает request.user синхронно, а в асинхронном
+    # представлении пользователь загружается через auser(). Вызывается
+    # первым делом в обработчике
+    async def check_login(self, request: HttpRequest) -> HttpResponseBase | None:
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return None
+
+
 class HomeView(LoginRequiredMixin, TemplateView):
     http_method_names = ["get"]
     template_name = "tasks/home.html"
     extra_context = None
+    page_size = 50
+
+    @staticmethod
+    def get_tasks(user: User, filters: dict[str, Any]) -> models.QuerySet[Task]:
+        tasks = (
+            Task.objects.filter(executor=user)
+            .select_related("status")
+            .only("id", "title", "updated_at", "status__id", "status__name")
+        )
+        if filters.get("project"):
+            tasks = tasks.filter(project=filters["project"])
+        if filters.get("status"):
+            tasks = tasks.filter(status=filters["status"])
+        if query := filters.get("q"):
+            condition = models.Q(title__icontains=query)
+            if query.lstrip("#").isdigit():
+                condition |= models.Q(id=int(query.lstrip("#")))
+            tasks = tasks.filter(condition)
+        return tasks
+
+    @staticmethod
+    def get_form(request: HttpRequest, user: User) -> MyTasksFilterForm:
+        # Валидация ходит в БД: проект и статус выбираются из queryset
+        form = MyTasksFilterForm(request.GET, user=user)
+        form.is_valid()
+        return form
+
+    @staticmethod
+    def get_cursor(request: HttpRequest) -> Cursor | None:
+        if raw_cursor := request.GET.get("cursor"):
+            # Битый курсор — просто первая страница
+            with contextlib.suppress(ValueError):
+                return decode_cursor(raw_cursor)
+        return None
+
+    @staticmethod
+    def get_page_context(
+        request: HttpRequest,
+        form: MyTasksFilterForm,
+        cursor: Cursor | None,
+        tasks: list[Task],
+        next_cursor: str | None,
+    ) -> dict[str, Any]:
+        query = request.GET.copy()
+        query.pop("cursor", None)
+        context = {
+            "filter_form": form,
+            "tasks": tasks,
+            "is_first_page": cursor is None,
+            "first_page_query": query.urlencode(),
+            # Те же проекты, что в фильтре: id уже известны форме
+            "projects": cast(
+                forms.ModelChoiceField[Project],
+                form.fields["project"],
+            ).queryset,
+        }
+        if next_cursor:
+            query["cursor"] = next_cursor
+            context["next_page_query"] = query.urlencode()
+        return context
 
     def get_context_data(
         self,
         **kwargs: Any,
     ) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        context["tasks"] = Task.objects.filter(
-            executor=cast(User, self.request.user),
-        ).only("id", "title", "status", "updated_at")
-        context["projects"] = Project.objects.filter(
-            members__user=cast(User, self.request.user),
-        ).only("id", "title")
+        user = cast(User, self.request.user)
+        form = self.get_form(self.request, user)
+        cursor = self.get_cursor(self.request)
+        tasks, next_cursor = KeysetPaginator(
+            self.get_tasks(user, form.cleaned_data if form.is_valid() else {}),
+            self.page_size,
+            field="updated_at",
+        ).page(cursor)
+        context.update(
+            self.get_page_context(self.request, form, cursor, tasks, next_cursor),
+        )
+        return context
+
+
+class AsyncHomeView(AsyncLoginRequiredMixin, View):
+    # Вариант HomeView для ASGI: пока страница задач ждёт базу, воркер
+    # обслуживает другие запросы
+    http_method_names = ["get"]
+
+    async def get(self, request: HttpRequest) -> HttpResponseBase:
+        if response := await self.check_login(request):
+            return response
+        user = cast(User, request.user)
+        # Фильтр определяет выборку задач, поэтому валидируется первым
+        form = await sync_to_async(HomeView.get_form)(request, user)
+        cursor = HomeView.get_cursor(request)
+        paginator = KeysetPaginator(
+            HomeView.get_tasks(user, form.cleaned_data if form.is_valid() else {}),
+            HomeView.page_size,
+            field="updated_at",
+        )
+        projects = cast(
+            models.QuerySet[Project],
+            cast(forms.ModelChoiceField[Project], form.fields["project"]).queryset,
+        )
+        # Проекты фильтра не зависят от страницы задач. async for заполняет
+        # кэш queryset, и шаблон повторно их не запрашивает
+        (tasks, next_cursor), _ = await asyncio.gather(
+            paginator.apage(cursor),
+            self.fetch(projects),
+        )
+        return TemplateResponse(
+            request,
+            HomeView.template_name,
+            HomeView.get_page_context(request, form, cursor, tasks, next_cursor),
+        )
+
+    @staticmethod
+    async def fetch(queryset: models.QuerySet[Any]) -> None:
+        async for _ in queryset:
+            pass
+
+
+class ProjectTasksView(LoginRequiredMixin, TemplateView):
+    http_method_names = ["get"]
+    template_name = "tasks/tasks_list.html"
+    extra_context = None
+    page_size = 50
+
+    @staticmethod
+    def get_tasks(project: Project, filters: dict[str, Any]) -> models.QuerySet[Task]:
+        # Фильтр по project_id первым: каждая комбинация фильтра и сортировки
+        # по умолчанию идёт по одному из task__project_*_idx индексов
+        tasks = (
+            Task.objects.filter(project_id=project.id)
+            .select_related("status", "executor", "creator", "parent")
+            .only(
+                "id",
+                "title",
+                "created_at",
+                "updated_at",
+                "status__id",
+                "status__name",
+                *(f"executor__{field}" for field in USER_FIELDS),
+                *(f"creator__{field}" for field in USER_FIELDS),
+                "parent__id",
+                "parent__title",
+                "subtree_hours",
+            )
+        )
+        if filters.get("status") == NO_STATUS:
+            tasks = tasks.filter(status__isnull=True)
+        elif filters.get("status"):
+            tasks = tasks.filter(status_id=int(filters["status"]))
+        if filters.get("executor"):
+            tasks = tasks.filter(executor=filters["executor"])
+        if filters.get("creator"):
+            tasks = tasks.filter(creator=filters["creator"])
+        if filters.get("roots"):
+            tasks = tasks.filter(parent__isnull=True)
+        elif filters.get("parent"):
+            tasks = tasks.filter(parent=filters["parent"])
+        return tasks
+
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        project = get_object_or_404(
+            ProjectMembershipService.projects(
+                cast(User, self.request.user),
+            ).only("id", "title"),
+            id=self.kwargs["project_id"],
+        )
+        form = ProjectTasksFilterForm(self.request.GET, project=project)
+        filters = form.cleaned_data if form.is_valid() else {}
+        sort = filters.get("sort", "-updated_at")
+        field, descending = TASK_LIST_SORTS[sort]
+        cursor = None
+        if raw_cursor := self.request.GET.get("cursor"):
+            # Битый курсор — просто первая страница
+            with contextlib.suppress(ValueError):
+                cursor = decode_cursor(raw_cursor)
+        tasks, next_cursor = KeysetPaginator(
+            self.get_tasks(project, filters),
+            self.page_size,
+            field=field,
+            descending=descending,
+        ).page(cursor)
+        # Число подзадач для всей страницы одним запросом по closure
+        Task.objects.filter(id__in=[task.id for task in tasks]).subtrees().attach(
+            tasks,
+        )
+        query = self.request.GET.copy()
+        query.pop("cursor", None)
+        # Ссылки в заголовках колонок: повторный клик меняет направление
+        sort_queries = {}
+        for column in ("created_at", "updated_at"):
+            query["sort"] = f"-{column}" if sort != f"-{column}" else column
+            sort_queries[column] = query.urlencode()
+        query["sort"] = sort
+        context["project"] = project
+        context["filter_form"] = form
+        context["tasks"] = tasks
+        context["sort"] = sort
+        context["sort_queries"] = sort_queries
+        context["is_first_page"] = cursor is None
+        context["first_page_query"] = query.urlencode()
+        if next_cursor:
+            query["cursor"] = next_cursor
+            context["next_page_query"] = query.urlencode()
         return context
 
 
@@ -54,7 +329,7 @@ class CTaskView(LoginRequiredMixin, TemplateView):
 
     def get_project(self) -> Project:
         return get_object_or_404(
-            Project.objects.filter(members__user=cast(User, self.request.user)),
+            ProjectMembershipService.projects(cast(User, self.request.user)),
             id=self.kwargs["project_id"],
         )
 
@@ -67,21 +342,10 @@ class CTaskView(LoginRequiredMixin, TemplateView):
             context["project"] = self.get_project()
         if not context.get("form"):
             form = CTaskForm()
-            executor_field = cast(forms.ModelChoiceField[User], form.fields["executor"])
-            executor_field.queryset = User.objects.filter(
-                projects__project=context["project"],
-            )
-            status_field = cast(
-                forms.ModelChoiceField[ProjectStatus],
-                form.fields["status"],
+            bind_project(
+                form,
+                ProjectAccess.for_request(self.request, context["project"]),
             )
-            status_field.queryset = ProjectStatus.objects.filter(
-                project=context["project"],
-            )
-            if not status_field.queryset.exists():
-                status_field.empty_label = "No status"
-            else:
-                status_field.empty_label = None
             context["form"] = form
         return context
 
@@ -91,21 +355,25 @@ class CTaskView(LoginRequiredMixin, TemplateView):
         *args: Any,
         **kwargs: Any,
     ) -> HttpResponse:
+        project = self.get_project()
         form = CTaskForm(request.POST)
+        bind_project(form, ProjectAccess.for_request(request, project))
         if not form.is_valid():
-            return super().get(request, *args, **kwargs, form=form)
+            return super().get(request, *args, **kwargs, project=project, form=form)
         form.instance.creator = request.user
         form.instance.project = (
-            form.instance.parent.project if form.instance.parent else self.get_project()
+            form.instance.parent.project if form.instance.parent else project
         )
         TaskChecker.check_all(
             status_id=form.instance.status_id,
-            project=form.instance.project,
+            access=ProjectAccess.for_request(request, form.instance.project),
             user=request.user,
             executor=form.instance.executor,
         )
         with transaction.atomic():
             task = form.save()
+            TaskHierarchyService.insert(task)
+            TaskBoardService.invalidate(task.project_id)
             history_service = TaskHistoryService(
                 task=task,
                 user=request.user,
@@ -115,6 +383,18 @@ class CTaskView(LoginRequiredMixin, TemplateView):
         return redirect("tasks:task", task_id=task.id)
 
 
+# Браузер перепроверяет страницу при каждом показе, а при неизменных данных
+# получает 304 без рендера
+@method_decorator(
+    [
+        cache_control(private=True, no_cache=True),
+        condition(
+            etag_func=ConditionalGetService.task_page_etag,
+            last_modified_func=ConditionalGetService.task_last_modified,
+        ),
+    ],
+    name="get",
+)
 class TaskView(LoginRequiredMixin, TemplateView):
     http_method_names = ["get"]
     template_name = "tasks/task.html"
@@ -123,25 +403,88 @@ class TaskView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         task = get_object_or_404(
-            Task.objects.filter(
-                project__members__user=cast(
-                    AuthenticatedHttpRequest,
-                    self.request,
-                ).user,
+            TaskDetailLoader.get_queryset(
+                cast(AuthenticatedHttpRequest, self.request).user,
             ),
             id=self.kwargs["task_id"],
         )
         context["task"] = task
-        total_hours = (
-            TaskTimeLog.objects.filter(
-                task_id__in=task.get_all_descendant_ids() + [task.id],
-            ).aggregate(models.Sum("hours"))["hours__sum"]
-            or 0
+        context["total_hours"] = f"{task.subtree_hours:.2f}"
+        # Дети и первая страница комментариев вычисляются лениво: при
+        # попадании во фрагментный кэш запросы за ними не выполняются
+        context["children"] = TaskDetailLoader.get_children(task)
+        context["comments_page"] = partial(TaskCommentsAPIView.get_page, task.id)
+        # Версия фрагмента плюс отпечаток данных, прочитанных этим запросом:
+        # страница, собранная с отстающей реплики, не займёт ключ свежей
+        context["fragment_version"] = ConditionalGetService.task_activity_etag(
+            self.request,
+            task.id,
         )
-        context["total_hours"] = f"{total_hours:.2f}"
         return context
 
 
+class AsyncTaskView(AsyncLoginRequiredMixin, View):
+    # Вариант TaskView для ASGI. Выборка валидаторов заодно проверяет доступ,
+    # после неё задача, дети и первая страница комментариев читаются
+    # без обращения к кэшу членства
+    http_method_names = ["get"]
+
+    async def get(self, request: HttpRequest, task_id: int) -> HttpResponseBase:
+        if response := await self.check_login(request):
+            return response
+        state = await sync_to_async(ConditionalGetService.task_state)(
+            request,
+            task_id,
+        )
+        if state is None:
+            raise Http404
+        return await self.render_page(request, task_id=task_id)
+
+    # Валидаторы берутся из уже прочитанного состояния, без запросов
+    @method_decorator(
+        [
+            cache_control(private=True, no_cache=True),
+            condition(
+                etag_func=ConditionalGetService.task_page_etag,
+                last_modified_func=ConditionalGetService.task_last_modified,
+            ),
+        ],
+    )
+    async def render_page(
+        self,
+        request: HttpRequest,
+        task_id: int,
+    ) -> HttpResponse:
+        state = cast(
+            Mapping[str, Any],
+            ConditionalGetService.task_state(request, task_id),
+        )
+        task = await TaskDetailLoader.select(
+            Task.objects.filter(project_id=state["project_id"]),
+        ).aget(id=task_id)
+        context: dict[str, Any] = {
+            "task": task,
+            "total_hours": f"{task.subtree_hours:.2f}",
+            "fragment_version": ConditionalGetService.task_activity_etag(
+                request,
+                task_id,
+            ),
+            # Если фрагмент истечёт до рендера, шаблон дочитает их сам
+            "children": TaskDetailLoader.get_children(task),
+            "comments_page": partial(TaskCommentsAPIView.get_page, task_id),
+        }
+        fragment_key = make_template_fragment_key(
+            "task_page",
+            [task_id, context["fragment_version"], context["total_hours"]],
+        )
+        if not await cache.ahas_key(fragment_key):
+            context["children"], context["comments_page"] = await asyncio.gather(
+                TaskDetailLoader.aget_children(task),
+                TaskCommentsAPIView.aget_page(task_id),
+            )
+        return TemplateResponse(request, TaskView.template_name, context)
+
+
 class TaskUView(LoginRequiredMixin, TemplateView):
     http_method_names = ["get", "post"]
     template_name = "tasks/edit_task.html"
@@ -149,37 +492,36 @@ class TaskUView(LoginRequiredMixin, TemplateView):
 
     def get_task(self) -> Task:
         return get_object_or_404(
-            Task.objects.filter(project__members__user=cast(User, self.request.user)),
+            ProjectMembershipService.tasks(
+                cast(User, self.request.user),
+            ).select_related("project"),
             id=self.kwargs["task_id"],
         )
 
+    def bind_form(self, form: UTaskForm, task: Task) -> ProjectAccess:
+        access = ProjectAccess.for_request(self.request, task.project)
+        bind_project(form, access)
+        parent_field = cast(forms.ModelChoiceField[Task], form.fields["parent"])
+        # Подзапрос по closure вместо списка id: поддерево эпика не упирается
+        # в лимит параметров SQLite. Ссылка на себя (depth=0) исключает саму задачу
+        parent_field.queryset = Task.objects.filter(
+            project_id=task.project_id,
+        ).exclude(
+            id__in=TaskClosure.objects.filter(ancestor_id=task.id).values(
+                "descendant_id",
+            ),
+        )
+        parent_field.widget.attrs["data-url"] += f"?exclude_subtree_of={task.id}"
+        return access
+
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         if not context.get("task"):
             context["task"] = self.get_task()
+        context["comments_page"] = TaskCommentsAPIView.get_page(context["task"].id)
         if not context.get("form"):
             form = UTaskForm(instance=context["task"])
-            executor_field = cast(forms.ModelChoiceField[User], form.fields["executor"])
-            executor_field.queryset = User.objects.filter(
-                projects__project=context["task"].project,
-            )
-            parent_field = cast(forms.ModelChoiceField[Task], form.fields["parent"])
-            parent_field.queryset = Task.objects.filter(
-                project=context["task"].project,
-            ).exclude(
-                id__in=context["task"].get_all_descendant_ids() + [context["task"].id],
-            )
-            status_field = cast(
-                forms.ModelChoiceField[ProjectStatus],
-                form.fields["status"],
-            )
-            status_field.queryset = ProjectStatus.objects.filter(
-                project=context["task"].project,
-            )
-            if not status_field.queryset.exists():
-                status_field.empty_label = "No status"
-            else:
-                status_field.empty_label = None
+            self.bind_form(form, context["task"])
             context["form"] = form
 
         return context
@@ -190,15 +532,7 @@ class TaskUView(LoginRequiredMixin, TemplateView):
         *args: Any,
         **kwargs: Any,
     ) -> HttpResponse:
-        task = get_object_or_404(
-            Task.objects.filter(
-                project__members__user=cast(
-                    AuthenticatedHttpRequest,
-                    self.request,
-                ).user,
-            ),
-            id=self.kwargs["task_id"],
-        )
+        task = self.get_task()
         old_values = TaskOldValues(
             title=task.title,
             description=task.description,
@@ -211,6 +545,7 @@ class TaskUView(LoginRequiredMixin, TemplateView):
             request.POST,
             instance=task,
         )
+        access = self.bind_form(form, task)
 
         if not form.is_valid():
             return super().get(
@@ -222,7 +557,7 @@ class TaskUView(LoginRequiredMixin, TemplateView):
             )
         TaskChecker.check_all(
             status_id=form.instance.status_id,
-            project=form.instance.project,
+            access=access,
             user=request.user,
             executor=form.instance.executor,
             old_values=old_values,
@@ -234,10 +569,10 @@ class TaskUView(LoginRequiredMixin, TemplateView):
         with transaction.atomic():
             comment_text = form.cleaned_data.get("comment_text")
             if comment_text:
-                task.last_comment_number += 1
+                (number,) = TaskNumberAllocator.reserve_comment_numbers(task)
                 comment = TaskComment.objects.create(
                     task=task,
-                    number=task.last_comment_number,
+                    number=number,
                     creator=request.user,
                     text=comment_text,
                 )
@@ -246,22 +581,630 @@ class TaskUView(LoginRequiredMixin, TemplateView):
             log_description = form.cleaned_data.get("log_description")
             log_hours = form.cleaned_data.get("log_hours")
             if log_hours:
-                task.last_timelog_number += 1
+                (number,) = TaskNumberAllocator.reserve_timelog_numbers(task)
                 timelog = TaskTimeLog.objects.create(
                     task=task,
-                    number=task.last_timelog_number,
+                    number=number,
                     creator=request.user,
                     description=log_description,
                     hours=log_hours,
                 )
                 history_service.add_timelog(timelog)
+                TaskHoursService.apply_delta(task, timelog.hours)
+                TimeLogRollupService.apply(timelog, timelog.hours)
 
+            if "parent" in form.changed_data:
+                TaskHierarchyService.move(task)
+            if "status" in form.changed_data:
+                TaskBoardService.invalidate(task.project_id)
             if form.has_changed():
-                history_service.update()
-            task.save()
+                history_service.update(old_values, form.changed_data)
+            # Счётчики часов и номеров обновляются в БД атомарно,
+            # их не перезаписываем
+            task.save(update_fields=[*form.changed_data, "updated_at"])
         return redirect("tasks:task", task_id=task.id)
 
 
+@method_decorator(
+    [
+        cache_control(private=True, no_cache=True),
+        condition(etag_func=ConditionalGetService.task_activity_etag),
+    ],
+    name="get",
+)
+class TaskActivityAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["get"]
+    # Подклассы задают выборку и сериализатор; лента фильтруется по задаче
+    queryset: models.QuerySet[Any]
+    serializer_class: type[serializers.ModelSerializer[Any]]
+
+    @classmethod
+    def get_queryset(cls, task_id: int) -> models.QuerySet[Any]:
+        return cls.queryset.filter(task_id=task_id)
+
+    @classmethod
+    def get_page(
+        cls,
+        task_id: int,
+        cursor: Cursor | None = None,
+        limit: int = 20,
+    ) -> dict[str, Any]:
+        items, next_cursor = KeysetPaginator(cls.get_queryset(task_id), limit).page(
+            cursor,
+        )
+        return cls.get_page_data(items, next_cursor)
+
+    @classmethod
+    async def aget_page(
+        cls,
+        task_id: int,
+        cursor: Cursor | None = None,
+        limit: int = 20,
+    ) -> dict[str, Any]:
+        items, next_cursor = await KeysetPaginator(
+            cls.get_queryset(task_id),
+            limit,
+        ).apage(cursor)
+        return cls.get_page_data(items, next_cursor)
+
+    @classmethod
+    def get_page_data(
+        cls,
+        items: list[Any],
+        next_cursor: str | None,
+    ) -> dict[str, Any]:
+        return {
+            "results": cls.serializer_class(items, many=True).data,
+            "next_cursor": next_cursor,
+        }
+
+    def get(
+        self,
+        request: AuthenticatedRequest,
+        task_id: int,
+    ) -> Response:
+        # Доступ проверен той же выборкой, что считала ETag
+        if ConditionalGetService.task_state(request, task_id) is None:
+            raise Http404
+        query = KeysetQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            data=self.get_page(
+                task_id,
+                query.validated_data.get("cursor"),
+                query.validated_data["limit"],
+            ),
+        )
+
+
+class TaskCommentsAPIView(TaskActivityAPIView):
+    queryset = TaskComment.objects.select_related("creator")
+    serializer_class = CommentEntrySerializer
+
+
+class TaskTimeLogsAPIView(TaskActivityAPIView):
+    queryset = TaskTimeLog.objects.select_related("creator")
+    serializer_class = TimeLogEntrySerializer
+
+
+class TaskHistoryAPIView(TaskActivityAPIView):
+    queryset = TaskHistoryEntry.objects.select_related("user").defer("snapshot")
+    serializer_class = HistoryEntrySerializer
+
+
+class TaskEventsView(LoginRequiredMixin, View):
+    # Под WSGI поток событий держал бы поток воркера: 204 говорит
+    # EventSource не переподключаться, и страница обходится без живых
+    # обновлений
+    http_method_names = ["get"]
+
+    def get(self, request: HttpRequest, task_id: int) -> HttpResponse:
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncTaskEventsView(AsyncLoginRequiredMixin, View):
+    # Server-Sent Events по задаче: новые записи истории и изменения
+    # комментариев и записей времени, о которых они говорят. Источник —
+    # task_history по возрастанию id, поэтому переподключение с
+    # Last-Event-ID продолжает с того же места. Поток просыпается от
+    # TaskEventBroker, а записи других процессов подбирает опросом
+    http_method_names = ["get"]
+    poll_seconds = 5
+    batch_size = 100
+    subject_events: dict[str, tuple[str, str]] = {
+        TaskHistoryEvent.COMMENT_ADDED: ("comment", "added"),
+        TaskHistoryEvent.COMMENT_UPDATED: ("comment", "updated"),
+        TaskHistoryEvent.COMMENT_DELETED: ("comment", "deleted"),
+        TaskHistoryEvent.TIMELOG_ADDED: ("timelog", "added"),
+        TaskHistoryEvent.TIMELOG_UPDATED: ("timelog", "updated"),
+        TaskHistoryEvent.TIMELOG_DELETED: ("timelog", "deleted"),
+    }
+    subject_views: dict[str, type[TaskActivityAPIView]] = {
+        "comment": TaskCommentsAPIView,
+        "timelog": TaskTimeLogsAPIView,
+    }
+
+    async def get(self, request: HttpRequest, task_id: int) -> HttpResponseBase:
+        if response := await self.check_login(request):
+            return response
+        state = await sync_to_async(ConditionalGetService.task_state)(
+            request,
+            task_id,
+        )
+        if state is None:
+            raise Http404
+        last_event_id = request.headers.get("Last-Event-ID", "")
+        if last_event_id.isdigit():
+            after_id = int(last_event_id)
+        else:
+            # Новый поток начинается с текущего момента: всё прежнее
+            # страница уже показала
+            last = await (
+                TaskHistoryEntry.objects.using(DEFAULT_DB_ALIAS)
+                .filter(task_id=task_id)
+                .aaggregate(last_id=models.Max("id"))
+            )
+            after_id = last["last_id"] or 0
+        response = StreamingHttpResponse(
+            self.stream(
+                cast(User, request.user).id,
+                state["project_id"],
+                task_id,
+                after_id,
+            ),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Прокси не должен копить поток в буфере
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(
+        self,
+        user_id: int,
+        project_id: int,
+        task_id: int,
+        after_id: int,
+    ) -> AsyncIterator[str]:
+        with TaskEventBroker.subscribe(task_id) as wakeup:
+            while True:
+                # Сброс до чтения: оповещение во время выборки не потеряется
+                wakeup.clear()
+                # Участника могли исключить из проекта, пока поток открыт
+                if not await sync_to_async(ProjectMembershipService.is_member)(
+                    user_id,
+                    project_id,
+                ):
+                    return
+                events = await sync_to_async(self.get_events)(task_id, after_id)
+                for event_id, name, data in events:
+                    if event_id:
+                        after_id = event_id
+                    yield self.format_event(event_id, name, data)
+                # После пачки событий сразу проверяем, не осталось ли ещё
+                if events:
+                    continue
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.poll_seconds)
+                except TimeoutError:
+                    # Комментарий SSE держит соединение живым через прокси
+                    yield ": ping\n\n"
+
+    @classmethod
+    def get_events(
+        cls,
+        task_id: int,
+        after_id: int,
+    ) -> list[tuple[int | None, str, Any]]:
+        # С основной базы: оповещение приходит раньше, чем запись доедет
+        # до реплики
+        entries = list(
+            TaskHistoryAPIView.get_queryset(task_id)
+            .using(DEFAULT_DB_ALIAS)
+            .filter(id__gt=after_id)
+            .order_by("id")[: cls.batch_size],
+        )
+        subject_ids: defaultdict[str, set[int]] = defaultdict(set)
+        for entry in entries:
+            if entry.subject_id and entry.event in cls.subject_events:
+                subject_ids[cls.subject_events[entry.event][0]].add(entry.subject_id)
+        subjects = {
+            name: cls.subject_views[name]
+            .get_queryset(task_id)
+            .using(DEFAULT_DB_ALIAS)
+            .in_bulk(ids)
+            for name, ids in subject_ids.items()
+        }
+        total_hours = None
+        if "timelog" in subjects:
+            # Часы задачи меняются вместе с записями времени
+            hours = (
+                Task.objects.using(DEFAULT_DB_ALIAS)
+                .values_list("subtree_hours", flat=True)
+                .get(id=task_id)
+            )
+            total_hours = f"{hours:.2f}"
+
+        events: list[tuple[int | None, str, Any]] = []
+        for entry in entries:
+            if entry.subject_id and entry.event in cls.subject_events:
+                name, action = cls.subject_events[entry.event]
+                subject = subjects[name].get(entry.subject_id)
+                # Объект удалён позже, об этом будет своё событие
+                if subject is not None or action == "deleted":
+                    data = {
+                        "action": action,
+                        "id": entry.subject_id,
+                        "entry": cls.subject_views[name].serializer_class(subject).data
+                        if subject is not None
+                        else None,
+                    }
+                    if name == "timelog":
+                        data["total_hours"] = total_hours
+                    # id только у записи истории, она идёт следом: при
+                    # обрыве между ними переподключение повторит обе
+                    events.append((None, name, data))
+            events.append((entry.id, "history", HistoryEntrySerializer(entry).data))
+        return events
+
+    @staticmethod
+    def format_event(event_id: int | None, name: str, data: Any) -> str:
+        lines = [f"event: {name}", f"data: {json.dumps(data, cls=DjangoJSONEncoder)}"]
+        if event_id:
+            lines.insert(0, f"id: {event_id}")
+        return "\n".join(lines) + "\n\n"
+
+
+class TaskAutocompleteAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["get"]
+    limit = 20
+
+    def get(
+        self,
+        request: AuthenticatedRequest,
+        project_id: int,
+    ) -> Response:
+        project = get_object_or_404(
+            ProjectMembershipService.projects(request.user),
+            id=project_id,
+        )
+        query = TaskAutocompleteQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        tasks = self.get_queryset(project, **query.validated_data)
+        return Response(
+            data={
+                "results": [
+                    {"id": task_id, "text": title}
+                    for task_id, title in tasks.values_list("id", "title")[: self.limit]
+                ],
+            },
+        )
+
+    @staticmethod
+    def get_queryset(
+        project: Project,
+        q: str,
+        exclude_subtree_of: int | None = None,
+    ) -> models.QuerySet[Task]:
+        # Порядок индекса task__project_title_idx: LIMIT обрывает обход
+        # диапазона без сортировки всех совпадений
+        tasks = Task.objects.filter(project=project).order_by(
+            Lower("title"),
+            "id",
+        )
+        text = q.strip()
+        if text.isdigit():
+            tasks = tasks.filter(
+                models.Q(id=int(text)) | TaskSearchService.title_prefix_condition(text),
+            )
+        elif text:
+            tasks = tasks.filter(TaskSearchService.title_prefix_condition(text))
+        if exclude_subtree_of is not None:
+            tasks = tasks.exclude(
+                id__in=TaskClosure.objects.filter(
+                    ancestor_id=exclude_subtree_of,
+                ).values("descendant_id"),
+            )
+        return tasks
+
+
+class TaskSearchAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["get"]
+
+    def get(self, request: AuthenticatedRequest) -> Response:
+        query = TaskSearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        results = TaskSearchService.search(
+            request.user,
+            query.validated_data["q"],
+            limit=query.validated_data["limit"],
+            project_id=query.validated_data.get("project"),
+        )
+        return Response(
+            data={
+                "results": [
+                    {
+                        **result,
+                        "url": reverse(
+                            "tasks:task",
+                            kwargs={"task_id": result["task_id"]},
+                        ),
+                    }
+                    for result in results
+                ],
+            },
+        )
+
+
+class TimesheetAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["get"]
+
+    def get(
+        self,
+        request: AuthenticatedRequest,
+        project_id: int | None = None,
+    ) -> Response:
+        query = ReportQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        if project_id is None:
+            # Личный табель по всем проектам
+            user_id = request.user.id
+        else:
+            if not ProjectMembershipService.is_member(request.user.id, project_id):
+                raise Http404
+            user_id = query.validated_data.get("user")
+        rows = TimeLogReportService.timesheet(
+            period=query.validated_data["period"],
+            start=query.validated_data["start"],
+            end=query.validated_data["end"],
+            project_id=project_id,
+            user_id=user_id,
+        )
+        users = {
+            user.id: str(user)
+            for user in User.objects.filter(id__in={row["user_id"] for row in rows})
+        }
+        return Response(
+            data={
+                "rows": [
+                    {
+                        "period": row["period"],
+                        "user_id": row["user_id"],
+                        "user": users.get(row["user_id"]),
+                        "hours": f"{row['hours']:.2f}",
+                    }
+                    for row in rows
+                ],
+            },
+        )
+
+
+class ProjectBurnAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["get"]
+
+    def get(
+        self,
+        request: AuthenticatedRequest,
+        project_id: int,
+    ) -> Response:
+        project = get_object_or_404(
+            ProjectMembershipService.projects(request.user),
+            id=project_id,
+        )
+        query = ReportQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        rows = TimeLogReportService.project_burn(
+            project_id=project.id,
+            period=query.validated_data["period"],
+            start=query.validated_data["start"],
+            end=query.validated_data["end"],
+        )
+        return Response(
+            data={
+                "total_hours": f"{project.total_hours:.2f}",
+                "rows": [
+                    {
+                        "period": row["period"],
+                        "hours": f"{row['hours']:.2f}",
+                        "cumulative_hours": f"{row['cumulative_hours']:.2f}",
+                    }
+                    for row in rows
+                ],
+            },
+        )
+
+
+class TaskBoardView(LoginRequiredMixin, TemplateView):
+    http_method_names = ["get"]
+    template_name = "tasks/task_board.html"
+    extra_context = None
+
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        project = get_object_or_404(
+            ProjectMembershipService.projects(
+                cast(User, self.request.user),
+            ).only("id", "title"),
+            id=self.kwargs["project_id"],
+        )
+        context["project"] = project
+        context["columns"] = TaskBoardAPIView.get_columns(project.id)
+        return context
+
+
+class TaskBoardAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["get"]
+
+    @staticmethod
+    def get_columns(project_id: int) -> list[dict[str, Any]]:
+        counts = TaskBoardService.column_counts(project_id)
+        columns = [
+            {
+                "status_id": status_obj.id,
+                "name": status_obj.name,
+                "count": counts.get(status_obj.id, 0),
+                "url": reverse(
+                    "tasks:task_board_column",
+                    kwargs={"project_id": project_id, "status_id": status_obj.id},
+                ),
+            }
+            for status_obj in ProjectStatus.objects.filter(project_id=project_id)
+        ]
+        # Задачи без статуса (или со статусом, удалённым из проекта)
+        if counts.get(None) or not columns:
+            columns.insert(
+                0,
+                {
+                    "status_id": None,
+                    "name": "No status",
+                    "count": counts.get(None, 0),
+                    "url": reverse(
+                        "tasks:task_board_no_status_column",
+                        kwargs={"project_id": project_id},
+                    ),
+                },
+            )
+        return columns
+
+    def get(
+        self,
+        request: AuthenticatedRequest,
+        project_id: int,
+    ) -> Response:
+        if not ProjectMembershipService.is_member(request.user.id, project_id):
+            raise Http404
+        return Response(data={"columns": self.get_columns(project_id)})
+
+
+class TaskBoardColumnAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["get"]
+
+    def get(
+        self,
+        request: AuthenticatedRequest,
+        project_id: int,
+        status_id: int | None = None,
+    ) -> Response:
+        if not ProjectMembershipService.is_member(request.user.id, project_id):
+            raise Http404
+        query = KeysetQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        tasks, next_cursor = KeysetPaginator(
+            TaskBoardService.column_queryset(project_id, status_id),
+            query.validated_data["limit"],
+            field="updated_at",
+        ).page(query.validated_data.get("cursor"))
+        return Response(
+            data={
+                "results": BoardTaskSerializer(tasks, many=True).data,
+                "next_cursor": next_cursor,
+            },
+        )
+
+
+class TimeLogExportView(LoginRequiredMixin, View):
+    http_method_names = ["get"]
+
+    def get(
+        self,
+        request: AuthenticatedHttpRequest,
+        *args: Any,
+        **kwargs: Any,
+    ) -> HttpResponseBase:
+        form = TimeLogExportForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse(form.errors, status=400)
+        export = self.get_export(request.user, form)
+        if form.cleaned_data["format"] == "ndjson":
+            return self.get_response(form, export.stream_ndjson())
+        return self.get_response(form, export.stream_csv())
+
+    @staticmethod
+    def get_export(user: User, form: TimeLogExportForm) -> TimeLogExportService:
+        return TimeLogExportService(
+            user=user,
+            filters=TimeLogExportFilters(
+                start=form.cleaned_data["start"],
+                end=form.cleaned_data["end"],
+                project_id=form.cleaned_data["project"],
+                user_id=form.cleaned_data["user"],
+            ),
+        )
+
+    @staticmethod
+    def get_response(
+        form: TimeLogExportForm,
+        content: Iterator[str] | AsyncIterator[str],
+    ) -> StreamingHttpResponse:
+        if form.cleaned_data["format"] == "ndjson":
+            return StreamingHttpResponse(
+                content,
+                content_type="application/x-ndjson",
+            )
+        return StreamingHttpResponse(
+            content,
+            content_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="timelogs.csv"'},
+        )
+
+
+class AsyncTimeLogExportView(AsyncLoginRequiredMixin, View):
+    # Вариант TimeLogExportView для ASGI: синхронный генератор ASGI-обработчик
+    # вычитал бы целиком, асинхронный читает базу порциями по мере отдачи
+    http_method_names = ["get"]
+
+    async def get(self, request: HttpRequest) -> HttpResponseBase:
+        if response := await self.check_login(request):
+            return response
+        form = TimeLogExportForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse(form.errors, status=400)
+        export = TimeLogExportView.get_export(cast(User, request.user), form)
+        if form.cleaned_data["format"] == "ndjson":
+            return TimeLogExportView.get_response(form, export.astream_ndjson())
+        return TimeLogExportView.get_response(form, export.astream_csv())
+
+
+class TimeLogImportAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["post"]
+
+    def post(
+        self,
+        request: AuthenticatedRequest,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Response:
+        service = TimeLogImportService(user=request.user)
+        rows: Iterable[dict[str, Any]]
+        if upload := request.FILES.get("file"):
+            rows = service.read_csv(upload)
+        elif isinstance(request.data, list):
+            rows = request.data
+        elif isinstance(request.data.get("rows"), list):
+            rows = request.data["rows"]
+        else:
+            return Response(
+                {"detail": "Expected a CSV file or a JSON list of rows"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        result = service.import_rows(rows)
+        return Response(data=result)
+
+
 class TaskTimeLogAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     http_method_names = ["patch", "delete"]
@@ -291,6 +1234,11 @@ class TaskTimeLogAPIView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         with transaction.atomic():
             serializer.save()
+            TaskHoursService.apply_delta(
+                timelog.task,
+                timelog.hours - old_values["hours"],
+            )
+            TimeLogRollupService.apply(timelog, timelog.hours - old_values["hours"])
 
             history_service = TaskHistoryService(
                 task=timelog.task,
@@ -300,17 +1248,12 @@ class TaskTimeLogAPIView(APIView):
                 timelog=timelog,
                 old_values=old_values,
             )
-        total_hours = (
-            TaskTimeLog.objects.filter(task=timelog.task).aggregate(
-                models.Sum("hours"),
-            )["hours__sum"]
-            or 0
-        )
         return Response(
             data={
                 "timelog": serializer.data,
-                "total_hours": f"{total_hours:.2f}",
+                "total_hours": f"{timelog.task.subtree_hours:.2f}",
                 "history_entry": {
+                    "id": history_entry.id,
                     "user": str(request.user),
                     "created_at": history_entry.created_at,
                     "text": history_entry.text,
@@ -333,22 +1276,20 @@ class TaskTimeLogAPIView(APIView):
             task_id=task_id,
         )
         with transaction.atomic():
-            timelog.delete()
+            # История пишется до удаления: после него у записи нет id
             history_service = TaskHistoryService(
                 task=timelog.task,
                 user=request.user,
             )
             history_entry = history_service.delete_timelog(timelog)
-        total_hours = (
-            TaskTimeLog.objects.filter(task=timelog.task).aggregate(
-                models.Sum("hours"),
-            )["hours__sum"]
-            or 0
-        )
+            timelog.delete()
+            TaskHoursService.apply_delta(timelog.task, -timelog.hours)
+            TimeLogRollupService.apply(timelog, -timelog.hours)
         return Response(
             data={
-                "total_hours": f"{total_hours:.2f}",
+                "total_hours": f"{timelog.task.subtree_hours:.2f}",
                 "history_entry": {
+                    "id": history_entry.id,
                     "user": str(request.user),
                     "created_at": history_entry.created_at,
                     "text": history_entry.text,
@@ -398,6 +1339,7 @@ class TaskCommentAPIView(APIView):
             data={
                 "comment": serializer.data,
                 "history_entry": {
+                    "id": history_entry.id,
                     "user": str(request.user),
                     "created_at": history_entry.created_at,
                     "text": history_entry.text,
@@ -430,9 +1372,35 @@ class TaskCommentAPIView(APIView):
         return Response(
             data={
                 "history_entry": {
+                    "id": history_entry.id,
                     "user": str(request.user),
                     "created_at": history_entry.created_at,
                     "text": history_entry.text,
                 },
             },
         )
+
+
+class TaskStateAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ["get"]
+
+    def get(
+        self,
+        request: AuthenticatedRequest,
+        task_id: int,
+    ) -> Response:
+        task = get_object_or_404(
+            ProjectMembershipService.tasks(request.user),
+            id=task_id,
+        )
+        query = TaskStateQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        state = TaskHistoryService.state_at(task, query.validated_data["at"])
+        if state is None:
+            return Response(
+                {"detail": "No history recorded for this task at that time"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(data={"at": query.validated_data["at"], "state": state})
@@ -24,7 +24,7 @@ class UserManager(BaseUserManager["User"]):
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
         user.set_password(password)
-        user.save()
+        user.save(using=self._db)
         return user
 
     def create_superuser(
@@ -0,0 +1,135 @@
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any, cast
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.http import HttpRequest, HttpResponse
+
+REPLICA_DB_ALIAS = "replica"
+STICKY_COOKIE = "db_primary"
+SAFE_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+# Сессии читаются с основной базы всегда: иначе при отставании реплики
+# только что вошедший пользователь не найдёт свою сессию
+PRIMARY_ONLY_APPS = frozenset(["sessions"])
+
+
+@dataclass
+class RoutingState:
+    use_replica: bool
+    wrote: bool = False
+
+
+# Состояние текущего запроса; вне запроса (команды, shell) всё идёт на основную
+_state: ContextVar[RoutingState | None] = ContextVar("db_routing", default=None)
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+class PrimaryReplicaRouter:
+    # Чтения безопасных запросов уходят на реплику, пока запрос ничего
+    # не записал и основная база не в транзакции; запись всегда на основную
+    def db_for_read(self, model: type[models.Model], **hints: Any) -> str | None:
+        state = _state.get()
+        if (
+            state is None
+            or not state.use_replica
+            or state.wrote
+            or not replica_configured()
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        # Связанные объекты читаются оттуда же, откуда их владелец
+        if instance := hints.get("instance"):
+            return instance._state.db or REPLICA_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model: type[models.Model], **hints: Any) -> str:
+        if state := _state.get():
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(
+        self,
+        obj1: models.Model,
+        obj2: models.Model,
+        **hints: Any,
+    ) -> bool:
+        # Реплика — копия основной базы, связи между ними допустимы
+        return True
+
+    def allow_migrate(
+        self,
+        db: str,
+        app_label: str,
+        model_name: str | None = None,
+        **hints: Any,
+    ) -> bool | None:
+        # Схема попадает на реплику вместе с данными; остальные базы,
+        # например временная база бенчмарка, мигрируют как обычно
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    # После записи ставит cookie: пока она жива, чтения пользователя идут
+    # на основную базу и он видит свои изменения несмотря на отставание реплики.
+    # Под ASGI работает асинхронно: синхронный middleware в цепочке сводит
+    # все запросы к одному потоку
+    sync_capable = True
+    async_capable = True
+
+    def __init__(
+        self,
+        get_response: Callable[[HttpRequest], HttpResponse]
+        | Callable[[HttpRequest], Awaitable[HttpResponse]],
+    ) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse | Awaitable[HttpResponse]:
+        if self.async_mode:
+            return self.__acall__(request)
+        state, token = self.enter(request)
+        try:
+            response = cast(HttpResponse, self.get_response(request))
+        finally:
+            _state.reset(token)
+        return self.leave(state, response)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        state, token = self.enter(request)
+        try:
+            response = await cast(Awaitable[HttpResponse], self.get_response(request))
+        finally:
+            _state.reset(token)
+        return self.leave(state, response)
+
+    @staticmethod
+    def enter(request: HttpRequest) -> tuple[RoutingState, Token[RoutingState | None]]:
+        state = RoutingState(
+            use_replica=request.method in SAFE_METHODS
+            and STICKY_COOKIE not in request.COOKIES,
+        )
+        return state, _state.set(state)
+
+    @staticmethod
+    def leave(state: RoutingState, response: HttpResponse) -> HttpResponse:
+        if state.wrote and replica_configured():
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
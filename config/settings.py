@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 import django_stubs_ext
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "config.db_router.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -87,13 +89,51 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# WAL: читатели не ждут писателя. Запись начинается с BEGIN IMMEDIATE,
+# чтобы транзакция брала блокировку сразу и ждала её по timeout, а не падала
+# с "database is locked" при попытке перейти от чтения к записи.
+# timeout — busy_timeout в секундах; mmap_size и cache_size — 256 МБ
+# и 64 МБ на соединение
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA mmap_size=268435456;"
+                "PRAGMA cache_size=-64000;"
+            ),
+        },
     },
 }
 
+# Реплика для чтения — копия основной базы, которую обновляет
+# manage.py sync_replica. Без переменной окружения всё идёт в основную базу
+if replica_path := os.environ.get("JUSK_REPLICA_DB"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": replica_path,
+        "OPTIONS": {
+            "timeout": 20,
+            "init_command": (
+                "PRAGMA query_only=ON;"
+                "PRAGMA mmap_size=268435456;"
+                "PRAGMA cache_size=-64000;"
+            ),
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["config.db_router.PrimaryReplicaRouter"]
+
+# Сколько секунд после записи чтения пользователя идут на основную базу;
+# должно быть больше ожидаемого отставания реплики
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
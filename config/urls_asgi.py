@@ -0,0 +1,12 @@
+from django.urls import include, path
+
+from apps.tasks.views import AsyncHomeView
+from config.urls import urlpatterns
+
+# Маршруты для ASGI: асинхронные варианты страниц для чтения перекрывают
+# синхронные, WSGI продолжает работать с config.urls
+urlpatterns = [
+    path("", AsyncHomeView.as_view(), name="home"),
+    path("", include("apps.tasks.urls_asgi", namespace="tasks")),
+    *urlpatterns,
+]